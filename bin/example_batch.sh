@@ -0,0 +1,3 @@
+#!/bin/bash
+_file=${1:-${MMT_ETC}/targets.jsonl}
+python3 ${MMT_SRC}/mmt.py --batch=${_file} --workers=8 --output=${_file%.*}.results.jsonl --verbose
@@ -0,0 +1,3 @@
+#!/bin/bash
+_id=${1:-6593}
+python3 ${MMT_SRC}/mmt_daemon_client.py --action=GET --targetid=${_id}
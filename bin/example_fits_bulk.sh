@@ -0,0 +1,6 @@
+#!/bin/bash
+_begin='2020-06-04T00:00:00.000000'
+_end='2020-06-04T23:59:59.999999'
+python3 ${MMT_SRC}/fits_bulk.py --begin=${_begin} --end=${_end} --path=~ --type=.fits --output=/tmp/previews
+python3 ${MMT_SRC}/fits_bulk.py --begin=${_begin} --end=${_end} --path=~ --type=.fits --output=/tmp/previews --check=hash
+python3 ${MMT_SRC}/fits_bulk.py --stretch=percentile --workers=4 ~/frame1.fits ~/frame2.fits
@@ -4,19 +4,31 @@
 # +
 # import(s)
 # -
-from astropy.coordinates import Angle
-from astropy.io import fits
+# astropy, numpy, PIL and requests are imported by the function(s) that need them to keep start-up fast
+from collections import namedtuple
 from datetime import datetime
 from datetime import timedelta
-from PIL import Image
+from logging.handlers import QueueHandler
+from logging.handlers import QueueListener
+from logging.handlers import RotatingFileHandler
 
+import atexit
+import codecs
+import copy
 import hashlib
+import io
 import json
 import logging
-import logging.config
 import math
 import os
-import requests
+import queue
+import threading
+
+# orjson is optional, json.loads takes the same bytes
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
 
 
 # +
@@ -56,16 +68,24 @@ MMT_JSON_KEYS = ('centralwavelength', 'dec', 'dec_decimal', 'details', 'disabled
                  'photometric', 'pm_dec', 'pm_ra', 'priority', 'ra', 'ra_decimal', 'readtab', 'reduced', 'seeing',
                  'slitwidth', 'slitwidthproperty', 'submitted', 'targetofopportunity', 'totallength',
                  'totallengthformatted', 'visits')
+MMT_JSON_KEYS_SET = frozenset(MMT_JSON_KEYS)
+MMT_STREAM_CHUNK = 65536
 MMT_LOG_CLR_FMT = \
     '%(log_color)s%(asctime)-20s %(levelname)-9s %(filename)-15s %(funcName)-15s line:%(lineno)-5d Message: %(message)s'
 MMT_LOG_CSL_FMT = \
     '%(asctime)-20s %(levelname)-9s %(filename)-15s %(funcName)-15s line:%(lineno)-5d Message: %(message)s'
 MMT_LOG_FIL_FMT = \
     '%(asctime)-20s %(levelname)-9s %(filename)-15s %(funcName)-15s line:%(lineno)-5d Message: %(message)s'
+MMT_LOG_BACKUPS = 10
+MMT_LOG_JSON = os.getenv('MMT_LOG_JSON', '').strip().lower() not in ('', '0', 'false', 'no')
 MMT_LOG_LEVELS = ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL']
-MMT_LOG_MAX_BYTES = 9223372036854775807
+MMT_LOG_MAX_BYTES = int(os.getenv('MMT_LOG_MAX_BYTES', 10 * 1024 * 1024))
 
+SDSS_HEIGHT = 400
+SDSS_OPT = 'GL'
+SDSS_SCALE = 0.79224
 SDSS_URL = 'http://skyserver.sdss.org/dr16/SkyServerWS/ImgCutout/getjpeg'
+SDSS_WIDTH = 400
 
 
 # +
@@ -81,16 +101,66 @@ ISO_PATTERN = '(1[89][0-9]{2}|2[0-9]{3})-(0[13578]-[012][0-9]|0[13578]-3[0-1]|'
 RA_PATTERN = '^(0[0-9]|1[0-9]|2[0-3]):[0-5][0-9]:[0-5][0-9](\.[0-9]*)?'
 
 
+# +
+# class: JsonLinesFormatter() inherits from the logging.Formatter class
+# -
+class JsonLinesFormatter(logging.Formatter):
+    """ one compact JSON object per record """
+
+    def format(self, record):
+        _ret = {'time': self.formatTime(record), 'level': record.levelname, 'name': record.name,
+                'file': record.filename, 'func': record.funcName, 'line': record.lineno, 'message': record.getMessage()}
+        if record.exc_info:
+            _ret['exc'] = self.formatException(record.exc_info)
+        return json.dumps(_ret, separators=(',', ':'), default=str)
+
+
+# +
+# class: LogQueueHandler() inherits from the QueueHandler class
+# -
+class LogQueueHandler(QueueHandler):
+    """ enqueue a copy of the record as is: message and traceback are formatted by the listener's handler(s) """
+
+    def prepare(self, record):
+        return copy.copy(record)
+
+
+# +
+# queue listener(s): one per logger name, stopped (and so drained) at exit
+# -
+_log_listeners, _log_lock = {}, threading.Lock()
+
+
+# +
+# function: stop_loggers()
+# -
+def stop_loggers():
+    """ flush every queued record to its handler(s) and stop the background thread(s) """
+    with _log_lock:
+        for _listener in _log_listeners.values():
+            _listener.stop()
+            for _h in _listener.handlers:
+                _h.close()
+        _log_listeners.clear()
+
+
+atexit.register(stop_loggers)
+
+
 # +
 # class: Logger() inherits from the object class
 # -
 # noinspection PyBroadException,PyPep8
 class Logger(object):
+    """
+    colored stderr, {MMT_LOG}/{name}.log and /tmp/console-{name}.log handler(s) behind a LogQueueHandler: the caller
+    only enqueues, a QueueListener thread formats and writes, and each name is configured once per process
+    """
 
     # +
     # method: __init__
     # -
-    def __init__(self, name='', level='DEBUG'):
+    def __init__(self, name='', level='DEBUG', json_lines=MMT_LOG_JSON):
 
         # get arguments(s)
         self.name = name
@@ -99,88 +169,47 @@ class Logger(object):
         # define some variables and initialize them
         self.__msg = None
         self.__logconsole = f'/tmp/console-{self.__name}.log'
-        self.__logdir = os.getenv("MMT_LOG")
+        self.__logdir = os.getenv("MMT_LOG", '')
         if not os.path.exists(self.__logdir) or not os.access(self.__logdir, os.W_OK):
             self.__logdir = os.getcwd()
         self.__logfile = f'{self.__logdir}/{self.__name}.log'
 
-        # logger dictionary
-        utils_logger_dictionary = {
-
-            # logging version
-            'version': 1,
-
-            # do not disable any existing loggers
-            'disable_existing_loggers': False,
-
-            # use the same formatter for everything
-            'formatters': {
-                'ObsColoredFormatter': {
-                    '()': 'colorlog.ColoredFormatter',
-                    'format': MMT_LOG_CLR_FMT,
-                    'log_colors': {
-                        'DEBUG': 'cyan',
-                        'INFO': 'green',
-                        'WARNING': 'yellow',
-                        'ERROR': 'red',
-                        'CRITICAL': 'white,bg_red',
-                    }
-                },
-                'ObsConsoleFormatter': {
-                    'format': MMT_LOG_CSL_FMT
-                },
-                'ObsFileFormatter': {
-                    'format': MMT_LOG_FIL_FMT
-                }
-            },
-
-            # define file and console handlers
-            'handlers': {
-                'colored': {
-                    'class': 'logging.StreamHandler',
-                    'formatter': 'ObsColoredFormatter',
-                    'level': self.__level,
-                },
-                'console': {
-                    'class': 'logging.StreamHandler',
-                    'formatter': 'ObsConsoleFormatter',
-                    'level': self.__level,
-                    'stream': 'ext://sys.stdout'
-                },
-                'file': {
-                    'backupCount': 10,
-                    'class': 'logging.handlers.RotatingFileHandler',
-                    'formatter': 'ObsFileFormatter',
-                    'filename': self.__logfile,
-                    'level': self.__level,
-                    'maxBytes': MMT_LOG_MAX_BYTES
-                },
-                'utils': {
-                    'backupCount': 10,
-                    'class': 'logging.handlers.RotatingFileHandler',
-                    'formatter': 'ObsFileFormatter',
-                    'filename': self.__logconsole,
-                    'level': self.__level,
-                    'maxBytes': MMT_LOG_MAX_BYTES
-                }
-            },
-
-            # make this logger use file and console handlers
-            'loggers': {
-                self.__name: {
-                    'handlers': ['colored', 'file', 'utils'],
-                    'level': self.__level,
-                    'propagate': True
-                }
-            }
-        }
-
-        # configure logger
-        logging.config.dictConfig(utils_logger_dictionary)
+        # configure logger (once per name, later instance(s) only change the level)
+        with _log_lock:
+            if self.__name not in _log_listeners:
+                _queue = queue.SimpleQueue()
+                _listener = QueueListener(_queue, *self.__handlers(bool(json_lines)), respect_handler_level=False)
+                _logger = logging.getLogger(self.__name)
+                for _h in list(_logger.handlers):
+                    _logger.removeHandler(_h)
+                _logger.addHandler(LogQueueHandler(_queue))
+                _logger.propagate = True
+                _listener.start()
+                _log_listeners[self.__name] = _listener
+            logging.getLogger(self.__name).setLevel(self.__level)
 
         # get logger
         self.logger = logging.getLogger(self.__name)
 
+    # +
+    # method: __handlers()
+    # -
+    def __handlers(self, _json=False):
+        """ return the handler(s) the listener writes to, rotating at MMT_LOG_MAX_BYTES """
+        _colored = logging.StreamHandler()
+        try:
+            import colorlog
+            _colored.setFormatter(colorlog.ColoredFormatter(MMT_LOG_CLR_FMT, log_colors={
+                'DEBUG': 'cyan', 'INFO': 'green', 'WARNING': 'yellow', 'ERROR': 'red', 'CRITICAL': 'white,bg_red'}))
+        except ImportError:
+            _colored.setFormatter(logging.Formatter(MMT_LOG_CSL_FMT))
+        _ret = [_colored]
+        for _file in (self.__logfile, self.__logconsole):
+            _h = RotatingFileHandler(_file, maxBytes=MMT_LOG_MAX_BYTES, backupCount=MMT_LOG_BACKUPS)
+            _h.setFormatter(JsonLinesFormatter() if _json else logging.Formatter(MMT_LOG_FIL_FMT))
+            _ret.append(_h)
+        return _ret
+
     # +
     # Decorator(s)
     # -
@@ -225,6 +254,87 @@ def get_hash(seed=get_isot()):
         return None
 
 
+# +
+# function: sexagesimal_to_decimal()
+# -
+# noinspection PyBroadException
+def sexagesimal_to_decimal(value='', hours=False):
+    """ return [+-]a:b:c[.ddd] as decimal degrees (x15 if hours) or None if it is not in that form """
+    try:
+        _v = value.strip()
+        _sign = -1.0 if _v[:1] == '-' else 1.0
+        _a, _b, _c = (_v[1:] if _v[:1] in ('+', '-') else _v).split(':')
+        if not (_a.isdigit() and _b.isdigit() and _c.replace('.', '', 1).isdigit()):
+            return None
+        _a, _b, _c = int(_a), int(_b), float(_c)
+        if _b >= 60 or _c >= 60.0 or (hours and _a >= 24):
+            return None
+        return _sign * (_a + _b / 60.0 + _c / 3600.0) * (15.0 if hours else 1.0)
+    except:
+        return None
+
+
+# +
+# function: parse_sexagesimal_array()
+# -
+# noinspection PyBroadException
+def parse_sexagesimal_array(values=None, hours=False):
+    """ return (decimal degrees, mask) for strings in the exact [+-]aa:bb:cc[.ddd] layout, (nan, False) elsewhere """
+    import numpy as np
+
+    # view as a zero-padded byte matrix and drop the sign column
+    _v = np.asarray(values, dtype=str).ravel()
+    _n = _v.size
+    if _n == 0:
+        return np.zeros(0), np.zeros(0, dtype=bool)
+    try:
+        _u8 = _v.astype('S').view(np.uint8).reshape(_n, -1)
+    except:
+        _u8 = np.zeros((_n, 0), dtype=np.uint8)
+    _u8 = np.pad(_u8, ((0, 0), (0, max(1, 11 - _u8.shape[1]))))
+    _sign = np.where(_u8[:, 0] == ord('-'), -1.0, 1.0)
+    _shift = ((_u8[:, 0] == ord('+')) | (_u8[:, 0] == ord('-'))).astype(np.intp)
+    _u8 = np.take_along_axis(_u8, np.arange(_u8.shape[1] - 1)[None, :] + _shift[:, None], axis=1)
+
+    # the aa:bb:cc[.ddd] layout of RA_PATTERN and DEC_PATTERN is parsed with digit arithmetic
+    _d = _u8.astype(np.int64) - ord('0')
+    _isd = (_d >= 0) & (_d <= 9)
+    _ok = _isd[:, 0] & _isd[:, 1] & (_u8[:, 2] == ord(':')) & _isd[:, 3] & _isd[:, 4] & \
+        (_u8[:, 5] == ord(':')) & _isd[:, 6] & _isd[:, 7]
+    _dot, _fd, _pad = _u8[:, 8] == ord('.'), _isd[:, 9:], _u8[:, 9:] == 0
+    _ok &= (_dot | (_u8[:, 8] == 0)) & np.all(_fd | _pad, axis=1) & \
+        ~np.any(_fd & (np.cumsum(_pad, axis=1) > 0), axis=1) & (_dot | np.all(_pad, axis=1))
+    _a = 10.0 * _d[:, 0] + _d[:, 1]
+    _b = 10.0 * _d[:, 3] + _d[:, 4]
+    _c = 10.0 * _d[:, 6] + _d[:, 7] + \
+        (np.where(_fd, _d[:, 9:], 0) * (10.0 ** -np.arange(1, _fd.shape[1] + 1))).sum(axis=1)
+    _ok &= (_b < 60.0) & (_c < 60.0) & ((_a < 24.0) if hours else True)
+    _ret = np.full(_n, np.nan)
+    _ret[_ok] = (_sign * (_a + _b / 60.0 + _c / 3600.0) * (15.0 if hours else 1.0))[_ok]
+    return _ret, _ok
+
+
+# +
+# function: sexagesimal_to_decimal_array()
+# -
+def sexagesimal_to_decimal_array(values=None, hours=False):
+    """ return numpy array of decimal degrees for a list or array of [+-]aa:bb:cc[.ddd] strings, nan if invalid """
+    import numpy as np
+
+    # strip whitespace and any unit suffix
+    _raw = np.asarray(values, dtype=str).ravel()
+    _v = np.char.strip(_raw)
+    if _raw.size and np.any(np.char.endswith(_v, 's') | np.char.endswith(_v, 'S')):
+        _v = np.char.strip(np.char.replace(np.char.lower(_v), 'hours' if hours else 'degrees', ''))
+    _ret, _ok = parse_sexagesimal_array(_v, hours=hours)
+
+    # anything else goes through the scalar path (which falls back to astropy)
+    _fn = ra_to_decimal if hours else dec_to_decimal
+    for _i in np.flatnonzero(~_ok):
+        _ret[_i] = _fn(str(_raw[_i]))
+    return _ret
+
+
 # +
 # function: ra_to_decimal()
 # -
@@ -232,6 +342,10 @@ def get_hash(seed=get_isot()):
 def ra_to_decimal(ra='22:35:57.6 hours'):
     """ return RA H:M:S as a decimal """
     try:
+        _ret = sexagesimal_to_decimal(ra.lower().replace('hours', ''), hours=True)
+        if _ret is not None:
+            return _ret
+        from astropy.coordinates import Angle
         ra = f'{ra} hours' if 'hours' not in ra.lower() else ra
         return float(Angle(ra).degree)
     except:
@@ -245,6 +359,10 @@ def ra_to_decimal(ra='22:35:57.6 hours'):
 def dec_to_decimal(dec='33:57:56.0 degrees'):
     """ return Dec d:m:s as a decimal """
     try:
+        _ret = sexagesimal_to_decimal(dec.lower().replace('degrees', ''), hours=False)
+        if _ret is not None:
+            return _ret
+        from astropy.coordinates import Angle
         dec = f'{dec} degrees' if 'degrees' not in dec.lower() else dec
         return float(Angle(dec).degree)
     except:
@@ -252,10 +370,42 @@ def dec_to_decimal(dec='33:57:56.0 degrees'):
 
 
 # +
-# function: fits_to_png()
+# function: ra_to_decimal_array()
+# -
+def ra_to_decimal_array(ra=None):
+    """ return RA H:M:S list or array as a decimal array """
+    return sexagesimal_to_decimal_array(ra, hours=True)
+
+
+# +
+# function: dec_to_decimal_array()
+# -
+def dec_to_decimal_array(dec=None):
+    """ return Dec d:m:s list or array as a decimal array """
+    return sexagesimal_to_decimal_array(dec, hours=False)
+
+
+# +
+# function: image_to_png_buffer()
+# -
+def image_to_png_buffer(_data=None, _log=None):
+    """ return a BytesIO holding the png of encoded image bytes (e.g. a jpeg) or of an array """
+    from PIL import Image
+    _log = _log if isinstance(_log, logging.Logger) else None
+    _img = Image.open(io.BytesIO(_data)) if isinstance(_data, (bytes, bytearray)) else Image.fromarray(_data)
+    _buf = io.BytesIO()
+    _img.save(_buf, format='PNG')
+    _buf.seek(0)
+    if _log:
+        _log.debug(f"converted {_img.format or 'array'} {_img.size} to {_buf.getbuffer().nbytes} bytes of png")
+    return _buf
+
+
+# +
+# function: fits_to_png_buffer()
 # -
 # noinspection PyBroadException
-def fits_to_png(fits_file='', _log=None):
+def fits_to_png_buffer(fits_file='', _log=None, **kw):
 
     # check input(s)
     if not isinstance(fits_file, str) or fits_file.strip() == '':
@@ -271,25 +421,39 @@ def fits_to_png(fits_file='', _log=None):
     if _log:
         _log.info(f"fits_file={fits_file}, log={_log}")
 
-    # get data
-    _data = None
+    # render (memory-mapped, block-averaged and stretched to 8-bit, see fits_render.py for the option(s))
+    from src.fits_render import render_fits
     try:
-        _data = fits.getdata(fits_file)
-    except:
-        raise Exception(f'unable to read {fits_file}')
+        _data = render_fits(fits_file=fits_file, _log=_log, **kw)
+    except Exception as _e:
+        raise Exception(f'unable to read {fits_file}, error={_e}')
+
+    # convert
+    return image_to_png_buffer(_data, _log=_log)
+
+
+# +
+# function: fits_to_png()
+# -
+# noinspection PyBroadException
+def fits_to_png(fits_file='', _log=None, **kw):
+
+    # convert
+    _buf = fits_to_png_buffer(fits_file=fits_file, _log=_log, **kw)
 
     # write output
-    if _data is not None:
-        _img = Image.fromarray(_data)
-        _img.save(fits_file.replace('.fits', '.png'))
-        return os.path.abspath(os.path.expanduser(fits_file.replace('.fits', '.png')))
+    if _buf is not None:
+        _png = os.path.abspath(os.path.expanduser(fits_file)).replace('.fits', '.png')
+        with open(_png, 'wb') as _f:
+            _f.write(_buf.getbuffer())
+        return _png
 
 
 # +
-# function: get_finder_chart()
+# function: get_finder_chart_bytes()
 # -
 # noinspection PyBroadException
-def get_finder_chart(**kw):
+def get_finder_chart_bytes(**kw):
 
     # get critical input(s): RA, Dec
     try:
@@ -297,37 +461,63 @@ def get_finder_chart(**kw):
         _dec = kw['dec']
     except Exception as _v:
         print(f"invalid input(s), error={_v}")
-        return ''
+        return b''
 
     # get logger
     _log = kw['log'] if ('log' in kw and isinstance(kw['log'], logging.Logger)) else None
 
     # set default(s) [NB: plate scale default is 2x the SDSS value]
-    _ra_str = _ra.replace('.', '').replace(':', '').replace(' ', '').strip()[:6]
-    _dec_str = _dec.replace('.', '').replace(':', '').replace(' ', '').replace('-', '').replace('+', '').strip()[:6]
-    _scale = kw['scale'] if ('scale' in kw and isinstance(kw['scale'], float) and kw['scale'].strip != '') else 0.79224
-    _width = kw['width'] if ('width' in kw and isinstance(kw['width'], int) and kw['width'].strip != '') else 400
-    _height = kw['height'] if ('height' in kw and isinstance(kw['height'], int) and kw['height'].strip != '') else 400
-    _opt = kw['opt'] if ('opt' in kw and isinstance(kw['opt'], str) and kw['opt'].strip != '') else 'GL'
+    _scale = kw['scale'] if ('scale' in kw and isinstance(kw['scale'], float) and kw['scale'].strip != '') else \
+        SDSS_SCALE
+    _width = kw['width'] if ('width' in kw and isinstance(kw['width'], int) and kw['width'].strip != '') else SDSS_WIDTH
+    _height = kw['height'] if ('height' in kw and isinstance(kw['height'], int) and kw['height'].strip != '') else \
+        SDSS_HEIGHT
+    _opt = kw['opt'] if ('opt' in kw and isinstance(kw['opt'], str) and kw['opt'].strip != '') else SDSS_OPT
     _query = kw['query'] if ('query' in kw and isinstance(kw['query'], str) and kw['query'].strip != '') else ''
-    _jpg = kw['jpg'] if ('jpg' in kw and isinstance(kw['jpg'], str) and kw['jpg'].strip != '') else \
-        f'sdss_{_ra_str}_{_dec_str}.jpg'
     _url, _req = f"{SDSS_URL}?ra={ra_to_decimal(_ra)}&dec={dec_to_decimal(_dec)}&scale={_scale}&" \
                  f"width={_width}&height={_height}&opt={_opt}&query={_query}", None
 
     # request data
+    import requests
     if _log:
-        _log.debug(f"_url={_url}, _jpg={_jpg}")
+        _log.debug(f"_url={_url}")
     try:
         _req = requests.get(url=f'{_url}')
     except Exception as _e:
         raise Exception(f"failed to complete request, _req={_req}, error={_e}")
 
-    # if everything is ok, create the jpg image and return the path
+    # if everything is ok, return the jpg image
     if _req is not None and hasattr(_req, 'status_code') and _req.status_code == 200 and hasattr(_req, 'content'):
+        return _req.content
+    return b''
+
+
+# +
+# function: get_finder_chart()
+# -
+# noinspection PyBroadException
+def get_finder_chart(**kw):
+
+    # get critical input(s): RA, Dec
+    try:
+        _ra = kw['ra']
+        _dec = kw['dec']
+    except Exception as _v:
+        print(f"invalid input(s), error={_v}")
+        return ''
+
+    # set default(s)
+    _ra_str = _ra.replace('.', '').replace(':', '').replace(' ', '').strip()[:6]
+    _dec_str = _dec.replace('.', '').replace(':', '').replace(' ', '').replace('-', '').replace('+', '').strip()[:6]
+    _jpg = kw['jpg'] if ('jpg' in kw and isinstance(kw['jpg'], str) and kw['jpg'].strip != '') else \
+        f'sdss_{_ra_str}_{_dec_str}.jpg'
+
+    # if everything is ok, create the jpg image and return the path
+    _data = get_finder_chart_bytes(**kw)
+    if _data:
         try:
             with open(_jpg, 'wb') as _f:
-                _f.write(_req.content)
+                _f.write(_data)
             return os.path.abspath(os.path.expanduser(_jpg))
         except:
             return ''
@@ -350,13 +540,23 @@ def jpg_to_png(_jpg='', _log=None):
     # convert
     try:
         _png = _jpg.replace('.jpg', '.png')
-        _data = Image.open(_jpg)
-        _data.save(_png)
+        with open(_jpg, 'rb') as _f:
+            _buf = image_to_png_buffer(_f.read(), _log=_log)
+        with open(_png, 'wb') as _f:
+            _f.write(_buf.getbuffer())
         return _png
     except:
         return ''
 
 
+# +
+# function: jpg_to_png_bytes()
+# -
+def jpg_to_png_bytes(_data=b''):
+    """ return the png bytes of jpeg bytes, picklable for a process pool """
+    return image_to_png_buffer(_data).getvalue()
+
+
 # +
 # function: http_status()
 # -
@@ -374,34 +574,123 @@ def http_status(_code=-1):
 # noinspection PyBroadException
 def verify_keys(_input=None, _keys=None):
     try:
-        return all(_k in _keys for _k in _input)
+        return (_keys if isinstance(_keys, frozenset) else frozenset(_keys)).issuperset(_input)
     except:
         return False
 
 
+# +
+# class: TargetRecord() is a compact, immutable catalogTarget record with one field per MMT_JSON_KEYS entry
+# -
+TargetRecord = namedtuple('TargetRecord', MMT_JSON_KEYS, defaults=(None, ) * len(MMT_JSON_KEYS))
+
+
+# +
+# function: to_record()
+# -
+def to_record(_json=None):
+    """ return a catalogTarget dictionary as a TargetRecord (absent key(s) are None) """
+    return TargetRecord._make(map(_json.get, MMT_JSON_KEYS))
+
+
+# +
+# function: iter_json_array()
+# -
+def iter_json_array(_chunks=None):
+    """ yield the element(s) of a JSON array from an iterable of byte chunk(s) as each one completes, none if empty """
+    _decoder, _text, _buf, _started = json.JSONDecoder(), codecs.getincrementaldecoder('utf-8')(), '', False
+    _chunks = iter(_chunks or [])
+    _done = False
+    while not _done:
+        _chunk = next(_chunks, None)
+        _done = _chunk is None
+        _buf += _text.decode(_chunk or b'', final=_done)
+        _pos, _len = 0, len(_buf)
+        while True:
+            while _pos < _len and _buf[_pos] in ' \t\r\n,':
+                _pos += 1
+            if _pos >= _len:
+                break
+            if not _started:
+                if _buf[_pos] != '[':
+                    raise ValueError(f'not a json array at {_buf[_pos:_pos + 32]!r}')
+                _started, _pos = True, _pos + 1
+                continue
+            if _buf[_pos] == ']':
+                return
+
+            # an element touching the end of the buffer may be incomplete (e.g. a number) until the last chunk
+            try:
+                _element, _end = _decoder.raw_decode(_buf, _pos)
+            except ValueError:
+                if _done:
+                    raise
+                break
+            if _end >= _len and not _done:
+                break
+            yield _element
+            _pos = _end
+        _buf = _buf[_pos:]
+
+    # an empty (or whitespace only) body is no data, as in parse_response()
+    if not _started:
+        return
+    raise ValueError('unterminated json array')
+
+
+# +
+# function: iter_records()
+# -
+# noinspection PyBroadException
+def iter_records(_req=None, _log=None, typed=False, chunk_size=MMT_STREAM_CHUNK):
+    """
+    yield the catalogTarget record(s) of a list response (ideally requested with stream=True) one at a time as they
+    are decoded, as TargetRecord(s) if typed: element(s) that are not target record(s) are skipped
+    """
+    _log = _log if isinstance(_log, logging.Logger) else None
+    if _req is None or getattr(_req, 'status_code', None) != 200:
+        if _log:
+            _log.info(f"received no record(s), status={getattr(_req, 'status_code', None)}")
+        return
+    _n = 0
+    for _json in iter_json_array(_req.iter_content(chunk_size=chunk_size)):
+        if isinstance(_json, dict) and MMT_JSON_KEYS_SET.issuperset(_json):
+            _n += 1
+            yield to_record(_json) if typed else _json
+        elif _log:
+            _log.warning(f"skipped (json) {str(_json)[:80]}")
+    if _log:
+        _log.info(f"received {_n} record(s)")
+
+
 # +
 # function: parse_response()
 # -
 # noinspection PyBroadException
-def parse_response(_req=None, _log=None):
+def parse_response(_req=None, _log=None, typed=False):
+    """ return a 200 target record (a TargetRecord if typed) decoded from the body bytes, else the body text """
     _log = _log if isinstance(_log, logging.Logger) else None
     if _req is not None and hasattr(_req, 'status_code') and \
             http_status(int(_req.status_code)) and hasattr(_req, 'text'):
         if _req.status_code == 200:
             try:
-                _json = json.loads(_req.text)
+                _json = json_loads(_req.content)
             except:
                 _json = {}
-            if verify_keys(_json, MMT_JSON_KEYS):
+            if isinstance(_json, dict) and MMT_JSON_KEYS_SET.issuperset(_json):
                 if _log:
-                    _log.info(f"received (json) {_json}")
-                return _json
+                    _log.info(f"received (json) id={_json.get('id', None)}, objectid={_json.get('objectid', None)}")
+                    if _log.isEnabledFor(logging.DEBUG):
+                        _log.debug(f"received (json) {_json}")
+                return to_record(_json) if typed else _json
             else:
                 if _log:
                     _log.info(f"received (text) {_req.text}")
                 return _req.text
         else:
-            if _log:
+            if _log and _req.status_code in (429, 503):
+                _log.warning(f"throttled (text) {_req.text}, status={_req.status_code}")
+            elif _log:
                 _log.info(f"received (text) {_req.text}, status={_req.status_code}")
             return _req.text
 
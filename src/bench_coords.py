@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from astropy.coordinates import Angle
+from src import *
+
+import numpy as np
+
+import argparse
+import random
+import time
+
+
+# +
+# __doc__
+# -
+__doc__ = """
+  % python3 bench_coords.py --help
+"""
+
+
+# +
+# function: astropy_ra_to_decimal()
+# -
+def astropy_ra_to_decimal(ra=''):
+    """ reference: the astropy Angle path ra_to_decimal() used to take for every value """
+    return float(Angle(f'{ra} hours').degree)
+
+
+# +
+# function: bench_coords()
+# -
+def bench_coords(_nelms=100000, _seed=0):
+    """ return {label: (microseconds/call, seconds/million)} and the maximum deviation from astropy """
+
+    random.seed(_seed)
+    _ras = [f'{random.randint(0, 23):02d}:{random.randint(0, 59):02d}:{random.uniform(0.0, 59.999):06.3f}'
+            for _ in range(_nelms)]
+    _ret = {}
+
+    # astropy is slow so time a subset of it
+    _sub = _ras[:min(_nelms, 5000)]
+    _t0 = time.perf_counter()
+    _ref = [astropy_ra_to_decimal(_r) for _r in _sub]
+    _dt = (time.perf_counter() - _t0) / len(_sub)
+    _ret['astropy'] = (_dt * 1.0e6, _dt * 1.0e6)
+
+    _t0 = time.perf_counter()
+    _fast = [ra_to_decimal(_r) for _r in _ras]
+    _dt = (time.perf_counter() - _t0) / _nelms
+    _ret['ra_to_decimal'] = (_dt * 1.0e6, _dt * 1.0e6)
+
+    _t0 = time.perf_counter()
+    _vec = ra_to_decimal_array(_ras)
+    _dt = (time.perf_counter() - _t0) / _nelms
+    _ret['ra_to_decimal_array'] = (_dt * 1.0e6, _dt * 1.0e6)
+
+    _dev = max(max(abs(_a - _b) for _a, _b in zip(_ref, _fast)), float(np.max(np.abs(_vec[:len(_ref)] - _ref))))
+    return _ret, _dev
+
+
+# +
+# main()
+# -
+if __name__ == '__main__':
+
+    # noinspection PyTypeChecker
+    _p = argparse.ArgumentParser(description=f'Benchmark Coordinate Parsing',
+                                 formatter_class=argparse.RawTextHelpFormatter)
+    _p.add_argument(f'--nelms', default=100000, help=f"""Number of coordinates, defaults to %(default)s""")
+    args = _p.parse_args()
+
+    # execute
+    _res, _max = bench_coords(_nelms=int(args.nelms))
+    for _k, (_us, _sm) in _res.items():
+        print(f"{_k:>20s}: {_us:10.3f} us/call {_sm:12.3f} s/million")
+    print(f"{'max |delta|':>20s}: {_max:.3e} deg")
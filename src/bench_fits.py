@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from src.fits_render import *
+
+import json
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+
+# +
+# __doc__
+# -
+__doc__ = """
+    % python3 bench_fits.py --help
+"""
+
+
+# +
+# constant(s)
+# -
+MMT_HOME = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# +
+# function: make_frame()
+# -
+def make_frame(_file='', _size=4096):
+    """ write a Mont4k-like uint16 (int16 + BZERO=32768) frame """
+    from astropy.io import fits
+    _data = np.random.default_rng(0).normal(1000.0, 20.0, (_size, _size)).astype(np.uint16)
+    fits.PrimaryHDU(data=_data).writeto(_file, overwrite=True)
+
+
+# +
+# function: legacy_fits_to_png()
+# -
+def legacy_fits_to_png(fits_file=''):
+    """ reference: the fits.getdata() + Image.fromarray() path fits_to_png() used to take """
+    from astropy.io import fits
+    from PIL import Image
+    _buf = io.BytesIO()
+    Image.fromarray(fits.getdata(fits_file)).save(_buf, format='PNG')
+    return _buf
+
+
+# +
+# function: run_one()
+# -
+def run_one(_label='', _file=''):
+    """ convert once in this process, return (seconds, peak rss MB, output bytes) """
+    _t0 = time.perf_counter()
+    if _label == 'legacy':
+        _buf = legacy_fits_to_png(_file)
+    else:
+        _buf = image_to_png_buffer(render_fits(_file, stretch=_label.split()[-1]))
+    return time.perf_counter() - _t0, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, \
+        _buf.getbuffer().nbytes
+
+
+# +
+# function: bench_fits()
+# -
+def run(_args=None):
+    """ run this script in a fresh process (peak rss is inherited by children so keep this one small) """
+    _env = {**os.environ, **{'PYTHONPATH': os.pathsep.join([MMT_HOME, os.getenv('PYTHONPATH', '')])}}
+    return subprocess.run([sys.executable, os.path.abspath(__file__)] + _args, env=_env, capture_output=True,
+                          text=True, check=True).stdout
+
+
+# +
+# function: bench_fits()
+# -
+def bench_fits(_file='', _labels=('legacy', 'render percentile', 'render zscale')):
+    """ return {label: (seconds, peak rss MB, output bytes)}, each measured in a fresh process """
+    return {_label: tuple(json.loads(run([f'--run={_label}', f'--file={_file}']))) for _label in _labels}
+
+
+# +
+# main()
+# -
+if __name__ == '__main__':
+
+    # noinspection PyTypeChecker
+    _p = argparse.ArgumentParser(description=f'Benchmark FITS to PNG', formatter_class=argparse.RawTextHelpFormatter)
+    _p.add_argument(f'--file', default='', help=f"""existing FITS file instead, defaults to '%(default)s'""")
+    _p.add_argument(f'--run', default='', help=f"""(internal) run one conversion and print the result""")
+    _p.add_argument(f'--size', default=4096, help=f"""synthetic frame size, defaults to %(default)s""")
+    args = _p.parse_args()
+
+    # execute
+    if args.run.strip() == 'make':
+        make_frame(args.file, int(args.size))
+        sys.exit(0)
+    elif args.run.strip() != '':
+        print(json.dumps(run_one(args.run, args.file)))
+        sys.exit(0)
+    _tmp = ''
+    if args.file.strip() == '':
+        _tmp = tempfile.mkdtemp(prefix='bench_fits_')
+        args.file = os.path.join(_tmp, 'frame.fits')
+        run(['--run=make', f'--file={args.file}', f'--size={int(args.size)}'])
+    try:
+        for _k, (_s, _mb, _n) in bench_fits(args.file).items():
+            print(f"{_k:>18s}: {_s:8.3f} s {_mb:8.1f} MB peak rss {_n:10d} bytes of png")
+    finally:
+        if _tmp != '':
+            shutil.rmtree(_tmp, ignore_errors=True)
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from src.bench_validate import make_payloads
+from src.mmt import *
+from src.mmt_server import MMTFaults
+from src.mmt_server import start_server
+
+import argparse
+import random
+import tempfile
+import time
+
+
+# +
+# __doc__
+# -
+__doc__ = """
+  % python3 bench_mmt.py --help
+  % python3 bench_mmt.py --seconds=10 --workers=8 --latency=0.005 --error-rate=0.01 --max-p99=50
+"""
+
+
+# +
+# constant(s)
+# -
+BENCH_MIX = 'GET=60,PUT=20,POST=15,UPLOAD=4,DELETE=1'
+
+
+# +
+# function: get_mix()
+# -
+def get_mix(_mix=BENCH_MIX):
+    """ return {action: weight} from 'GET=60,PUT=20,...' """
+    _ret = {}
+    for _item in _mix.split(','):
+        _k, _v = _item.split('=')
+        if _k.strip().upper() not in HTTP_ACTIONS:
+            raise Exception(f'invalid action {_k}, choices: {list(HTTP_ACTIONS)}')
+        _ret[_k.strip().upper()] = float(_v)
+    return _ret
+
+
+# +
+# function: get_percentile()
+# -
+def get_percentile(_values=None, _q=0.5):
+    """ return the nearest-rank q-quantile of sorted value(s) """
+    return _values[min(len(_values) - 1, max(0, math.ceil(_q * len(_values)) - 1))] if _values else 0.0
+
+
+# +
+# function: bench_mmt()
+# -
+# noinspection PyBroadException
+def bench_mmt(_url='', _seconds=10.0, _workers=4, _mix=BENCH_MIX, _targets=100, _seed=0, _token=MMT_TOKEN,
+              _retries=0, _log=None):
+    """
+    run a sustained mixed workload through mmt_target() for _seconds with _workers thread(s) sharing one client
+    (retrying _retries time(s), every action included), return {action: {count, ok, failed, rate, p50, p99, max}}
+    with latency in millisecond(s)
+    """
+
+    # seed target(s) so GET / PUT / UPLOAD / DELETE have something to work on
+    _client = MMTClient(url=_url, pool_size=max(_workers, 1), retries=_retries)
+    _payloads = make_payloads(_n=max(_targets, 1) * 4, _invalid=0.0, _seed=_seed, _types=('imaging', ))
+    _ids, _lock = [], threading.Lock()
+    for _p in _payloads[:_targets]:
+        _ans = mmt_target(action='POST', payload=json.dumps(_p), token=_token, client=_client, log=_log)
+        if isinstance(_ans, dict) and 'id' in _ans:
+            _ids.append(_ans['id'])
+    if not _ids:
+        raise Exception(f'failed to create target(s) at {_url}')
+
+    # a small png for UPLOAD
+    _png = tempfile.NamedTemporaryFile(suffix='.png', delete=False)
+    from PIL import Image
+    Image.new('L', (64, 64), 128).save(_png, format='PNG')
+    _png.close()
+
+    _actions = get_mix(_mix)
+    _latency = {_k: [] for _k in _actions}
+    _failed = {_k: 0 for _k in _actions}
+    _deadline = time.perf_counter() + _seconds
+
+    def _worker(_n=0):
+        _rng = random.Random(_seed + _n)
+        _names, _weights = list(_actions), list(_actions.values())
+        while time.perf_counter() < _deadline:
+            _action = _rng.choices(_names, _weights)[0]
+            with _lock:
+                _targetid = _ids.pop(_rng.randrange(len(_ids))) if _action == 'DELETE' and len(_ids) > 1 else \
+                    _rng.choice(_ids)
+            _kw = {'action': _action, 'targetid': _targetid, 'token': _token, 'client': _client, 'log': _log,
+                   'cache': False, 'retry': _retries > 0}
+            if _action == 'POST':
+                _kw['payload'] = json.dumps(_rng.choice(_payloads))
+            elif _action == 'PUT':
+                _kw['payload'] = json.dumps({'priority': _rng.choice(MMT_PRIORITY)})
+            elif _action == 'UPLOAD':
+                _kw['file'] = _png.name
+            _t0 = time.perf_counter()
+            try:
+                _ans = mmt_target(**_kw)
+            except Exception:
+                _ans = None
+            _dt = time.perf_counter() - _t0
+            _ok = _ans == 'null' if _action == 'DELETE' else (isinstance(_ans, dict) and 'id' in _ans)
+            with _lock:
+                _latency[_action].append(_dt)
+                if not _ok:
+                    _failed[_action] += 1
+                if _ok and _action == 'POST':
+                    _ids.append(_ans['id'])
+
+    # run
+    _t0 = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=_workers) as _pool:
+            for _f in [_pool.submit(_worker, _i) for _i in range(_workers)]:
+                _f.result()
+    finally:
+        os.remove(_png.name)
+        _client.close()
+    _elapsed = time.perf_counter() - _t0
+
+    # summarize
+    _ret = {}
+    for _k, _v in _latency.items():
+        _v.sort()
+        _ret[_k] = {'count': len(_v), 'ok': len(_v) - _failed[_k], 'failed': _failed[_k],
+                    'rate': len(_v) / _elapsed, 'p50': get_percentile(_v, 0.5) * 1000.0,
+                    'p99': get_percentile(_v, 0.99) * 1000.0, 'max': (_v[-1] if _v else 0.0) * 1000.0}
+    return _ret
+
+
+# +
+# main()
+# -
+if __name__ == '__main__':
+
+    # noinspection PyTypeChecker
+    _p = argparse.ArgumentParser(description=f'Benchmark mmt_target() Action(s)',
+                                 formatter_class=argparse.RawTextHelpFormatter)
+    _p.add_argument(f'--error-rate', default=0.0, help=f"""Stand-in server error rate, defaults to %(default)s""")
+    _p.add_argument(f'--jitter', default=0.0, help=f"""Stand-in server jitter (s), defaults to %(default)s""")
+    _p.add_argument(f'--json', default='', help=f"""Also write the result(s) to this JSON file""")
+    _p.add_argument(f'--latency', default=0.0, help=f"""Stand-in server latency (s), defaults to %(default)s""")
+    _p.add_argument(f'--max-p99', default=0.0,
+                    help=f"""Exit 1 if any action's p99 exceeds this many ms (0 to disable), defaults to %(default)s""")
+    _p.add_argument(f'--metrics', default='',
+                    help=f"""Also write per-stage metric(s) to this file (*.json or *.prom)""")
+    _p.add_argument(f'--mix', default=BENCH_MIX, help=f"""Action weight(s), defaults to '%(default)s'""")
+    _p.add_argument(f'--rate', default=0.0,
+                    help=f"""Stand-in server 429 limit (request(s)/second, 0 for none), defaults to %(default)s""")
+    _p.add_argument(f'--retries', default=0, help=f"""Client retries per request, defaults to %(default)s""")
+    _p.add_argument(f'--seconds', default=10.0, help=f"""Duration, defaults to %(default)s""")
+    _p.add_argument(f'--seed', default=0, help=f"""Random seed, defaults to %(default)s""")
+    _p.add_argument(f'--targets', default=100, help=f"""Target(s) created up front, defaults to %(default)s""")
+    _p.add_argument(f'--url', default='', help=f"""Server to test (e.g. mmt_server.py), defaults to a stand-in""")
+    _p.add_argument(f'--workers', default=4, help=f"""Worker thread(s), defaults to %(default)s""")
+    args = _p.parse_args()
+
+    # execute against the given server or a stand-in one with the requested fault(s)
+    _server, _url, _token = None, args.url, MMT_TOKEN
+    if _url.strip() == '':
+        _token = 'bench'
+        _server, _url = start_server(faults=MMTFaults(
+            latency=float(args.latency), jitter=float(args.jitter), error_rate=float(args.error_rate),
+            rate=float(args.rate), token=_token, seed=int(args.seed)))
+    if args.metrics.strip() != '':
+        get_metrics().enable()
+    try:
+        _results = bench_mmt(_url=_url, _seconds=float(args.seconds), _workers=int(args.workers), _mix=args.mix,
+                             _targets=int(args.targets), _seed=int(args.seed), _token=_token,
+                             _retries=int(args.retries))
+    finally:
+        if _server is not None:
+            _server.shutdown()
+    if args.metrics.strip() != '':
+        get_metrics().write(args.metrics)
+    if args.json.strip() != '':
+        with open(args.json, 'w') as _f:
+            json.dump(_results, _f, indent=2)
+
+    # report
+    print(f"{'action':>8} {'count':>8} {'failed':>7} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for _k, _v in _results.items():
+        print(f"{_k:>8} {_v['count']:>8} {_v['failed']:>7} {_v['rate']:>9.1f} {_v['p50']:>9.3f} {_v['p99']:>9.3f} "
+              f"{_v['max']:>9.3f}")
+    if _server is not None and _server.faults is not None:
+        print(f"server replies: {_server.faults.stats}")
+    _slow = [_k for _k, _v in _results.items() if float(args.max_p99) > 0.0 and _v['p99'] > float(args.max_p99)]
+    if _slow:
+        print(f"p99 above {float(args.max_p99)} ms: {_slow}")
+        sys.exit(1)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from src.seek import *
+
+import shutil
+import tempfile
+
+
+# +
+# __doc__
+# -
+__doc__ = """
+    % python3 bench_seek.py --help
+"""
+
+
+# +
+# function: make_tree()
+# -
+def make_tree(_root='', _nfiles=100000, _per_dir=500, _type='.fits'):
+    """ create a synthetic night-like tree of _nfiles, half of them of the given type """
+    for _i in range(_nfiles):
+        _dir = os.path.join(_root, f'{_i // (_per_dir * 10):03d}', f'{_i // _per_dir:05d}')
+        if _i % _per_dir == 0:
+            os.makedirs(_dir, exist_ok=True)
+        with open(os.path.join(_dir, f'frame{_i:07d}{_type if _i % 2 == 0 else ".txt"}'), 'wb') as _f:
+            _f.write(b'x')
+
+
+# +
+# function: legacy_walk()
+# -
+def legacy_walk(_path='', _type=''):
+    """ reference: the os.walk + islink + exists + repeated os.stat filter seek() used to apply """
+    _fw = (os.path.join(_root, _file) for _root, _dirs, _files in os.walk(_path) for _file in _files)
+    return [(_k, os.stat(_k).st_ctime) for _k in _fw if (
+        not os.path.islink(f'{_k}') and os.path.exists(f'{_k}') and _k.endswith(f'{_type}') and
+        int(os.stat(f'{_k}').st_size) > 0 and os.stat(_k).st_ctime > 0.0)]
+
+
+# +
+# function: bench_seek()
+# -
+def bench_seek(_path='', _type='.fits', _workers=(1, 4, 8, 16)):
+    """ return {label: (seconds, nfiles)} for the legacy walker and scan() with various worker count(s) """
+    _ret = {}
+    _t0 = time.perf_counter()
+    _n = len(legacy_walk(_path, _type))
+    _ret['legacy os.walk'] = (time.perf_counter() - _t0, _n)
+    for _w in _workers:
+        _t0 = time.perf_counter()
+        _n = sum(len(_f) for _f in scan(_path, _type, _w))
+        _ret[f'scandir workers={_w}'] = (time.perf_counter() - _t0, _n)
+    return _ret
+
+
+# +
+# main()
+# -
+if __name__ == '__main__':
+
+    # noinspection PyTypeChecker
+    _p = argparse.ArgumentParser(description=f'Benchmark Seek Scanner', formatter_class=argparse.RawTextHelpFormatter)
+    _p.add_argument(f'--nfiles', default=100000, help=f"""number of synthetic files, defaults to %(default)s""")
+    _p.add_argument(f'--path', default='', help=f"""existing tree to scan instead, defaults to '%(default)s'""")
+    _p.add_argument(f'--type', default='.fits', help=f"""file type, defaults to %(default)s""")
+    args = _p.parse_args()
+
+    # execute
+    _tmp = ''
+    if args.path.strip() == '':
+        _tmp = tempfile.mkdtemp(prefix='bench_seek_')
+        make_tree(_tmp, int(args.nfiles), _type=args.type)
+    try:
+        for _k, (_s, _n) in bench_seek(args.path if _tmp == '' else _tmp, args.type).items():
+            print(f"{_k:>20s}: {_s:8.3f} s {_n:8d} files {_n / _s:12.1f} files/s")
+    finally:
+        if _tmp != '':
+            shutil.rmtree(_tmp, ignore_errors=True)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from src.mmt import *
+from src.mmt_server import start_server
+
+import argparse
+import time
+
+
+# +
+# __doc__
+# -
+__doc__ = """
+  % python3 bench_session.py --help
+"""
+
+
+# +
+# function: bench_session()
+# -
+def bench_session(_nreqs=500, _pool_size=MMT_POOL_SIZE):
+    """ return {label: requests/second} for unpooled and pooled GET(s) against a local stand-in server """
+
+    _server, _url = start_server()
+    _id = _server.store.create({'objectid': 'bench'})['id']
+    _ret = {}
+    try:
+        # unpooled: module-level requests.get() opens a new connection every time
+        _t0 = time.perf_counter()
+        for _ in range(_nreqs):
+            requests.get(url=f'{_url}/{_id}')
+        _ret['unpooled'] = _nreqs / (time.perf_counter() - _t0)
+
+        # pooled: keep-alive session re-uses one connection
+        with MMTClient(url=_url, pool_size=_pool_size) as _client:
+            _t0 = time.perf_counter()
+            for _ in range(_nreqs):
+                _client.get(url=f'{_url}/{_id}')
+            _ret['pooled'] = _nreqs / (time.perf_counter() - _t0)
+
+            # pooled, end-to-end through get_action() and parse_response()
+            _t0 = time.perf_counter()
+            for _ in range(_nreqs):
+                get_action(**{'targetid': _id, 'client': _client})
+            _ret['get_action'] = _nreqs / (time.perf_counter() - _t0)
+    finally:
+        _server.shutdown()
+    return _ret
+
+
+# +
+# main()
+# -
+if __name__ == '__main__':
+
+    # noinspection PyTypeChecker
+    _p = argparse.ArgumentParser(description=f'Benchmark Pooled Session', formatter_class=argparse.RawTextHelpFormatter)
+    _p.add_argument(f'--nreqs', default=500, help=f"""Number of requests, defaults to %(default)s""")
+    _p.add_argument(f'--pool-size', default=MMT_POOL_SIZE, help=f"""Pool size, defaults to %(default)s""")
+    args = _p.parse_args()
+
+    # execute
+    for _k, _v in bench_session(_nreqs=int(args.nreqs), _pool_size=int(args.pool_size)).items():
+        print(f"{_k:>10s}: {_v:10.1f} requests/second")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from src.mmt_server import start_server
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+# +
+# __doc__
+# -
+__doc__ = """
+  % python3 bench_startup.py --help
+"""
+
+
+# +
+# constant(s)
+# -
+MMT_HOME = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MMT_SRC = os.path.join(MMT_HOME, 'src')
+PAYLOAD = {'dec': '+33:57:36', 'exposuretime': 300.0, 'filter': 'r', 'magnitude': 15.0, 'objectid': 'bench_startup',
+           'observationtype': 'imaging', 'ra': '22:35:58'}
+
+
+# +
+# function: parse_importtime()
+# -
+def parse_importtime(_stderr=''):
+    """ return (total seconds, number of modules, [(cumulative seconds, module), ...] for top-level imports) """
+    _total, _n, _top = 0, 0, []
+    for _line in _stderr.splitlines():
+        if not _line.startswith('import time:') or 'self [us]' in _line:
+            continue
+        _self, _cumulative, _name = _line[len('import time:'):].split('|')
+        _total, _n = _total + int(_self), _n + 1
+        if not _name.startswith('  '):
+            _top.append((int(_cumulative) / 1.0e6, _name.strip()))
+    return _total / 1.0e6, _n, sorted(_top, reverse=True)
+
+
+# +
+# function: run()
+# -
+def run(_args=None, _cwd=MMT_HOME):
+    """ return (wall seconds, import seconds, number of modules, top imports) of one cold python process """
+    _env = {**os.environ, **{'PYTHONPATH': os.pathsep.join([MMT_HOME, MMT_SRC, os.getenv('PYTHONPATH', '')])}}
+    _t0 = time.perf_counter()
+    _p = subprocess.run([sys.executable, '-X', 'importtime'] + _args, cwd=_cwd, env=_env, capture_output=True,
+                        text=True)
+    _wall = time.perf_counter() - _t0
+    return (_wall, ) + parse_importtime(_p.stderr)
+
+
+# +
+# function: bench_startup()
+# -
+def bench_startup(_repeat=3):
+    """ return {label: (wall, imports, nmodules, top)} per mmt.py action and seek.py, best of _repeat """
+
+    _server, _url = start_server()
+    _tmp = tempfile.mkdtemp(prefix='bench_startup_')
+    _png = os.path.join(_tmp, 'chart.png')
+    with open(_png, 'wb') as _f:
+        _f.write(b'\x89PNG\r\n\x1a\n')
+    _mmt = os.path.join(MMT_SRC, 'mmt.py')
+    _id = _server.store.create({'objectid': 'bench_startup', 'ra': '22:35:58', 'dec': '+33:57:36'})['id']
+    _cmds = {
+        'DELETE': [_mmt, '--action=DELETE', f'--targetid={_id + 1000000}', f'--url={_url}'],
+        'GET': [_mmt, '--action=GET', f'--targetid={_id}', f'--url={_url}'],
+        'POST': [_mmt, '--action=POST', f'--payload={json.dumps(PAYLOAD)}', f'--url={_url}'],
+        'PUT': [_mmt, '--action=PUT', f'--targetid={_id}', '--payload={"filter": "z"}', f'--url={_url}'],
+        'UPLOAD': [_mmt, '--action=UPLOAD', f'--targetid={_id}', f'--file={_png}', f'--url={_url}'],
+        'seek.py': [os.path.join(MMT_SRC, 'seek.py'), f'--path={_tmp}', '--nelms=1'],
+    }
+    try:
+        return {_k: min((run(_v, _tmp) for _ in range(_repeat)), key=lambda _r: _r[0]) for _k, _v in _cmds.items()}
+    finally:
+        _server.shutdown()
+
+
+# +
+# main()
+# -
+if __name__ == '__main__':
+
+    # noinspection PyTypeChecker
+    _p = argparse.ArgumentParser(description=f'Benchmark Cold Start', formatter_class=argparse.RawTextHelpFormatter)
+    _p.add_argument(f'--repeat', default=3, help=f"""best of repeat(s), defaults to %(default)s""")
+    _p.add_argument(f'--top', default=3, help=f"""heaviest top-level import(s) to show, defaults to %(default)s""")
+    args = _p.parse_args()
+
+    # execute
+    for _k, (_wall, _imports, _n, _top) in bench_startup(_repeat=int(args.repeat)).items():
+        _heavy = ', '.join(f'{_m} {_s * 1000.0:.0f}ms' for _s, _m in _top[:int(args.top)])
+        print(f"{_k:>8s}: wall {_wall * 1000.0:7.1f} ms, imports {_imports * 1000.0:7.1f} ms in {_n:4d} modules "
+              f"[{_heavy}]")
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from src.mmt_bulk import *
+
+import argparse
+import random
+import time
+
+
+# +
+# __doc__
+# -
+__doc__ = """
+    % python3 bench_validate.py --help
+"""
+
+
+# +
+# function: make_payloads()
+# -
+def make_payloads(_n=100000, _invalid=0.1, _seed=0, _types=('imaging', 'longslit')):
+    """ return _n payload(s) cycling through _types, a fraction _invalid of them with a bad RA """
+    _rng = random.Random(_seed)
+    _ret = []
+    for _i in range(_n):
+        _payload = {'dec': f'{_rng.choice("+-")}{_rng.randint(0, 89):02d}:{_rng.randint(0, 59):02d}:'
+                           f'{_rng.uniform(0.0, 59.9):04.1f}',
+                    'exposuretime': 300.0, 'magnitude': _rng.uniform(10.0, 20.0), 'objectid': f'bench_{_i}',
+                    'ra': f'{_rng.randint(0, 23):02d}:{_rng.randint(0, 59):02d}:{_rng.uniform(0.0, 59.9):04.1f}'}
+        if _types[_i % len(_types)] != 'longslit':
+            _payload.update({'filter': _rng.choice(MMT_IMAGING_FILTERS), 'observationtype': 'imaging'})
+        else:
+            _payload.update({'centralwavelength': _rng.uniform(5600.0, 7800.0), 'filter': 'LP3800',
+                             'grating': '270', 'observationtype': 'longslit'})
+        if _rng.random() < _invalid:
+            _payload['ra'] = '24:00:00'
+        _ret.append(_payload)
+    return _ret
+
+
+# +
+# function: bench_validate()
+# -
+def bench_validate(_payloads=None):
+    """ return {label: (seconds, accepted)} for verify_payload(), validate_payload() and validate_table() """
+    _ret = {}
+    for _label, _func in (('verify_payload', lambda _p: verify_payload(_p)),
+                          ('validate_payload', lambda _p: validate_payload(_p)[0])):
+        _t0 = time.perf_counter()
+        _n = sum(1 for _p in _payloads if _func(_p) != {})
+        _ret[_label] = (time.perf_counter() - _t0, _n)
+
+    # bulk: from the record(s) as they are, and from typed column(s) as a DataFrame or Arrow table would give
+    _columns = {_k: np.asarray([_p.get(_k, MMT_SPECTROSCOPY_PAYLOAD[_k]) for _p in _payloads])
+                for _k in ('ra', 'dec', 'filter', 'observationtype', 'objectid', 'exposuretime', 'magnitude',
+                           'grating', 'centralwavelength')}
+    for _label, _table, _flag in (('validate_table', _payloads, True), ('validate_table cols', _columns, True),
+                                  ('validate_table mask', _columns, False)):
+        _t0 = time.perf_counter()
+        _n = int(validate_table(_table, payloads=_flag)[0].sum())
+        _ret[_label] = (time.perf_counter() - _t0, _n)
+    return _ret
+
+
+# +
+# main()
+# -
+if __name__ == '__main__':
+
+    # noinspection PyTypeChecker
+    _p = argparse.ArgumentParser(description=f'Benchmark Payload Validation',
+                                 formatter_class=argparse.RawTextHelpFormatter)
+    _p.add_argument(f'--invalid', default=0.1, help=f"""fraction of invalid payload(s), defaults to %(default)s""")
+    _p.add_argument(f'--number', default=100000, help=f"""number of payload(s), defaults to %(default)s""")
+    _p.add_argument(f'--types', default='imaging,longslit', help=f"""observation type(s), defaults to '%(default)s'""")
+    args = _p.parse_args()
+
+    # execute
+    _payloads = make_payloads(int(args.number), float(args.invalid), _types=tuple(args.types.split(',')))
+    for _k, (_s, _n) in bench_validate(_payloads).items():
+        print(f"{_k:>20s}: {_s:8.3f} s {len(_payloads) / _s:12.1f} validations/s {_n:8d} accepted")
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+import importlib.util
+import os
+import sys
+
+
+# +
+# __doc__
+# -
+__doc__ = """
+  pytest set-up: mmt_token.py holds the user's credential(s) and is not tracked, so without one the test(s)
+  import the values of mmt_token.template.py as src.mmt_token
+"""
+
+
+# +
+# token(s)
+# -
+if importlib.util.find_spec('src.mmt_token') is None:
+    _spec = importlib.util.spec_from_file_location(
+        'src.mmt_token', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mmt_token.template.py'))
+    sys.modules['src.mmt_token'] = importlib.util.module_from_spec(_spec)
+    _spec.loader.exec_module(sys.modules['src.mmt_token'])
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from src.fits_render import *
+from src.seek import get_isot
+from src.seek import seek_iter
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import as_completed
+
+import heapq
+import time
+
+
+# +
+# __doc__
+# -
+__doc__ = """
+  from src.fits_bulk import *
+  _summary = bulk_fits_to_png(begin='2024-01-01T12:00:00', end='2024-01-02T12:00:00', path='/rts2data')
+
+  % python3 fits_bulk.py --help
+"""
+
+
+# +
+# constant(s)
+# -
+FITS_BULK_CHECKS = ('hash', 'mtime', 'none')
+FITS_BULK_KEY = 'mmt_fits_bulk'
+FITS_BULK_WORKERS = os.cpu_count() or 1
+
+
+# +
+# function: get_png_name()
+# -
+def get_png_name(fits_file='', output_dir=''):
+    """ return the png path for a FITS file, next to it or in output_dir """
+    _name = os.path.basename(fits_file)
+    for _ext in ('.fits.gz', '.fits.fz', '.fits', '.fit', '.fts'):
+        if _name.lower().endswith(_ext):
+            _name = _name[:-len(_ext)]
+            break
+    return os.path.join(output_dir or os.path.dirname(fits_file), f'{_name}.png')
+
+
+# +
+# function: get_signature()
+# -
+def get_signature(fits_file='', options=None):
+    """ return the sha256 of the FITS content and the render option(s) """
+    _h = hashlib.sha256(json.dumps(options or {}, sort_keys=True).encode('utf-8'))
+    with open(fits_file, 'rb') as _f:
+        for _chunk in iter(lambda: _f.read(1024 * 1024), b''):
+            _h.update(_chunk)
+    return _h.hexdigest()
+
+
+# +
+# function: is_up_to_date()
+# -
+# noinspection PyBroadException
+def is_up_to_date(fits_file='', png_file='', check='mtime', signature=''):
+    """ return True if png_file is newer than fits_file (mtime) or was rendered from the same content (hash) """
+    if check == 'none' or not os.path.exists(png_file):
+        return False
+    if check == 'mtime':
+        return os.stat(png_file).st_mtime_ns >= os.stat(fits_file).st_mtime_ns
+    try:
+        from PIL import Image
+        with Image.open(png_file) as _img:
+            return _img.text.get(FITS_BULK_KEY, '') == signature
+    except Exception:
+        return False
+
+
+# +
+# function: convert_one()
+# -
+# noinspection PyBroadException
+def convert_one(fits_file='', png_file='', check='mtime', options=None):
+    """ process pool worker: render one FITS file unless its png is up to date, return a result dictionary """
+    _t0 = time.perf_counter()
+    _ret = {'fits': fits_file, 'png': png_file, 'status': 'failed', 'seconds': 0.0, 'error': None}
+    _tmp = f'{png_file}.{os.getpid()}.tmp'
+    try:
+        _signature = get_signature(fits_file, options) if check == 'hash' else ''
+        if is_up_to_date(fits_file, png_file, check, _signature):
+            _ret['status'] = 'skipped'
+        else:
+            from PIL import Image
+            from PIL.PngImagePlugin import PngInfo
+            _info = PngInfo()
+            if _signature != '':
+                _info.add_text(FITS_BULK_KEY, _signature)
+            Image.fromarray(render_fits(fits_file=fits_file, **(options or {}))).save(_tmp, format='PNG',
+                                                                                       pnginfo=_info)
+            os.replace(_tmp, png_file)
+            _ret['status'] = 'converted'
+    except Exception as _e:
+        _ret['error'] = f'{_e}'
+        if os.path.exists(_tmp):
+            os.remove(_tmp)
+    _ret['seconds'] = round(time.perf_counter() - _t0, 6)
+    return _ret
+
+
+# +
+# function: get_files()
+# -
+def get_files(files=None, begin='', end='', path='', _type='.fits', nelms=0):
+    """ return the FITS file(s) to convert: the given list, else those of a seek query, oldest first """
+    if files:
+        return [os.path.abspath(os.path.expanduser(_f)) for _f in files]
+
+    # unlike seek(), keep file(s) that share a jd
+    _pairs = list(seek_iter(_begin=begin, _end=end or get_isot(), _path=path or os.getcwd(), _type=_type))
+    _pairs = heapq.nlargest(nelms, _pairs) if nelms > 0 else _pairs
+    return [_f for _, _f in sorted(_pairs)]
+
+
+# +
+# function: bulk_iter()
+# -
+def bulk_iter(files=None, output_dir='', check='mtime', workers=FITS_BULK_WORKERS, log=None, **options):
+    """ yield convert_one() result(s) in completion order, rendering on a process pool """
+
+    # check input(s)
+    check = check if check in FITS_BULK_CHECKS else 'mtime'
+    workers = workers if (isinstance(workers, int) and workers > 0) else FITS_BULK_WORKERS
+    log = log if isinstance(log, logging.Logger) else None
+    output_dir = os.path.abspath(os.path.expanduser(output_dir)) if output_dir else ''
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    # execute
+    with ProcessPoolExecutor(max_workers=workers) as _pool:
+        _futures = [_pool.submit(convert_one, _f, get_png_name(_f, output_dir), check, options) for _f in files or []]
+        for _future in as_completed(_futures):
+            _r = _future.result()
+            if log:
+                log.debug(f"{_r}")
+            yield _r
+
+
+# +
+# function: bulk_fits_to_png()
+# -
+def bulk_fits_to_png(files=None, begin='', end='', path='', _type='.fits', nelms=0, output_dir='', check='mtime',
+                     workers=FITS_BULK_WORKERS, log=None, callback=None, **options):
+    """ convert a file list (or seek() query) to png, return a summary with throughput in frames/s """
+    _t0 = time.perf_counter()
+    _files = get_files(files=files, begin=begin, end=end, path=path, _type=_type, nelms=nelms)
+    _summary = {'converted': 0, 'skipped': 0, 'failed': 0, 'seconds': 0.0, 'fps': 0.0}
+    for _r in bulk_iter(files=_files, output_dir=output_dir, check=check, workers=workers, log=log, **options):
+        _summary[_r['status']] += 1
+        if callable(callback):
+            callback(_r)
+    _summary['seconds'] = round(time.perf_counter() - _t0, 6)
+    _summary['fps'] = round(_summary['converted'] / _summary['seconds'], 3) if _summary['seconds'] > 0.0 else 0.0
+    return _summary
+
+
+# +
+# main()
+# -
+if __name__ == '__main__':
+
+    # noinspection PyTypeChecker
+    _p = argparse.ArgumentParser(description=f'Bulk FITS to PNG', formatter_class=argparse.RawTextHelpFormatter)
+    _p.add_argument(f'--begin', default=get_isot(-1), help=f"""begin date, defaults to %(default)s""")
+    _p.add_argument(f'--check', default='mtime', help=f"""up-to-date check, defaults to '%(default)s', choices: """
+                                                       f"""{FITS_BULK_CHECKS}""")
+    _p.add_argument(f'--end', default='', help=f"""end date, defaults to now""")
+    _p.add_argument(f'--max-size', default=FITS_RENDER_MAX_SIZE, help=f"""maximum size, defaults to %(default)s""")
+    _p.add_argument(f'--nelms', default=0, help=f"""number of elements, defaults to %(default)s""")
+    _p.add_argument(f'--output', default='', help=f"""output directory, defaults to next to each FITS file""")
+    _p.add_argument(f'--path', default=os.getcwd(), help=f"""root path, defaults to %(default)s""")
+    _p.add_argument(f'--stretch', default='zscale', help=f"""stretch, defaults to '%(default)s', choices: """
+                                                          f"""{FITS_RENDER_STRETCHES}""")
+    _p.add_argument(f'--type', default='.fits', help=f"""file type, defaults to %(default)s""")
+    _p.add_argument(f'--verbose', default=False, action='store_true', help=f'if present, produce verbose output')
+    _p.add_argument(f'--workers', default=FITS_BULK_WORKERS, help=f"""process(es), defaults to %(default)s""")
+    _p.add_argument(f'files', nargs='*', help=f"""FITS file(s), defaults to the seek() query""")
+    args = _p.parse_args()
+
+    # execute
+    _summary = bulk_fits_to_png(files=args.files, begin=args.begin, end=args.end, path=args.path, _type=args.type,
+                                nelms=int(args.nelms), output_dir=args.output, check=args.check,
+                                workers=int(args.workers),
+                                callback=(lambda _r: print(json.dumps(_r))) if bool(args.verbose) else None,
+                                max_size=int(args.max_size), stretch=args.stretch)
+    print(f"{_summary['converted']} converted, {_summary['skipped']} skipped, {_summary['failed']} failed in "
+          f"{_summary['seconds']:.3f} s ({_summary['fps']:.1f} frames/s)")
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from src import *
+
+import argparse
+import numpy as np
+
+
+# +
+# __doc__
+# -
+__doc__ = """
+  from src.fits_render import *
+  _img = render_fits('frame.fits', ra='22:35:58', dec='+33:57:36', size=600, stretch='zscale')
+
+  % python3 fits_render.py --help
+"""
+
+
+# +
+# constant(s)
+# -
+FITS_RENDER_CONTRAST = 0.25
+FITS_RENDER_MAX_SIZE = 1024
+FITS_RENDER_PERCENTILES = (0.5, 99.5)
+FITS_RENDER_SAMPLES = 100000
+FITS_RENDER_STRETCHES = ('linear', 'percentile', 'zscale')
+FITS_RENDER_STRIP_BYTES = 4 * 1024 * 1024
+
+
+# +
+# function: get_image_hdu()
+# -
+def get_image_hdu(_hdul=None, _hdu=None):
+    """ return the HDU selected by index or EXTNAME, else the first one holding an image of 2 or more axes """
+    if isinstance(_hdu, (int, str)) and f'{_hdu}'.strip() != '':
+        return _hdul[_hdu]
+    for _h in _hdul:
+        if _h.is_image and int(_h.header.get('NAXIS', 0)) >= 2:
+            return _h
+    raise Exception(f'no image HDU found')
+
+
+# +
+# function: get_cutout_box()
+# -
+def get_cutout_box(_header=None, _shape=(0, 0), _ra='', _dec='', _size=0):
+    """ return (y0, y1, x0, x1) of a _size x _size pixel box centred on RA, Dec, clipped to _shape """
+    from astropy.wcs import WCS
+    _ra_deg, _dec_deg = ra_to_decimal(_ra), dec_to_decimal(_dec)
+    if math.isnan(_ra_deg) or math.isnan(_dec_deg):
+        raise Exception(f'invalid input(s), ra={_ra}, dec={_dec}')
+    _wcs = WCS(_header).celestial
+    if not _wcs.has_celestial:
+        raise Exception(f'no celestial WCS in header')
+    _x, _y = (float(_v) for _v in _wcs.all_world2pix(_ra_deg, _dec_deg, 0))
+    _half = _size // 2
+    _y0, _x0 = max(0, int(round(_y)) - _half), max(0, int(round(_x)) - _half)
+    _y1, _x1 = min(_shape[0], _y0 + _size), min(_shape[1], _x0 + _size)
+    if _y1 <= _y0 or _x1 <= _x0:
+        raise Exception(f'RA, Dec is outside the image, x={_x:.1f}, y={_y:.1f}')
+    return _y0, _y1, _x0, _x1
+
+
+# +
+# function: block_average()
+# -
+def block_average(_section=None, _box=(0, 0, 0, 0), _block=1, _lead=(), _scale=(1.0, 0.0, None)):
+    """ return the float32 block-average of raw _section[_box] * BSCALE + BZERO, reading a strip of rows at a time """
+    _bscale, _bzero, _blank = _scale
+    _y0, _y1, _x0, _x1 = _box
+    _ny, _nx = (_y1 - _y0) // _block, (_x1 - _x0) // _block
+    _out = np.empty((_ny, _nx), dtype=np.float32)
+    _rows = max(1, FITS_RENDER_STRIP_BYTES // max(1, 4 * _block * _block * _nx))
+    for _j in range(0, _ny, _rows):
+        _k = min(_ny, _j + _rows)
+        _strip = np.asarray(_section[_lead + (slice(_y0 + _j * _block, _y0 + _k * _block),
+                                              slice(_x0, _x0 + _nx * _block))])
+        _raw, _strip = _strip, _strip.astype(np.float32)
+        if _blank is not None:
+            _strip[_raw == _blank] = np.nan
+        if _bscale != 1.0 or _bzero != 0.0:
+            _strip *= _bscale
+            _strip += _bzero
+        _out[_j:_k] = _strip.reshape(_k - _j, _block, _nx, _block).mean(axis=(1, 3)) if _block > 1 else _strip
+    return _out
+
+
+# +
+# function: get_samples()
+# -
+def get_samples(_data=None, _n=FITS_RENDER_SAMPLES):
+    """ return up to _n finite pixel(s) taken at a regular stride """
+    _flat = _data.ravel()
+    _flat = _flat[::max(1, _flat.size // _n)]
+    return _flat[np.isfinite(_flat)]
+
+
+# +
+# function: zscale_limits()
+# -
+def zscale_limits(_samples=None, _contrast=FITS_RENDER_CONTRAST, _rej=2.5, _iterations=5, _min_fraction=0.5):
+    """ return (lo, hi) of the IRAF zscale algorithm: an iteratively clipped line fit to the sorted sample(s) """
+    _y = np.sort(_samples.astype(np.float64))
+    _n = _y.size
+    if _n == 0:
+        return 0.0, 1.0
+    _median = float(np.median(_y))
+    _x = np.arange(_n, dtype=np.float64) - (_n - 1) / 2.0
+    _good = np.ones(_n, dtype=bool)
+    _slope = 0.0
+    for _ in range(_iterations):
+        if _good.sum() < max(5, int(_min_fraction * _n)):
+            break
+        _slope, _intercept = np.polyfit(_x[_good], _y[_good], 1)
+        _resid = _y - (_slope * _x + _intercept)
+        _sigma = float(np.std(_resid[_good]))
+        _new = np.abs(_resid) < _rej * max(_sigma, 1.0e-30)
+        if np.array_equal(_new, _good):
+            break
+        _good = _new
+    _slope = _slope / _contrast if _contrast > 0.0 else _slope
+    _lo = max(_y[0], _median - (_n - 1) / 2.0 * _slope)
+    _hi = min(_y[-1], _median + (_n - 1) / 2.0 * _slope)
+    return (float(_lo), float(_hi)) if _hi > _lo else (float(_y[0]), float(_y[-1]))
+
+
+# +
+# function: get_limits()
+# -
+def get_limits(_data=None, _stretch='zscale', _percentiles=FITS_RENDER_PERCENTILES, _contrast=FITS_RENDER_CONTRAST):
+    """ return (lo, hi) display limit(s) of _data """
+    _samples = get_samples(_data)
+    if _samples.size == 0:
+        return 0.0, 1.0
+    if _stretch == 'zscale':
+        return zscale_limits(_samples, _contrast=_contrast)
+    if _stretch == 'percentile':
+        _lo, _hi = np.percentile(_samples, _percentiles)
+        return float(_lo), float(_hi)
+    return float(_samples.min()), float(_samples.max())
+
+
+# +
+# function: to_uint8()
+# -
+def to_uint8(_data=None, _lo=0.0, _hi=1.0):
+    """ linearly map [_lo, _hi] to [0, 255] in place, non-finite pixel(s) become 0 """
+    _data -= _lo
+    _data *= 255.0 / (_hi - _lo) if _hi > _lo else 0.0
+    np.clip(_data, 0.0, 255.0, out=_data)
+    np.nan_to_num(_data, copy=False, nan=0.0)
+    return _data.astype(np.uint8)
+
+
+# +
+# function: render_fits()
+# -
+# noinspection PyBroadException
+def render_fits(fits_file='', hdu=None, ra='', dec='', size=0, block=0, max_size=FITS_RENDER_MAX_SIZE,
+                stretch='zscale', percentiles=FITS_RENDER_PERCENTILES, contrast=FITS_RENDER_CONTRAST, _log=None):
+    """
+    return an 8-bit image (north up) of a FITS image HDU: the file is memory-mapped and only the (optional)
+    RA, Dec cutout is read, strip by strip, while block-averaging by block (or enough to fit max_size)
+    """
+
+    # check input(s)
+    if not isinstance(fits_file, str) or fits_file.strip() == '':
+        raise Exception(f'invalid input, fits_file={fits_file}')
+    fits_file = os.path.abspath(os.path.expanduser(fits_file))
+    if not os.path.exists(fits_file):
+        raise Exception(f'input not found, fits_file={fits_file}')
+    if stretch not in FITS_RENDER_STRETCHES:
+        raise Exception(f'invalid input, stretch={stretch}')
+    _log = _log if isinstance(_log, logging.Logger) else None
+
+    # read the selected section (scaling is applied per strip so that the raw data stays memory-mapped)
+    from astropy.io import fits
+    with fits.open(fits_file, memmap=True, lazy_load_hdus=True, do_not_scale_image_data=True) as _hdul:
+        _hdu = get_image_hdu(_hdul, hdu)
+        _shape = tuple(int(_hdu.header[f'NAXIS{_i}']) for _i in range(int(_hdu.header['NAXIS']), 0, -1))
+        _lead, _shape = (0, ) * (len(_shape) - 2), _shape[-2:]
+        _box = get_cutout_box(_hdu.header, _shape, ra, dec, int(size)) \
+            if (isinstance(size, int) and size > 0 and ra and dec) else (0, _shape[0], 0, _shape[1])
+        _block = block if (isinstance(block, int) and block > 0) else \
+            max(1, math.ceil(max(_box[1] - _box[0], _box[3] - _box[2]) / max(1, int(max_size))))
+        _scale = (float(_hdu.header.get('BSCALE', 1.0)), float(_hdu.header.get('BZERO', 0.0)),
+                  _hdu.header.get('BLANK', None) if int(_hdu.header['BITPIX']) > 0 else None)
+        _data = block_average(_hdu.section, _box, _block, _lead, _scale)
+    if _log:
+        _log.debug(f"fits_file={fits_file}, shape={_shape}, box={_box}, block={_block}, out={_data.shape}")
+
+    # stretch to 8-bit and flip so that north is up
+    _lo, _hi = get_limits(_data, stretch, percentiles, contrast)
+    return np.flipud(to_uint8(_data, _lo, _hi))
+
+
+# +
+# main()
+# -
+if __name__ == '__main__':
+
+    # noinspection PyTypeChecker
+    _p = argparse.ArgumentParser(description=f'Render FITS to PNG', formatter_class=argparse.RawTextHelpFormatter)
+    _p.add_argument(f'--block', default=0, help=f"""block-average factor (0 = fit max-size), defaults to %(default)s""")
+    _p.add_argument(f'--dec', default='', help=f"""cutout Dec, defaults to '%(default)s'""")
+    _p.add_argument(f'--file', default='', help=f"""FITS file, defaults to '%(default)s'""")
+    _p.add_argument(f'--hdu', default='', help=f"""HDU index or EXTNAME, defaults to the first image""")
+    _p.add_argument(f'--max-size', default=FITS_RENDER_MAX_SIZE, help=f"""maximum size, defaults to %(default)s""")
+    _p.add_argument(f'--output', default='', help=f"""PNG file, defaults to the FITS file with .png""")
+    _p.add_argument(f'--ra', default='', help=f"""cutout RA, defaults to '%(default)s'""")
+    _p.add_argument(f'--size', default=0, help=f"""cutout size in pixels (0 = whole image), defaults to %(default)s""")
+    _p.add_argument(f'--stretch', default='zscale', help=f"""stretch, defaults to '%(default)s', choices: """
+                                                          f"""{FITS_RENDER_STRETCHES}""")
+    args = _p.parse_args()
+
+    # execute
+    _hdu = int(args.hdu) if args.hdu.strip().isdigit() else (args.hdu.strip() or None)
+    _buf = image_to_png_buffer(render_fits(fits_file=args.file, hdu=_hdu, ra=args.ra, dec=args.dec,
+                                           size=int(args.size), block=int(args.block), max_size=int(args.max_size),
+                                           stretch=args.stretch))
+    _out = args.output.strip() or os.path.abspath(os.path.expanduser(args.file)).replace('.fits', '.png')
+    with open(_out, 'wb') as _f:
+        _f.write(_buf.getbuffer())
+    print(f"{_out}")
@@ -4,11 +4,24 @@
 # +
 # import(s)
 # -
+from src.mmt_cache import *
+from src.mmt_client import *
+from src.mmt_metrics import *
 from src.mmt_parameters import *
+from src.mmt_schema import *
 from src.mmt_token import *
 
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
+from contextlib import nullcontext
+
 import argparse
+import atexit
+import csv
 import shutil
+import sys
+import threading
+import time
 
 
 # +
@@ -33,6 +46,9 @@ def delete_action(**kwargs):
     targetid = kwargs['targetid'] if \
         ('targetid' in kwargs and isinstance(kwargs['targetid'], int) and kwargs['targetid'] > 0) \
         else MMT_TARGETID
+    client = kwargs['client'] if ('client' in kwargs and isinstance(kwargs['client'], MMTClient)) else get_client()
+    timeout = kwargs['timeout'] if ('timeout' in kwargs and isinstance(kwargs['timeout'], (int, float, tuple))) \
+        else None
     log = kwargs['log'] if ('log' in kwargs and isinstance(kwargs['log'], logging.Logger)) else None
     if log:
         log.debug(f"delete_action(kwargs={kwargs})")
@@ -40,14 +56,15 @@ def delete_action(**kwargs):
     # execute
     _data, _req = 'null', None
     if log:
-        log.debug(f"sending {_data} to {MMT_URL}/{targetid}/")
+        log.debug(f"sending {_data} to {client.url}/{targetid}/")
     try:
-        _req = requests.delete(url=f'{MMT_URL}/{targetid}')
+        _req = client.delete(url=f'{client.url}/{targetid}', timeout=timeout)
     except Exception as _e:
         if log:
             log.error(f"failed to complete DELETE request, _req={_req}, error={_e}")
     else:
-        return parse_response(_req=_req, _log=log)
+        with get_metrics().timer('parse'):
+            return parse_response(_req=_req, _log=log)
 
 
 # +
@@ -64,6 +81,9 @@ def get_action(**kwargs):
     targetid = kwargs['targetid'] if \
         ('targetid' in kwargs and isinstance(kwargs['targetid'], int) and kwargs['targetid'] > 0) \
         else MMT_TARGETID
+    client = kwargs['client'] if ('client' in kwargs and isinstance(kwargs['client'], MMTClient)) else get_client()
+    timeout = kwargs['timeout'] if ('timeout' in kwargs and isinstance(kwargs['timeout'], (int, float, tuple))) \
+        else None
     log = kwargs['log'] if ('log' in kwargs and isinstance(kwargs['log'], logging.Logger)) else None
     if log:
         log.debug(f"get_action(kwargs={kwargs})")
@@ -71,14 +91,15 @@ def get_action(**kwargs):
     # execute
     _data, _req = 'null', None
     if log:
-        log.debug(f"sending {_data} to {MMT_URL}/{targetid}/")
+        log.debug(f"sending {_data} to {client.url}/{targetid}/")
     try:
-        _req = requests.get(url=f'{MMT_URL}/{targetid}')
+        _req = client.get(url=f'{client.url}/{targetid}', timeout=timeout)
     except Exception as _e:
         if log:
             log.error(f"failed to complete GET request, _req={_req}, error={_e}")
     else:
-        return parse_response(_req=_req, _log=log)
+        with get_metrics().timer('parse'):
+            return parse_response(_req=_req, _log=log)
 
 
 # +
@@ -104,40 +125,34 @@ def post_action(**kwargs):
     token = kwargs['token'] if \
         ('token' in kwargs and isinstance(kwargs['token'], str) and kwargs['token'] != '') \
         else MMT_TOKEN
+    client = kwargs['client'] if ('client' in kwargs and isinstance(kwargs['client'], MMTClient)) else get_client()
+    timeout = kwargs['timeout'] if ('timeout' in kwargs and isinstance(kwargs['timeout'], (int, float, tuple))) \
+        else None
+    retry = bool(kwargs['retry']) if ('retry' in kwargs and isinstance(kwargs['retry'], bool)) else False
     log = kwargs['log'] if ('log' in kwargs and isinstance(kwargs['log'], logging.Logger)) else None
     if log:
         log.debug(f"post_action(kwargs={kwargs})")
 
-    # execute
-    _data, _req, _otype = None, None, None
-    if 'observationtype' not in payload:
-        if log:
-            log.error(f"failed to find key 'observationtype' in {payload}")
+    # execute (payload(s) from batch_action() are verified up front)
+    _data, _req = payload, None
+    if not bool(kwargs.get('verified', False)):
+        with get_metrics().timer('validate'):
+            _data = validate_payload(payload=payload, _log=log)[0]
+    if _data == {}:
         return
-    else:
-        _otype = payload['observationtype'].strip().lower()
-        if _otype == 'imaging':
-            _data = verify_imaging_payload(payload=payload, _log=log)
-        elif _otype == 'longslit':
-            _data = verify_spectroscopy_payload(payload=payload, _log=log)
-        elif _otype == 'mask':
-            _data = verify_imaging_payload(payload=payload, _log=log)
-        else:
-            if log:
-                log.error(f"invalid key 'observationtype'={_otype}")
-            return
 
     _data = {**_data, **{'catalogid': catalogid, 'program_id': programid, 'token': token}}
 
     if log:
-        log.debug(f"sending {_data} to {MMT_URL}/?token={token}")
+        log.debug(f"sending {_data} to {client.url}/?token={token}")
     try:
-        _req = requests.post(url=f'{MMT_URL}/?{token}', json=_data)
+        _req = client.post(url=f'{client.url}/?token={token}', json=_data, retry=retry, timeout=timeout)
     except Exception as _e:
         if log:
             log.error(f"failed to complete POST request, _req={_req}, error={_e}")
     else:
-        return parse_response(_req=_req, _log=log)
+        with get_metrics().timer('parse'):
+            return parse_response(_req=_req, _log=log)
 
 
 # +
@@ -166,6 +181,9 @@ def put_action(**kwargs):
     token = kwargs['token'] if \
         ('token' in kwargs and isinstance(kwargs['token'], str) and kwargs['token'] != '') \
         else MMT_TOKEN
+    client = kwargs['client'] if ('client' in kwargs and isinstance(kwargs['client'], MMTClient)) else get_client()
+    timeout = kwargs['timeout'] if ('timeout' in kwargs and isinstance(kwargs['timeout'], (int, float, tuple))) \
+        else None
     log = kwargs['log'] if ('log' in kwargs and isinstance(kwargs['log'], logging.Logger)) else None
     if log:
         log.debug(f"put_action(kwargs={kwargs})")
@@ -173,14 +191,15 @@ def put_action(**kwargs):
     # execute
     _data, _req = {**payload, **{'catalogid': catalogid, 'program_id': programid, 'token': token}}, None
     if log:
-        log.debug(f"sending {_data} to {MMT_URL}/{targetid}/")
+        log.debug(f"sending {_data} to {client.url}/{targetid}/")
     try:
-        _req = requests.put(url=f'{MMT_URL}/{targetid}/', json=_data)
+        _req = client.put(url=f'{client.url}/{targetid}/', json=_data, timeout=timeout)
     except Exception as _e:
         if log:
             log.error(f"failed to complete PUT request, _req={_req}, error={_e}")
     else:
-        return parse_response(_req=_req, _log=log)
+        with get_metrics().timer('parse'):
+            return parse_response(_req=_req, _log=log)
 
 
 # +
@@ -209,39 +228,81 @@ def upload_action(**kwargs):
     token = kwargs['token'] if \
         ('token' in kwargs and isinstance(kwargs['token'], str) and kwargs['token'] != '') \
         else MMT_TOKEN
+    save = os.path.abspath(os.path.expanduser(kwargs['save'])) if \
+        ('save' in kwargs and isinstance(kwargs['save'], str) and kwargs['save'].strip() != '') else ''
+    client = kwargs['client'] if ('client' in kwargs and isinstance(kwargs['client'], MMTClient)) else get_client()
+    timeout = kwargs['timeout'] if ('timeout' in kwargs and isinstance(kwargs['timeout'], (int, float, tuple))) \
+        else None
+    retry = bool(kwargs['retry']) if ('retry' in kwargs and isinstance(kwargs['retry'], bool)) else False
+    cache = kwargs['cache'] if ('cache' in kwargs and isinstance(kwargs['cache'], FinderCache)) else None
     log = kwargs['log'] if ('log' in kwargs and isinstance(kwargs['log'], logging.Logger)) else None
     if log:
         log.debug(f"upload_action(kwargs={kwargs})")
 
-    # if file is not specified, use SDSS
-    if file == '':
-        _json = get_action(**{'targetid': targetid})
-        _ra, _dec = _json['ra'], _json['dec']
-        file = get_finder_chart(**{'ra': _ra, 'dec': _dec, 'log': log, 'jpg': f'{targetid}.jpg'})
-        file = jpg_to_png(_jpg=file, _log=log)
+    # use the default finder chart cache unless cache=False, or go without it if it cannot be created
+    if cache is None and kwargs.get('cache', None) is not False:
+        try:
+            cache = get_cache()
+        except Exception as _e:
+            if log:
+                log.warning(f"finder chart cache unavailable, error={_e}")
 
-    # convert to png (if required)
-    elif file.endswith('fits') or file.endswith('fits.gz'):
-        file = fits_to_png(fits_file=file, _log=log)
-        _file = f'{os.getcwd()}/{targetid}.png'
-        file = shutil.move(file, _file)
+    # get the png as a buffer: from SDSS (via the finder chart cache unless it is disabled), FITS or file
+    _buf = None
+    try:
+        if file == '':
+            _json = get_action(**{'targetid': targetid, 'client': client, 'log': log, 'timeout': timeout})
+            _ra, _dec, _name = _json['ra'], _json['dec'], f'{targetid}.png'
+            if cache is not None:
+                _png = get_finder_png(cache=cache, **{'ra': _ra, 'dec': _dec, 'log': log})
+                _buf = open(_png, 'rb') if _png != '' else None
+            else:
+                with get_metrics().timer('finder'):
+                    _jpg = get_finder_chart_bytes(**{'ra': _ra, 'dec': _dec, 'log': log})
+                with get_metrics().timer('convert'):
+                    _buf = image_to_png_buffer(_jpg, _log=log) if _jpg else None
+        elif file.endswith('fits') or file.endswith('fits.gz'):
+            with get_metrics().timer('convert'):
+                _buf, _name = fits_to_png_buffer(fits_file=file, _log=log), f'{targetid}.png'
+        else:
+            _buf, _name = open(file, 'rb'), os.path.basename(file)
+    except Exception as _e:
+        if _buf is not None:
+            _buf.close()
+        if log:
+            log.error(f"failed to get finding chart, file={file}, error={_e}")
+        return
+    if _buf is None:
+        if log:
+            log.error(f"failed to get finding chart, file={file}")
+        return
+    _name = kwargs['findingchartfilename'] if \
+        ('findingchartfilename' in kwargs and isinstance(kwargs['findingchartfilename'], str) and
+         kwargs['findingchartfilename'].strip() != '') else _name
 
-    # execute
-    _img = open(os.path.basename(file), 'rb')
+    # execute (the png is only written to disk if save is set)
     _data, _files, _req = {'type': 'finding_chart', 'token': token, 'catalogid': catalogid,
                            'program_id': programid, 'target_id': targetid,
-                           'findingchartfilename': os.path.basename(file)}, {'finding_chart_file': _img}, None
+                           'findingchartfilename': _name}, {'finding_chart_file': (_name, _buf)}, None
     if log:
         log.debug(f"file={file}")
-        log.debug(f"sending {_data} to {MMT_URL}/{targetid}/")
-        log.debug(f"sending {_img} to {MMT_URL}/{targetid}/")
+        log.debug(f"sending {_data} to {client.url}/{targetid}/")
+        log.debug(f"sending {_name} to {client.url}/{targetid}/")
     try:
-        _req = requests.post(url=f'{MMT_URL}/{targetid}/', files=_files, data=_data)
+        if save != '':
+            with open(save, 'wb') as _f:
+                shutil.copyfileobj(_buf, _f)
+            _buf.seek(0)
+        _req = client.post(url=f'{client.url}/{targetid}/', files=_files, data=_data, retry=retry,
+                              timeout=timeout)
     except Exception as _e:
         if log:
             log.error(f"failed to complete UPLOAD request, _req={_req}, error={_e}")
     else:
-        return parse_response(_req=_req, _log=log)
+        with get_metrics().timer('parse'):
+            return parse_response(_req=_req, _log=log)
+    finally:
+        _buf.close()
 
 
 # +
@@ -256,7 +317,8 @@ HTTP_ACTIONS = {'DELETE': delete_action, 'GET': get_action, 'POST': post_action,
 # -
 # noinspection PyBroadException
 def mmt_target(action='GET', catalogid=MMT_CATALOGID, file='', payload='',
-               programid=MMT_PROGRAMID, targetid=MMT_TARGETID, token=MMT_TOKEN, log=None):
+               programid=MMT_PROGRAMID, targetid=MMT_TARGETID, token=MMT_TOKEN, log=None, client=None, cache=None,
+               save='', retry=False):
 
     # set variable(s)
     _action = HTTP_ACTIONS.get(action.upper(), None)
@@ -270,11 +332,125 @@ def mmt_target(action='GET', catalogid=MMT_CATALOGID, file='', payload='',
     _targetid = targetid if (isinstance(targetid, int) and targetid > 0) else MMT_TARGETID
     _token = token if (isinstance(token, str) and token.strip() != '') else MMT_TOKEN
     log = log if isinstance(log, logging.Logger) else None
+    client = client if isinstance(client, MMTClient) else get_client()
+    cache = cache if (isinstance(cache, FinderCache) or cache is False) else None
+    _save = save if (isinstance(save, str) and save.strip() != '') else ''
 
     # execute
     if _action is not None:
-        _action(**{'action': action.upper(), 'catalogid': _catalogid, 'file': _file, 'payload': _payload,
-                   'programid': _programid, 'targetid': _targetid, 'token': _token, 'log': log})
+        with get_metrics().timer(f'action_{action.lower()}'):
+            return _action(**{'action': action.upper(), 'catalogid': _catalogid, 'file': _file, 'payload': _payload,
+                              'programid': _programid, 'targetid': _targetid, 'token': _token, 'log': log,
+                              'client': client, 'cache': cache, 'save': _save, 'retry': bool(retry)})
+
+
+# +
+# function: read_batch()
+# -
+# noinspection PyBroadException
+def read_batch(file='', log=None):
+    """ return list of (record, payload, error) from a JSONL or CSV file of payload(s) """
+
+    # check input(s)
+    log = log if isinstance(log, logging.Logger) else None
+    file = os.path.abspath(os.path.expanduser(file)) if isinstance(file, str) else ''
+    if file == '' or not os.path.exists(file):
+        raise Exception(f'file not found, file={file}')
+
+    # csv values are strings so coerce them to the type(s) of the default payload
+    def _coerce(_row):
+        _defaults = MMT_SPECTROSCOPY_PAYLOAD if str(_row.get('observationtype', '')).strip().lower() == 'longslit' \
+            else MMT_IMAGING_PAYLOAD
+        _out = {}
+        for _k, _v in _row.items():
+            if _k is None or _v is None or _v.strip() == '':
+                continue
+            try:
+                _t = type(_defaults.get(_k, ''))
+                _out[_k] = _t(_v.strip()) if _t in (float, int) else _v.strip()
+            except:
+                _out[_k] = _v.strip()
+        return _out
+
+    # read record(s)
+    _ret = []
+    with open(file, 'r') as _f:
+        if file.lower().endswith('.csv'):
+            for _i, _row in enumerate(csv.DictReader(_f), start=1):
+                _ret.append((_i, _coerce(_row), None))
+        else:
+            for _i, _line in enumerate(_f, start=1):
+                if _line.strip() == '':
+                    continue
+                try:
+                    _payload = json.loads(_line)
+                    _ret.append((_i, _payload, None) if isinstance(_payload, dict) else (_i, {}, 'not a json object'))
+                except Exception as _e:
+                    _ret.append((_i, {}, f'invalid json, error={_e}'))
+    if log:
+        log.debug(f"read {len(_ret)} record(s) from {file}")
+    return _ret
+
+
+# +
+# function: batch_action()
+# -
+# noinspection PyBroadException
+def batch_action(file='', output=None, workers=MMT_POOL_SIZE, catalogid=MMT_CATALOGID, programid=MMT_PROGRAMID,
+                 token=MMT_TOKEN, log=None, client=None, retry=False):
+    """ verify all payload(s) in file then POST the valid one(s) concurrently, writing one result line each """
+
+    # check input(s)
+    log = log if isinstance(log, logging.Logger) else None
+    workers = workers if (isinstance(workers, int) and workers > 0) else MMT_POOL_SIZE
+    output = output if hasattr(output, 'write') else sys.stdout
+    client = client if isinstance(client, MMTClient) else get_client(pool_size=workers)
+    _lock, _results = threading.Lock(), []
+
+    def _write(_result):
+        with _lock:
+            _results.append(_result)
+            output.write(f"{json.dumps(_result)}\n")
+            output.flush()
+
+    # verify everything up front, reporting all failure(s) per record
+    _valid = []
+    for _i, _payload, _error in read_batch(file=file, log=log):
+        _data = {}
+        if _error is None:
+            try:
+                with get_metrics().timer('validate'):
+                    _data, _errors = validate_payload(payload=_payload, _log=log)
+                _error = '; '.join(_errors.values()) if _errors else None
+            except Exception as _e:
+                _error = f'{_e}'
+        if _data == {}:
+            _write({'record': _i, 'objectid': _payload.get('objectid', None), 'targetid': None,
+                    'status': 'invalid', 'latency': 0.0, 'error': _error or 'payload failed verification'})
+        else:
+            _valid.append((_i, _data))
+
+    # submit valid payload(s) with bounded parallelism
+    def _submit(_i, _data):
+        _t0, _ans, _error = time.perf_counter(), None, None
+        try:
+            with get_metrics().timer('action_post'):
+                _ans = post_action(**{'catalogid': catalogid, 'payload': _data, 'programid': programid,
+                                      'token': token, 'verified': True, 'client': client, 'log': log,
+                                      'retry': bool(retry)})
+        except Exception as _e:
+            _error = f'{_e}'
+        _ok = isinstance(_ans, dict) and 'id' in _ans
+        return {'record': _i, 'objectid': _data.get('objectid', None), 'targetid': _ans['id'] if _ok else None,
+                'status': 'submitted' if _ok else 'failed', 'latency': round(time.perf_counter() - _t0, 6),
+                'error': None if _ok else (_error or f'{_ans}')}
+
+    with ThreadPoolExecutor(max_workers=workers) as _pool:
+        for _f in as_completed([_pool.submit(_submit, _i, _data) for _i, _data in _valid]):
+            _write(_f.result())
+
+    # return
+    return _results
 
 
 # +
@@ -286,13 +462,29 @@ if __name__ == '__main__':
     _p = argparse.ArgumentParser(description=f'MMT Target Loader', formatter_class=argparse.RawTextHelpFormatter)
     _p.add_argument(f'--action', default='GET',
                     help=f"""Action, defaults to '%(default)s', choices: {list(HTTP_ACTIONS.keys())}""")
+    _p.add_argument(f'--batch', default='',
+                    help=f"""Batch file (JSONL or CSV) of payload(s) to POST, defaults to '%(default)s'""")
+    _p.add_argument(f'--cache', default=MMT_CACHE_DIR,
+                    help=f"""Finder chart cache directory ('' to disable), defaults to '%(default)s'""")
     _p.add_argument(f'--catalogid', default=MMT_CATALOGID, help=f"""Catalog ID, defaults to %(default)s""")
     _p.add_argument(f'--file', default='', help=f"""File, defaults to '%(default)s'""")
+    _p.add_argument(f'--metrics', default='',
+                    help=f"""Write per-stage metric(s) to this file on exit (*.json or Prometheus text)""")
+    _p.add_argument(f'--output', default='', help=f"""Batch result file, defaults to stdout""")
     _p.add_argument(f'--payload', default='{}', help=f"""Payload, defaults to %(default)s""")
     _p.add_argument(f'--programid', default=MMT_PROGRAMID, help=f"""Program ID, defaults to %(default)s""")
+    _p.add_argument(f'--rate', default=MMT_RATE,
+                    help=f"""Request(s) per second (0 for no limit), defaults to %(default)s""")
+    _p.add_argument(f'--retries', default=MMT_RETRIES, help=f"""Retries per request, defaults to %(default)s""")
+    _p.add_argument(f'--retry', default=False, action='store_true',
+                    help=f'if present, retry POST and UPLOAD too (they are not idempotent)')
+    _p.add_argument(f'--save', default='',
+                    help=f"""Also write the uploaded png to this file, defaults to '%(default)s'""")
     _p.add_argument(f'--targetid', default=MMT_TARGETID, help=f"""Target ID, defaults to %(default)s""")
     _p.add_argument(f'--token', default=MMT_TOKEN, help=f"""Token, defaults to %(default)s""")
+    _p.add_argument(f'--url', default=MMT_URL, help=f"""catalogTarget URL, defaults to %(default)s""")
     _p.add_argument(f'--verbose', default=False, action='store_true', help=f'if present, produce verbose output')
+    _p.add_argument(f'--workers', default=MMT_POOL_SIZE, help=f"""Batch worker(s), defaults to %(default)s""")
 
     # get command line argument(s)
     args = _p.parse_args()
@@ -300,6 +492,20 @@ if __name__ == '__main__':
     # get logger (if required)
     _log = Logger('MMT').logger if bool(args.verbose) else None
 
+    # collect metric(s) if required, written on any exit
+    if args.metrics.strip() != '':
+        atexit.register(get_metrics().enable().write, args.metrics)
+
     # execute
+    _client = get_client(url=args.url, pool_size=max(int(args.workers), MMT_POOL_SIZE), rate=float(args.rate),
+                         retries=int(args.retries))
+    if args.batch.strip() != '':
+        with (open(args.output, 'w') if args.output.strip() != '' else nullcontext(sys.stdout)) as _out:
+            batch_action(file=args.batch, output=_out, workers=int(args.workers), catalogid=int(args.catalogid),
+                         programid=int(args.programid), token=args.token, log=_log, client=_client,
+                         retry=bool(args.retry))
+        sys.exit(0)
+    _cache = FinderCache(path=args.cache, log=_log) if args.cache.strip() != '' else False
     mmt_target(action=args.action, catalogid=int(args.catalogid), file=args.file, payload=args.payload,
-               programid=int(args.programid), targetid=int(args.targetid), token=args.token, log=_log)
+               programid=int(args.programid), targetid=int(args.targetid), token=args.token, log=_log,
+               client=_client, cache=_cache, save=args.save, retry=bool(args.retry))
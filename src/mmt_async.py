@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from src.mmt import *
+
+from concurrent.futures import ThreadPoolExecutor
+
+import asyncio
+import functools
+import weakref
+
+
+# +
+# __doc__
+# -
+__doc__ = """
+  import asyncio
+  from src.mmt_async import *
+
+  async def main():
+      async with MMTAsyncClient(concurrency=64, timeout=30.0) as _c:
+          return await _c.gather('GET', [{'targetid': _i} for _i in range(6590, 6600)])
+
+  asyncio.run(main())
+"""
+
+
+# +
+# constant(s)
+# -
+MMT_ASYNC_CONCURRENCY = 32
+MMT_ASYNC_TIMEOUT = MMT_READ_TIMEOUT
+
+
+# +
+# class: MMTAsyncClient() inherits from the object class
+# -
+# noinspection PyBroadException,PyPep8
+class MMTAsyncClient(object):
+    """
+    asyncio front-end for the catalogTarget actions: each action runs on a worker
+    thread against a pooled MMTClient so the event loop is never blocked, while
+    payload verification and parse_response() are shared with mmt.py
+    """
+
+    # +
+    # method: __init__
+    # -
+    def __init__(self, concurrency=MMT_ASYNC_CONCURRENCY, timeout=MMT_ASYNC_TIMEOUT, client=None, log=None):
+
+        # get arguments(s)
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.log = log
+
+        # define some variables and initialize them (only close a client we own)
+        self.__owner = not isinstance(client, MMTClient)
+        self.__client = client if isinstance(client, MMTClient) else \
+            MMTClient(pool_size=self.__concurrency, timeout=(MMT_CONNECT_TIMEOUT, self.__timeout))
+        self.__executor = ThreadPoolExecutor(max_workers=self.__concurrency, thread_name_prefix='mmt_async')
+        self.__semaphores = weakref.WeakKeyDictionary()
+
+    # +
+    # Decorator(s)
+    # -
+    @property
+    def concurrency(self):
+        return self.__concurrency
+
+    @concurrency.setter
+    def concurrency(self, concurrency=MMT_ASYNC_CONCURRENCY):
+        self.__concurrency = concurrency if (isinstance(concurrency, int) and concurrency > 0) \
+            else MMT_ASYNC_CONCURRENCY
+
+    @property
+    def timeout(self):
+        return self.__timeout
+
+    @timeout.setter
+    def timeout(self, timeout=MMT_ASYNC_TIMEOUT):
+        self.__timeout = float(timeout) if (isinstance(timeout, (int, float)) and timeout > 0) else MMT_ASYNC_TIMEOUT
+
+    @property
+    def log(self):
+        return self.__log
+
+    @log.setter
+    def log(self, log=None):
+        self.__log = log if isinstance(log, logging.Logger) else None
+
+    @property
+    def client(self):
+        return self.__client
+
+    # +
+    # method: run()
+    # -
+    async def run(self, action='GET', timeout=None, **kwargs):
+        """
+        run one *_action() without blocking the event loop, returns its result (None on error): timeout is the
+        request's own timeout, so a request is never abandoned while it is still in flight
+        """
+
+        _action = HTTP_ACTIONS.get(f'{action}'.upper(), None)
+        if _action is None:
+            if self.__log:
+                self.__log.error(f"invalid action={action}")
+            return None
+        _timeout = float(timeout) if (isinstance(timeout, (int, float)) and timeout > 0) else self.__timeout
+
+        # a semaphore belongs to one event loop so keep one per running loop (e.g. per asyncio.run())
+        _loop = asyncio.get_running_loop()
+        _semaphore = self.__semaphores.get(_loop, None)
+        if _semaphore is None:
+            _semaphore = self.__semaphores[_loop] = asyncio.Semaphore(self.__concurrency)
+
+        _kwargs = {**{'log': self.__log}, **kwargs,
+                   **{'action': action.upper(), 'client': self.__client, 'timeout': _timeout}}
+        async with _semaphore:
+            return await _loop.run_in_executor(self.__executor, functools.partial(_action, **_kwargs))
+
+    # +
+    # method: gather()
+    # -
+    async def gather(self, action='GET', requests_kwargs=None, timeout=None):
+        """ fan out one action over a list of kwargs dictionaries, results are returned in order """
+        return await asyncio.gather(*[self.run(action, timeout=timeout, **_kw) for _kw in (requests_kwargs or [])])
+
+    # +
+    # method: close()
+    # -
+    def close(self):
+        self.__executor.shutdown(wait=False)
+        if self.__owner:
+            self.__client.close()
+
+    # +
+    # context manager(s)
+    # -
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, _type, _value, _traceback):
+        self.close()
+
+
+# +
+# default client
+# -
+_async_client = None
+
+
+# +
+# function: get_async_client()
+# -
+def get_async_client(**kwargs):
+    """ return the process-wide MMTAsyncClient, creating it on first use """
+    global _async_client
+    if _async_client is None:
+        _async_client = MMTAsyncClient(**kwargs)
+    return _async_client
+
+
+# +
+# function(s): async_*_action()
+# -
+async def async_delete_action(**kwargs):
+    return await get_async_client().run('DELETE', **kwargs)
+
+
+async def async_get_action(**kwargs):
+    return await get_async_client().run('GET', **kwargs)
+
+
+async def async_post_action(**kwargs):
+    return await get_async_client().run('POST', **kwargs)
+
+
+async def async_put_action(**kwargs):
+    return await get_async_client().run('PUT', **kwargs)
+
+
+async def async_upload_action(**kwargs):
+    return await get_async_client().run('UPLOAD', **kwargs)
+
+
+# +
+# function: async_mmt_target()
+# -
+# noinspection PyBroadException
+async def async_mmt_target(action='GET', catalogid=MMT_CATALOGID, file='', payload='', programid=MMT_PROGRAMID,
+                           targetid=MMT_TARGETID, token=MMT_TOKEN, log=None, client=None, timeout=None):
+
+    # set variable(s) as mmt_target() does
+    _catalogid = catalogid if (isinstance(catalogid, int) and catalogid > 0) else MMT_CATALOGID
+    _file = file if (isinstance(file, str) and file.strip() != '') else ''
+    try:
+        _payload = json.loads(payload)
+    except:
+        _payload = {}
+    _programid = programid if (isinstance(programid, int) and programid > 0) else MMT_PROGRAMID
+    _targetid = targetid if (isinstance(targetid, int) and targetid > 0) else MMT_TARGETID
+    _token = token if (isinstance(token, str) and token.strip() != '') else MMT_TOKEN
+    log = log if isinstance(log, logging.Logger) else None
+    client = client if isinstance(client, MMTAsyncClient) else get_async_client()
+
+    # execute
+    return await client.run(action, timeout=timeout, **{
+        'catalogid': _catalogid, 'file': _file, 'payload': _payload, 'programid': _programid,
+        'targetid': _targetid, 'token': _token, 'log': log})
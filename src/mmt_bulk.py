@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from src.mmt_schema import *
+
+import argparse
+import numpy as np
+
+
+# +
+# __doc__
+# -
+__doc__ = """
+  from src.mmt_bulk import *
+  _mask, _codes, _payloads = validate_table(pandas.read_csv('targets.csv'))
+
+  % python3 mmt_bulk.py --help
+"""
+
+
+# +
+# constant(s)
+# -
+MMT_BULK_ABSENT = object()
+MMT_BULK_GROUPS = (('imaging', ('imaging', 'mask'), MMT_IMAGING_SCHEMA, MMT_IMAGING_PAYLOAD, False),
+                   ('longslit', ('longslit', ), MMT_SPECTROSCOPY_SCHEMA, MMT_SPECTROSCOPY_PAYLOAD, True))
+
+
+# +
+# function: get_columns()
+# -
+def get_columns(table=None):
+    """ return (rows, {name: 1-d array}) for a DataFrame, Arrow table, structured array, dict of columns or records """
+
+    # pyarrow.Table and pandas.DataFrame are duck-typed so neither is imported
+    if hasattr(table, 'column_names') and hasattr(table, 'column'):
+        _cols = {f'{_k}': np.asarray(table.column(_k).to_numpy()) for _k in table.column_names}
+    elif hasattr(table, 'columns') and hasattr(table, 'to_numpy'):
+        _cols = {f'{_k}': np.asarray(table[_k].to_numpy()) for _k in table.columns}
+    elif isinstance(table, np.ndarray) and table.dtype.names:
+        _cols = {_k: table[_k].ravel() for _k in table.dtype.names}
+    elif isinstance(table, dict):
+        _cols = {f'{_k}': to_array(_v) for _k, _v in table.items()}
+
+    # record(s) missing a key get the default payload value, as validate_payload() does, or MMT_BULK_ABSENT
+    elif isinstance(table, (list, tuple)):
+        _records = [_r if isinstance(_r, dict) else {} for _r in table]
+        _keys = list(dict.fromkeys(_k for _r in _records for _k in _r))
+        _defaults = [get_defaults(_r.get('observationtype', None)) for _r in _records]
+        _cols = {_k: to_array([_r[_k] if _k in _r else _d.get(_k, MMT_BULK_ABSENT)
+                               for _r, _d in zip(_records, _defaults)]) for _k in _keys}
+    else:
+        raise Exception(f'invalid table {type(table)}')
+
+    # check input(s)
+    _n = {len(_v) for _v in _cols.values()}
+    if len(_n) > 1:
+        raise Exception(f'invalid table, column lengths {sorted(_n)}')
+    return (_n.pop() if _n else (len(table) if isinstance(table, (list, tuple)) else 0)), _cols
+
+
+# +
+# function: get_defaults()
+# -
+def get_defaults(_otype=None):
+    """ return the default payload for an observationtype, {} if it is invalid """
+    _otype = _otype.strip().lower() if isinstance(_otype, str) else ''
+    return MMT_VALIDATORS[_otype].defaults if _otype in MMT_VALIDATORS else {}
+
+
+# +
+# function: to_array()
+# -
+def to_array(_values=None):
+    """ return a 1-d array, python list(s) become object array(s) so [1, 2.5] or ['a', 1.0] are not coerced """
+    if isinstance(_values, np.ndarray) or hasattr(_values, 'to_numpy'):
+        _a = np.asarray(_values.to_numpy() if hasattr(_values, 'to_numpy') else _values).ravel()
+        if _a.dtype.kind in 'biufUO':
+            return _a
+    _a = np.empty(len(_values), dtype=object)
+    _a[:] = list(_values)
+    return _a
+
+
+# +
+# function: is_instance()
+# -
+def is_instance(_col=None, _types=(str, )):
+    """ return a boolean array: isinstance() of each element, numpy integer / float column(s) count as int / float """
+    _kind = _col.dtype.kind
+    if _kind == 'O':
+        return np.frompyfunc(lambda _v: isinstance(_v, _types), 1, 1)(_col).astype(bool)
+    _ok = (_kind == 'U' and str in _types) or (_kind == 'f' and float in _types) or \
+          (_kind in 'biu' and int in _types)
+    return np.full(len(_col), _ok)
+
+
+# +
+# function: to_strings()
+# -
+def to_strings(_col=None, _typed=None):
+    """ return a str array with '' for non-str element(s) """
+    return _col if _col.dtype.kind == 'U' else np.where(_typed, _col, '').astype(str)
+
+
+# +
+# function: to_floats()
+# -
+def to_floats(_col=None, _typed=None):
+    """ return a float array with nan for element(s) of the wrong type """
+    if _col.dtype.kind != 'O':
+        return np.where(_typed, _col, np.nan).astype(float) if _col.dtype.kind in 'biuf' else np.full(len(_col), np.nan)
+    return np.where(_typed, _col, np.nan).astype(float)
+
+
+# +
+# function: check_rule()
+# -
+def check_rule(_col=None, _rule='', _arg=None):
+    """ return a boolean array: the compile_rule() check applied to a whole column at once """
+    if _rule in ('choice', 'int_choice', 'choice_lower'):
+        _types = (int, ) if _rule == 'int_choice' else (str, ) if _rule == 'choice_lower' else \
+            tuple({type(_x) for _x in _arg})
+        _typed = is_instance(_col, _types)
+        if not _typed.any():
+            return _typed
+        if _types == (str, ):
+            _s = to_strings(_col, _typed)
+            return _typed & np.isin(np.char.lower(np.char.strip(_s)) if _rule == 'choice_lower' else _s, list(_arg))
+        return _typed & np.isin(to_floats(_col, _typed), list(_arg))
+    if _rule in ('float', 'int'):
+        _typed = is_instance(_col, (float, ) if _rule == 'float' else (int, ))
+        _v = to_floats(_col, _typed)
+        _lo, _hi = _arg if _arg is not None else (-math.inf, math.inf)
+        return _typed & (_v >= _lo) & (_v <= _hi)
+    if _rule == 'pattern':
+        _match = re.compile(_arg).match
+        return np.frompyfunc(lambda _v: isinstance(_v, str) and _match(_v) is not None, 1, 1)(_col).astype(bool)
+    if _rule == 'string':
+        _typed = is_instance(_col, (str, ))
+        return _typed & (np.char.strip(to_strings(_col, _typed)) != '')
+    raise Exception(f'invalid rule {_rule}')
+
+
+# +
+# function: check_coordinate()
+# -
+def check_coordinate(_col=None, _rule='ra', _arg=RA_PATTERN):
+    """ return (ok, decimal) arrays: exact aa:bb:cc[.ddd] value(s) in bulk, anything else one at a time """
+    _typed = is_instance(_col, (str, ))
+    _s = to_strings(_col, _typed)
+    _dec, _ok = parse_sexagesimal_array(_s, hours=_rule == 'ra')
+    _ok &= _typed
+    if _rule == 'ra':
+        _ok &= ~(np.char.startswith(_s, '+') | np.char.startswith(_s, '-'))
+    else:
+        _ok &= np.abs(_dec) < 90.0
+    _match, _fn = re.compile(_arg).match, ra_to_decimal if _rule == 'ra' else dec_to_decimal
+    for _i in np.flatnonzero(~_ok):
+        _v = _col[_i]
+        if isinstance(_v, str) and _match(_v) is not None:
+            _ok[_i], _dec[_i] = True, _fn(_v)
+    return _ok, _dec
+
+
+# +
+# function: check_wavelength()
+# -
+def check_wavelength(_gratings=None, _wavelengths=None):
+    """ return a boolean array: verify_spectroscopy_wavelength() for each (grating, central wavelength) pair """
+    _typed = is_instance(_gratings, (str, ))
+    return MMT_SPECTROSCOPY_INDEX.contains_array(to_strings(_gratings, _typed),
+                                                 to_floats(_wavelengths, is_instance(_wavelengths, (float, int))))
+
+
+# +
+# function: validate_group()
+# -
+def validate_group(_n=0, _cols=None, _schema=MMT_IMAGING_SCHEMA, _defaults=None, _wavelength=False):
+    """ return (error codes, {key: array}) for row(s) of one observation type, only changed column(s) are returned """
+    _codes, _out = np.zeros(_n, dtype=np.int64), {}
+    for _k, _rule, _arg, _action in _schema:
+
+        # an absent column is the default value throughout so it is checked once
+        _col = _cols[_k] if _k in _cols else to_array([_defaults.get(_k, None)])
+        if _rule in ('ra', 'dec'):
+            _ok, _out[f'{_rule}_decimal'] = check_coordinate(_col, _rule, _arg)
+        else:
+            _ok = check_rule(_col, _rule, _arg)
+        _ok = _ok if _k in _cols else np.full(_n, _ok[0])
+        if _action == 'reject':
+            _codes |= np.where(_ok, 0, MMT_ERROR_CODES[_k])
+        elif _k in _cols and not _ok.all():
+            _out[_k] = _col.astype(object)
+            _out[_k][~_ok] = _defaults.get(_k, None)
+
+    # the grating / wavelength combination is only checked when everything else passed, as validate_payload() does
+    if _wavelength:
+        _gratings, _wavelengths = (_cols[_k] if _k in _cols else to_array([_defaults.get(_k, None)] * _n)
+                                   for _k in ('grating', 'centralwavelength'))
+        _codes |= np.where((_codes == 0) & ~check_wavelength(_gratings, _wavelengths), MMT_ERROR_CODES['wavelength'], 0)
+    return _codes, _out
+
+
+# +
+# function: validate_table()
+# -
+def validate_table(table=None, payloads=True, _log=None):
+    """ return (accepted mask, per-row MMT_ERROR_CODES bits, normalized payload(s) of the accepted row(s)) """
+
+    # check input(s)
+    _log = _log if isinstance(_log, logging.Logger) else None
+    _n, _cols = get_columns(table)
+    _codes = np.full(_n, MMT_ERROR_CODES['observationtype'], dtype=np.int64)
+    _payloads = [None] * _n
+    if _n == 0:
+        return np.zeros(0, dtype=bool), _codes, []
+
+    # split row(s) by observation type
+    _otype = _cols.get('observationtype', to_array([None] * _n))
+    _typed = is_instance(_otype, (str, ))
+    _otype = np.char.lower(np.char.strip(to_strings(_otype, _typed)))
+    for _name, _types, _schema, _defaults, _wavelength in MMT_BULK_GROUPS:
+        _rows = np.flatnonzero(_typed & np.isin(_otype, list(_types)))
+        if _rows.size == 0:
+            continue
+        _group_codes, _out = validate_group(_rows.size, {_k: _v[_rows] for _k, _v in _cols.items()}, _schema,
+                                            _defaults, _wavelength)
+        _codes[_rows] = _group_codes
+
+        # build the payload(s) of accepted row(s) only
+        _good = np.flatnonzero(_group_codes == 0)
+        if _good.size == 0 or not payloads:
+            continue
+        _lists = {**{_k: _v[_rows[_good]].tolist() for _k, _v in _cols.items() if _k not in _out},
+                  **{_k: _v[_good].tolist() for _k, _v in _out.items()}}
+        _keys = list(_lists)
+        _absent = [_k for _k, _v in _cols.items() if _v.dtype.kind == 'O' and MMT_BULK_ABSENT in _lists[_k]]
+        for _i, _values in zip(_rows[_good].tolist(), zip(*_lists.values())):
+            _payloads[_i] = _defaults.copy()
+            _payloads[_i].update(zip(_keys, _values))
+            for _k in _absent:
+                if _payloads[_i][_k] is MMT_BULK_ABSENT:
+                    del _payloads[_i][_k]
+
+    # return
+    _mask = _codes == 0
+    if _log:
+        _log.info(f"{int(_mask.sum())} of {_n} row(s) accepted")
+        for _i in np.flatnonzero(~_mask)[:10]:
+            _log.error(f"row {_i} rejected: {', '.join(get_error_keys(_codes[_i]))}")
+    return _mask, _codes, [_p for _p in _payloads if _p is not None]
+
+
+# +
+# main()
+# -
+if __name__ == '__main__':
+
+    # noinspection PyTypeChecker
+    _p = argparse.ArgumentParser(description=f'Bulk Payload Validation', formatter_class=argparse.RawTextHelpFormatter)
+    _p.add_argument(f'--file', default='', help=f"""JSONL or CSV payload file, defaults to '%(default)s'""")
+    _p.add_argument(f'--verbose', default=False, action='store_true', help=f'if present, produce verbose output')
+    args = _p.parse_args()
+
+    # execute
+    from src.mmt import read_batch
+    _batch = read_batch(file=args.file)
+    _mask, _codes, _payloads = validate_table([_payload for _, _payload, _ in _batch])
+    _payloads = iter(_payloads)
+    for (_i, _, _), _ok, _code in zip(_batch, _mask, _codes):
+        if _ok:
+            _data = next(_payloads)
+            print(json.dumps({'record': _i, 'status': 'valid', 'payload': _data if bool(args.verbose) else None}))
+        else:
+            print(json.dumps({'record': _i, 'status': 'invalid', 'error': get_error_keys(_code)}))
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from src import *
+from src.mmt_metrics import get_metrics
+
+import argparse
+import fcntl
+import shutil
+import tempfile
+import threading
+import time
+
+
+# +
+# __doc__
+# -
+__doc__ = """
+  from src.mmt_cache import *
+  _png = get_finder_png(cache=get_cache(), ra='22:35:58', dec='+33:57:36')
+
+  % python3 mmt_cache.py --help
+"""
+
+
+# +
+# constant(s)
+# -
+MMT_CACHE_DIR = os.getenv('MMT_CACHE', os.path.abspath(os.path.expanduser('~/.cache/mmt/finder')))
+MMT_CACHE_MAX_AGE = 30.0 * 86400.0
+MMT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+MMT_CACHE_STALE = 3600.0
+
+
+# +
+# class: FinderCache() inherits from the object class
+# -
+# noinspection PyBroadException
+class FinderCache(object):
+    """
+    content-addressed on-disk cache of converted SDSS finder chart(s): entries are keyed on the normalized
+    request parameters, published with an atomic rename so concurrent processes never see a partial file,
+    and evicted least-recently-used first by age and total size under an advisory lock
+    """
+
+    # +
+    # method: __init__
+    # -
+    def __init__(self, path=MMT_CACHE_DIR, max_bytes=MMT_CACHE_MAX_BYTES, max_age=MMT_CACHE_MAX_AGE, log=None):
+
+        # get arguments(s)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.log = log
+
+        # define some variables and initialize them
+        os.makedirs(self.__path, exist_ok=True)
+        self.__lock = threading.Lock()
+        self.__hits = 0
+        self.__misses = 0
+
+    # +
+    # Decorator(s)
+    # -
+    @property
+    def path(self):
+        return self.__path
+
+    @path.setter
+    def path(self, path=MMT_CACHE_DIR):
+        self.__path = os.path.abspath(os.path.expanduser(path)) if (isinstance(path, str) and path.strip() != '') \
+            else MMT_CACHE_DIR
+
+    @property
+    def max_bytes(self):
+        return self.__max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, max_bytes=MMT_CACHE_MAX_BYTES):
+        self.__max_bytes = int(max_bytes) if (isinstance(max_bytes, (int, float)) and max_bytes >= 0) \
+            else MMT_CACHE_MAX_BYTES
+
+    @property
+    def max_age(self):
+        return self.__max_age
+
+    @max_age.setter
+    def max_age(self, max_age=MMT_CACHE_MAX_AGE):
+        self.__max_age = float(max_age) if (isinstance(max_age, (int, float)) and max_age >= 0) \
+            else MMT_CACHE_MAX_AGE
+
+    @property
+    def log(self):
+        return self.__log
+
+    @log.setter
+    def log(self, log=None):
+        self.__log = log if isinstance(log, logging.Logger) else None
+
+    @property
+    def hits(self):
+        return self.__hits
+
+    @property
+    def misses(self):
+        return self.__misses
+
+    # +
+    # method: key()
+    # -
+    @staticmethod
+    def key(**kw):
+        """ return the sha256 of the normalized get_finder_chart() parameter(s) or '' if RA, Dec are invalid """
+        _ra = ra_to_decimal(kw['ra']) if isinstance(kw.get('ra', None), str) else math.nan
+        _dec = dec_to_decimal(kw['dec']) if isinstance(kw.get('dec', None), str) else math.nan
+        if math.isnan(_ra) or math.isnan(_dec):
+            return ''
+        _params = {
+            'ra': round(_ra, 6) + 0.0, 'dec': round(_dec, 6) + 0.0,
+            'scale': kw['scale'] if isinstance(kw.get('scale', None), float) else SDSS_SCALE,
+            'width': kw['width'] if isinstance(kw.get('width', None), int) else SDSS_WIDTH,
+            'height': kw['height'] if isinstance(kw.get('height', None), int) else SDSS_HEIGHT,
+            'opt': ''.join(sorted(kw['opt'])) if isinstance(kw.get('opt', None), str) else SDSS_OPT,
+            'query': kw['query'] if isinstance(kw.get('query', None), str) else '',
+            'url': SDSS_URL}
+        return hashlib.sha256(json.dumps(_params, sort_keys=True).encode('utf-8')).hexdigest()
+
+    # +
+    # method: entry()
+    # -
+    def entry(self, _key=''):
+        return os.path.join(self.__path, f'{_key}.png')
+
+    # +
+    # method: get()
+    # -
+    def get(self, _key=''):
+        """ return the path of a cached png or None, a hit refreshes the entry's mtime for LRU eviction """
+        _path = self.entry(_key)
+        try:
+            os.utime(_path)
+        except OSError:
+            with self.__lock:
+                self.__misses += 1
+            return None
+        with self.__lock:
+            self.__hits += 1
+        if self.__log:
+            self.__log.debug(f"cache hit, key={_key}")
+        return _path
+
+    # +
+    # method: put()
+    # -
+    def put(self, _key='', _file='', _data=None):
+        """ atomically publish png bytes (or move _file) under _key, evict if required and return the entry path """
+        _path = self.entry(_key)
+        _fd, _tmp = tempfile.mkstemp(dir=self.__path, prefix='.put_', suffix='.tmp')
+        try:
+            if _data is not None:
+                with os.fdopen(_fd, 'wb') as _f:
+                    _f.write(_data)
+            else:
+                os.close(_fd)
+                shutil.move(_file, _tmp)
+            os.replace(_tmp, _path)
+        except Exception:
+            if os.path.exists(_tmp):
+                os.remove(_tmp)
+            raise
+        self.evict()
+        return _path
+
+    # +
+    # method: evict()
+    # -
+    def evict(self):
+        """ remove expired then least-recently-used entries until under max_bytes, return the number removed """
+
+        # only one process evicts at a time, the other(s) skip
+        with open(os.path.join(self.__path, '.lock'), 'a') as _lock:
+            try:
+                fcntl.flock(_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return 0
+
+            _now, _entries, _removed = time.time(), [], 0
+            with os.scandir(self.__path) as _it:
+                for _e in _it:
+                    try:
+                        _stat = _e.stat(follow_symlinks=False)
+                        if _e.name.endswith('.png'):
+                            _entries.append((_stat.st_mtime, _stat.st_size, _e.path))
+                        elif _e.name.startswith('.put_') and _now - _stat.st_mtime > MMT_CACHE_STALE:
+                            os.remove(_e.path)
+                    except OSError:
+                        continue
+
+            _entries.sort()
+            _total = sum(_e[1] for _e in _entries)
+            for _mtime, _size, _path in _entries:
+                if _now - _mtime <= self.__max_age and _total <= self.__max_bytes:
+                    break
+                try:
+                    os.remove(_path)
+                    _total, _removed = _total - _size, _removed + 1
+                except OSError:
+                    continue
+        if self.__log and _removed > 0:
+            self.__log.debug(f"evicted {_removed} entries, {_total} bytes remain")
+        return _removed
+
+    # +
+    # method: clear()
+    # -
+    def clear(self):
+        for _e in os.scandir(self.__path):
+            if _e.name.endswith('.png'):
+                try:
+                    os.remove(_e.path)
+                except OSError:
+                    pass
+
+    # +
+    # method: stats()
+    # -
+    def stats(self):
+        """ return dictionary of hit(s), miss(es), entries and bytes """
+        _sizes = [_e.stat().st_size for _e in os.scandir(self.__path) if _e.name.endswith('.png')]
+        return {'hits': self.__hits, 'misses': self.__misses, 'entries': len(_sizes), 'bytes': sum(_sizes)}
+
+
+# +
+# default cache
+# -
+_cache = None
+_cache_lock = threading.Lock()
+
+
+# +
+# function: get_cache()
+# -
+def get_cache(**kwargs):
+    """ return the process-wide FinderCache, creating it on first use """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = FinderCache(**kwargs)
+        return _cache
+
+
+# +
+# function: get_finder_png()
+# -
+# noinspection PyBroadException
+def get_finder_png(cache=None, **kw):
+    """ return the path of the SDSS finder chart png for get_finder_chart() parameter(s), or '' on failure """
+
+    cache = cache if isinstance(cache, FinderCache) else get_cache()
+    _log = kw['log'] if ('log' in kw and isinstance(kw['log'], logging.Logger)) else None
+    _key = cache.key(**kw)
+    if _key == '':
+        if _log:
+            _log.error(f"invalid input(s), ra={kw.get('ra', None)}, dec={kw.get('dec', None)}")
+        return ''
+    _metrics = get_metrics()
+    _png = cache.get(_key)
+    if _png is not None:
+        _metrics.count('finder_cache_hits')
+        return _png
+
+    # on a miss, download and convert in memory then publish the png
+    _metrics.count('finder_cache_misses')
+    try:
+        with _metrics.timer('finder'):
+            _jpg = get_finder_chart_bytes(**kw)
+        if not _jpg:
+            return ''
+        with _metrics.timer('convert'):
+            _data = jpg_to_png_bytes(_jpg)
+        return cache.put(_key, _data=_data)
+    except Exception as _e:
+        if _log:
+            _log.error(f"failed to get finder chart, error={_e}")
+        return ''
+
+
+# +
+# main()
+# -
+if __name__ == '__main__':
+
+    # noinspection PyTypeChecker
+    _p = argparse.ArgumentParser(description=f'Finder Chart Cache', formatter_class=argparse.RawTextHelpFormatter)
+    _p.add_argument(f'--clear', default=False, action='store_true', help=f'if present, remove all entries')
+    _p.add_argument(f'--evict', default=False, action='store_true', help=f'if present, evict expired entries')
+    _p.add_argument(f'--path', default=MMT_CACHE_DIR, help=f"""cache directory, defaults to %(default)s""")
+    args = _p.parse_args()
+
+    # execute
+    _c = FinderCache(path=args.path)
+    if bool(args.clear):
+        _c.clear()
+    if bool(args.evict):
+        _c.evict()
+    print(f"{_c.stats()}")
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from src.mmt_token import *
+from src.mmt_metrics import get_metrics
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+
+import logging
+import random
+import requests
+import threading
+import time
+
+
+# +
+# constant(s)
+# -
+MMT_BACKOFF = 0.5
+MMT_BACKOFF_MAX = 60.0
+MMT_BURST = 10
+MMT_CONNECT_TIMEOUT = 10.0
+MMT_IDEMPOTENT = ('DELETE', 'GET', 'HEAD', 'OPTIONS', 'PUT')
+MMT_POOL_SIZE = 10
+MMT_RATE = 0.0
+MMT_READ_TIMEOUT = 60.0
+MMT_RETRIES = 3
+MMT_RETRY_STATUS = (429, 502, 503, 504)
+
+
+# +
+# class: TokenBucket() inherits from the object class
+# -
+class TokenBucket(object):
+    """ thread-safe token bucket: acquire() blocks until a token is free, rate <= 0 never blocks """
+
+    # +
+    # method: __init__
+    # -
+    def __init__(self, rate=MMT_RATE, burst=MMT_BURST):
+
+        # get arguments(s)
+        self.__rate = float(rate) if (isinstance(rate, (int, float)) and rate > 0.0) else 0.0
+        self.__burst = float(burst) if (isinstance(burst, (int, float)) and burst >= 1) else float(MMT_BURST)
+
+        # define some variables and initialize them
+        self.__lock = threading.Lock()
+        self.__tokens, self.__last = self.__burst, time.monotonic()
+
+    # +
+    # Decorator(s)
+    # -
+    @property
+    def rate(self):
+        return self.__rate
+
+    @property
+    def burst(self):
+        return self.__burst
+
+    # +
+    # method: acquire()
+    # -
+    def acquire(self):
+        """ take one token, return the second(s) spent waiting for it """
+        if self.__rate <= 0.0:
+            return 0.0
+        with self.__lock:
+            _now = time.monotonic()
+            self.__tokens = min(self.__burst, self.__tokens + (_now - self.__last) * self.__rate)
+            self.__last = _now
+            self.__tokens -= 1.0
+            _wait = -self.__tokens / self.__rate if self.__tokens < 0.0 else 0.0
+        if _wait > 0.0:
+            time.sleep(_wait)
+        return _wait
+
+
+# +
+# function: get_retry_after()
+# -
+# noinspection PyBroadException
+def get_retry_after(_value=None):
+    """ return a Retry-After header (seconds or HTTP date) as seconds from now, None if absent or invalid """
+    try:
+        return max(0.0, float(_value))
+    except:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(_value).timestamp() - time.time())
+    except:
+        return None
+
+
+# +
+# class: MMTClient() inherits from the object class
+# -
+# noinspection PyBroadException,PyPep8
+class MMTClient(object):
+    """ pooled, keep-alive HTTP client for the catalogTarget API """
+
+    # +
+    # method: __init__
+    # -
+    def __init__(self, url=MMT_URL, pool_size=MMT_POOL_SIZE, timeout=(MMT_CONNECT_TIMEOUT, MMT_READ_TIMEOUT),
+                 log=None, retries=MMT_RETRIES, backoff=MMT_BACKOFF, backoff_max=MMT_BACKOFF_MAX, rate=MMT_RATE,
+                 burst=MMT_BURST):
+
+        # get arguments(s)
+        self.url = url
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.log = log
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+
+        # define some variables and initialize them (Retry-After holds back every thread until __resume)
+        self.__limiter = TokenBucket(rate=rate, burst=burst)
+        self.__lock = threading.Lock()
+        self.__resume = 0.0
+        self.__stats = {'requests': 0, 'retries': 0, 'throttled': 0, 'errors': 0, 'waits': 0, 'wait_seconds': 0.0}
+        self.__session = requests.Session()
+        self.__adapter = HTTPAdapter(pool_connections=self.__pool_size, pool_maxsize=self.__pool_size)
+        self.__session.mount('http://', self.__adapter)
+        self.__session.mount('https://', self.__adapter)
+
+    # +
+    # Decorator(s)
+    # -
+    @property
+    def url(self):
+        return self.__url
+
+    @url.setter
+    def url(self, url=MMT_URL):
+        self.__url = url.rstrip('/') if (isinstance(url, str) and url.strip() != '') else MMT_URL.rstrip('/')
+
+    @property
+    def pool_size(self):
+        return self.__pool_size
+
+    @pool_size.setter
+    def pool_size(self, pool_size=MMT_POOL_SIZE):
+        self.__pool_size = pool_size if (isinstance(pool_size, int) and pool_size > 0) else MMT_POOL_SIZE
+
+    @property
+    def timeout(self):
+        return self.__timeout
+
+    @timeout.setter
+    def timeout(self, timeout=(MMT_CONNECT_TIMEOUT, MMT_READ_TIMEOUT)):
+        if isinstance(timeout, (int, float)) and timeout > 0:
+            self.__timeout = (float(timeout), float(timeout))
+        elif isinstance(timeout, (list, tuple)) and len(timeout) == 2 and \
+                all(isinstance(_t, (int, float)) and _t > 0 for _t in timeout):
+            self.__timeout = (float(timeout[0]), float(timeout[1]))
+        else:
+            self.__timeout = (MMT_CONNECT_TIMEOUT, MMT_READ_TIMEOUT)
+
+    @property
+    def log(self):
+        return self.__log
+
+    @log.setter
+    def log(self, log=None):
+        self.__log = log if isinstance(log, logging.Logger) else None
+
+    @property
+    def retries(self):
+        return self.__retries
+
+    @retries.setter
+    def retries(self, retries=MMT_RETRIES):
+        self.__retries = retries if (isinstance(retries, int) and retries >= 0) else MMT_RETRIES
+
+    @property
+    def backoff(self):
+        return self.__backoff
+
+    @backoff.setter
+    def backoff(self, backoff=MMT_BACKOFF):
+        self.__backoff = float(backoff) if (isinstance(backoff, (int, float)) and backoff >= 0.0) else MMT_BACKOFF
+
+    @property
+    def backoff_max(self):
+        return self.__backoff_max
+
+    @backoff_max.setter
+    def backoff_max(self, backoff_max=MMT_BACKOFF_MAX):
+        self.__backoff_max = float(backoff_max) if (isinstance(backoff_max, (int, float)) and backoff_max >= 0.0) \
+            else MMT_BACKOFF_MAX
+
+    @property
+    def limiter(self):
+        return self.__limiter
+
+    @property
+    def session(self):
+        return self.__session
+
+    @property
+    def stats(self):
+        with self.__lock:
+            return dict(self.__stats)
+
+    # +
+    # method: _count()
+    # -
+    def _count(self, **kwargs):
+        with self.__lock:
+            for _k, _v in kwargs.items():
+                self.__stats[_k] += _v
+
+    # +
+    # method: _wait()
+    # -
+    def _wait(self):
+        """ honour any Retry-After in force, then take a token from the limiter """
+        _wait = max(0.0, self.__resume - time.monotonic())
+        if _wait > 0.0:
+            time.sleep(_wait)
+        _wait += self.__limiter.acquire()
+        if _wait > 0.0:
+            self._count(waits=1, wait_seconds=_wait)
+
+    # +
+    # method: _delay()
+    # -
+    def _delay(self, _attempt=0, _req=None):
+        """ return the pause before a retry: Retry-After if given, else full-jitter exponential backoff """
+        _after = get_retry_after(_req.headers.get('Retry-After', None)) if _req is not None else None
+        if _after is not None:
+            _after = min(_after, self.__backoff_max)
+            with self.__lock:
+                self.__resume = max(self.__resume, time.monotonic() + _after)
+            return _after
+        return random.uniform(0.0, min(self.__backoff_max, self.__backoff * 2.0 ** _attempt))
+
+    # +
+    # method: request()
+    # -
+    def request(self, method='GET', url='', retry=None, **kwargs):
+        """
+        send request through the pooled session, applying the default timeout (if none is given) and the rate limit:
+        connection error(s) and MMT_RETRY_STATUS response(s) are retried for idempotent method(s), or any method if
+        retry=True
+        """
+        method = method.upper()
+        if kwargs.get('timeout', None) is None:
+            kwargs['timeout'] = self.__timeout
+        _retries = self.__retries if (method in MMT_IDEMPOTENT if retry is None else bool(retry)) else 0
+        _metrics = get_metrics()
+        for _attempt in range(_retries + 1):
+            self._wait()
+            self._count(requests=1, retries=1 if _attempt > 0 else 0)
+            if self.__log:
+                self.__log.debug(f"{method} {url}{f' (retry {_attempt})' if _attempt > 0 else ''}")
+
+            # re-send file(s) from the start
+            for _f in (kwargs['files'].values() if (_attempt > 0 and isinstance(kwargs.get('files', None), dict))
+                       else []):
+                _obj = _f[1] if isinstance(_f, (list, tuple)) else _f
+                if hasattr(_obj, 'seek'):
+                    _obj.seek(0)
+            try:
+                with _metrics.timer('http'):
+                    _req = self.__session.request(method=method, url=url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as _e:
+                self._count(errors=1)
+                _metrics.error('timeout' if isinstance(_e, requests.Timeout) else 'connection')
+                if _attempt >= _retries:
+                    raise
+                if self.__log:
+                    self.__log.warning(f"{method} {url} failed, error={_e}")
+                time.sleep(self._delay(_attempt))
+                continue
+            _metrics.response(_req)
+            if _req.status_code not in MMT_RETRY_STATUS:
+                return _req
+            self._count(throttled=1 if _req.status_code in (429, 503) else 0, errors=1)
+            if _attempt >= _retries:
+                return _req
+            _delay = self._delay(_attempt, _req)
+            _req.close()
+            if self.__log:
+                self.__log.warning(f"{method} {url} status={_req.status_code}, retry in {_delay:.3f}s")
+            time.sleep(_delay)
+
+    def delete(self, url='', **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+    def get(self, url='', **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url='', **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url='', **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    # +
+    # method: close()
+    # -
+    def close(self):
+        try:
+            self.__session.close()
+        except:
+            pass
+
+    # +
+    # context manager(s)
+    # -
+    def __enter__(self):
+        return self
+
+    def __exit__(self, _type, _value, _traceback):
+        self.close()
+
+
+# +
+# default client
+# -
+_client, _client_lock = None, threading.Lock()
+
+
+# +
+# function: get_client()
+# -
+def get_client(**kwargs):
+    """ return the process-wide MMTClient, creating it on first use """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = MMTClient(**kwargs)
+        return _client
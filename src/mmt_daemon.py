@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from src.mmt import *
+from src.mmt_daemon_client import *
+
+import signal
+import socket
+import socketserver
+
+
+# +
+# __doc__
+# -
+__doc__ = """
+  % python3 mmt_daemon.py --help
+  % python3 mmt_daemon_client.py --action=GET --targetid=6593
+"""
+
+
+# +
+# constant(s)
+# -
+MMT_DAEMON_ACTIONS = tuple(HTTP_ACTIONS) + ('PING', )
+MMT_DAEMON_ROOT = os.getenv('MMT_DAEMON_ROOT', '')
+MMT_DAEMON_WARM = ('numpy', 'PIL.Image', 'astropy.coordinates', 'astropy.io.fits', 'astropy.wcs')
+
+
+# +
+# function: warm_up()
+# -
+# noinspection PyBroadException
+def warm_up(_modules=MMT_DAEMON_WARM, _log=None):
+    """ import the module(s) the action(s) load lazily so no command pays for them, return those loaded """
+    _ret = []
+    for _m in _modules:
+        try:
+            __import__(_m)
+            _ret.append(_m)
+        except Exception as _e:
+            if _log:
+                _log.warning(f"failed to import {_m}, error={_e}")
+    return _ret
+
+
+# +
+# function: get_root_path()
+# -
+def get_root_path(path='', root=MMT_DAEMON_ROOT):
+    """ return path resolved inside directory root, '' for no path, else raise (no root means no file access) """
+    if not isinstance(path, str) or path.strip() == '':
+        return ''
+    if not isinstance(root, str) or root.strip() == '':
+        raise Exception(f'file access is disabled, start the daemon with --root')
+    _root = os.path.realpath(os.path.expanduser(root))
+    _path = os.path.realpath(os.path.join(_root, os.path.expanduser(path)))
+    if os.path.commonpath([_root, _path]) != _root:
+        raise Exception(f'path outside {_root}, path={path}')
+    return _path
+
+
+# +
+# function: run_command()
+# -
+# noinspection PyBroadException
+def run_command(command=None, client=None, cache=None, log=None, root=MMT_DAEMON_ROOT):
+    """
+    run one mmt_target()-style command dictionary, return {'ok', 'result', 'error', 'seconds'}: file and save must
+    lie inside root
+    """
+    _t0 = time.perf_counter()
+    _ret = {'ok': False, 'result': None, 'error': None, 'seconds': 0.0}
+    _action = f"{command.get('action', '')}".strip().upper() if isinstance(command, dict) else ''
+    if _action not in MMT_DAEMON_ACTIONS:
+        _ret['error'] = f'invalid action {_action}, choices: {MMT_DAEMON_ACTIONS}'
+    elif _action == 'PING':
+        _ret['ok'], _ret['result'] = True, {'pid': os.getpid(), 'stats': client.stats if client else {},
+                                            'metrics': get_metrics().snapshot() if get_metrics().enabled else {}}
+    else:
+        _payload = command.get('payload', '{}')
+        try:
+            _file, _save = get_root_path(command.get('file', ''), root), get_root_path(command.get('save', ''), root)
+            _ret['result'] = mmt_target(
+                action=_action, catalogid=command.get('catalogid', MMT_CATALOGID), file=_file,
+                payload=_payload if isinstance(_payload, str) else json.dumps(_payload),
+                programid=command.get('programid', MMT_PROGRAMID), targetid=command.get('targetid', MMT_TARGETID),
+                token=command.get('token', MMT_TOKEN), log=log, client=client, cache=cache,
+                save=_save, retry=bool(command.get('retry', False)))
+            _ret['ok'] = _ret['result'] is not None
+            _ret['error'] = None if _ret['ok'] else f'{_action} failed'
+        except Exception as _e:
+            _ret['error'] = f'{_e}'
+    _ret['seconds'] = round(time.perf_counter() - _t0, 6)
+    if log:
+        log.info(f"{_action} {_ret['error'] or 'ok'} in {_ret['seconds']:.6f}s")
+    return _ret
+
+
+# +
+# class: MMTDaemonHandler() inherits from the StreamRequestHandler class
+# -
+# noinspection PyBroadException
+class MMTDaemonHandler(socketserver.StreamRequestHandler):
+    """ one JSON command per line, one JSON reply per line, for as long as the connection stays open """
+
+    def handle(self):
+        for _line in self.rfile:
+            if _line.strip() == b'':
+                continue
+            try:
+                _command = json.loads(_line)
+            except Exception as _e:
+                _reply = {'ok': False, 'result': None, 'error': f'invalid json, error={_e}', 'seconds': 0.0}
+            else:
+                _reply = run_command(_command, self.server.client, self.server.cache, self.server.log,
+                                     self.server.root)
+            self.wfile.write(json.dumps(_reply).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+# +
+# class: MMTUnixDaemon() threaded unix socket server holding the warm client and cache
+# -
+class MMTUnixDaemon(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+# +
+# function: start_daemon()
+# -
+# noinspection PyBroadException
+def start_daemon(path=MMT_DAEMON_SOCKET, client=None, cache=None, log=None, thread=True, root=MMT_DAEMON_ROOT):
+    """
+    bind the unix socket (mode 0600, so only the owner can send command(s)), serve in a daemon thread if thread,
+    return server: command file / save path(s) must lie inside root ('' disables them)
+    """
+
+    # a socket file nobody answers on is left over from a crash
+    if os.path.exists(path):
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as _s:
+                _s.connect(path)
+            raise Exception(f'daemon already running on {path}')
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.remove(path)
+    _old = os.umask(0o177)
+    try:
+        _server = MMTUnixDaemon(path, MMTDaemonHandler)
+    finally:
+        os.umask(_old)
+    os.chmod(path, 0o600)
+    _server.root = root if isinstance(root, str) else ''
+    _server.client = client if isinstance(client, MMTClient) else get_client()
+    _server.cache = cache if (isinstance(cache, FinderCache) or cache is False) else None
+    _server.log = log if isinstance(log, logging.Logger) else None
+    if thread:
+        threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
+
+
+# +
+# function: stop_daemon()
+# -
+# noinspection PyBroadException
+def stop_daemon(server=None):
+    """ stop serving, close and remove the socket """
+    try:
+        server.shutdown()
+    except Exception:
+        pass
+    server.server_close()
+    if os.path.exists(server.server_address):
+        os.remove(server.server_address)
+
+
+# +
+# main()
+# -
+if __name__ == '__main__':
+
+    # noinspection PyTypeChecker
+    _p = argparse.ArgumentParser(description=f'MMT Daemon', formatter_class=argparse.RawTextHelpFormatter)
+    _p.add_argument(f'--cache', default=MMT_CACHE_DIR,
+                    help=f"""Finder chart cache directory ('' to disable), defaults to '%(default)s'""")
+    _p.add_argument(f'--metrics', default='',
+                    help=f"""Collect per-stage metric(s) and write them to this file on exit (*.json or *.prom)""")
+    _p.add_argument(f'--rate', default=MMT_RATE,
+                    help=f"""Request(s) per second (0 for no limit), defaults to %(default)s""")
+    _p.add_argument(f'--root', default=MMT_DAEMON_ROOT,
+                    help=f"""Directory command file / save path(s) must lie in ('' to refuse them), """
+                         f"""defaults to '%(default)s'""")
+    _p.add_argument(f'--retries', default=MMT_RETRIES, help=f"""Retries per request, defaults to %(default)s""")
+    _p.add_argument(f'--socket', default=MMT_DAEMON_SOCKET, help=f"""Socket, defaults to %(default)s""")
+    _p.add_argument(f'--url', default=MMT_URL, help=f"""catalogTarget URL, defaults to %(default)s""")
+    _p.add_argument(f'--verbose', default=False, action='store_true', help=f'if present, produce verbose output')
+    _p.add_argument(f'--workers', default=MMT_POOL_SIZE, help=f"""Pooled connection(s), defaults to %(default)s""")
+    args = _p.parse_args()
+
+    # execute: everything slow happens once, here
+    _log = Logger('MMT').logger if bool(args.verbose) else None
+    if args.metrics.strip() != '':
+        get_metrics().enable()
+    warm_up(_log=_log)
+    _client = get_client(url=args.url, pool_size=int(args.workers), rate=float(args.rate), retries=int(args.retries))
+    _cache = FinderCache(path=args.cache, log=_log) if args.cache.strip() != '' else False
+    _daemon = start_daemon(path=args.socket, client=_client, cache=_cache, log=_log, thread=False, root=args.root)
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=_daemon.shutdown, daemon=True).start())
+    print(f"serving {args.socket}", flush=True)
+    try:
+        _daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        _client.close()
+        stop_daemon(_daemon)
+        if args.metrics.strip() != '':
+            get_metrics().write(args.metrics)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s): standard library only so this starts in milliseconds
+# -
+import argparse
+import json
+import os
+import socket
+import sys
+
+
+# +
+# __doc__
+# -
+__doc__ = """
+  from src.mmt_daemon_client import *
+  _ans = send_command(action='GET', targetid=6593)
+
+  % python3 mmt_daemon_client.py --help
+"""
+
+
+# +
+# constant(s)
+# -
+MMT_DAEMON_SOCKET = os.getenv('MMT_SOCKET', f'/tmp/mmt-{os.getuid()}.sock')
+MMT_DAEMON_TIMEOUT = 300.0
+
+
+# +
+# function: send_command()
+# -
+def send_command(path=MMT_DAEMON_SOCKET, timeout=MMT_DAEMON_TIMEOUT, **command):
+    """ send one JSON command line to the daemon's unix socket, return its reply """
+    _sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    _sock.settimeout(timeout)
+    _sock.connect(path)
+    with _sock, _sock.makefile('rwb') as _f:
+        _f.write(json.dumps(command).encode('utf-8') + b'\n')
+        _f.flush()
+        _line = _f.readline()
+    if not _line:
+        raise Exception(f'no reply from daemon')
+    return json.loads(_line)
+
+
+# +
+# main()
+# -
+if __name__ == '__main__':
+
+    # noinspection PyTypeChecker
+    _p = argparse.ArgumentParser(description=f'MMT Daemon Client', formatter_class=argparse.RawTextHelpFormatter)
+    _p.add_argument(f'--action', default='GET', help=f"""Action, defaults to '%(default)s', or PING""")
+    _p.add_argument(f'--catalogid', default=None, help=f"""Catalog ID, defaults to the daemon's""")
+    _p.add_argument(f'--file', default='', help=f"""File (inside the daemon's --root), defaults to '%(default)s'""")
+    _p.add_argument(f'--payload', default='{}', help=f"""Payload, defaults to %(default)s""")
+    _p.add_argument(f'--programid', default=None, help=f"""Program ID, defaults to the daemon's""")
+    _p.add_argument(f'--retry', default=False, action='store_true',
+                    help=f'if present, retry POST and UPLOAD too (they are not idempotent)')
+    _p.add_argument(f'--save', default='',
+                    help=f"""Also write the uploaded png to this file (inside the daemon's --root)""")
+    _p.add_argument(f'--socket', default=MMT_DAEMON_SOCKET, help=f"""Daemon socket, defaults to %(default)s""")
+    _p.add_argument(f'--targetid', default=None, help=f"""Target ID, defaults to the daemon's""")
+    _p.add_argument(f'--token', default=None, help=f"""Token, defaults to the daemon's""")
+    args = _p.parse_args()
+
+    # execute (unset option(s) are left to the daemon's default(s))
+    _command = {'action': args.action, 'file': os.path.abspath(os.path.expanduser(args.file)) if args.file else '',
+                'payload': args.payload, 'save': os.path.abspath(os.path.expanduser(args.save)) if args.save else '',
+                'retry': bool(args.retry)}
+    for _k in ('catalogid', 'programid', 'targetid'):
+        if getattr(args, _k) is not None:
+            _command[_k] = int(getattr(args, _k))
+    if args.token is not None:
+        _command['token'] = args.token
+    try:
+        _ans = send_command(path=args.socket, **_command)
+    except Exception as _e:
+        print(json.dumps({'ok': False, 'error': f'{_e}'}))
+        sys.exit(2)
+    print(json.dumps(_ans))
+    sys.exit(0 if _ans.get('ok', False) else 1)
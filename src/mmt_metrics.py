@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from src import *
+from contextlib import nullcontext
+
+import argparse
+import bisect
+import tempfile
+import threading
+import time
+
+
+# +
+# __doc__
+# -
+__doc__ = """
+  from src.mmt_metrics import *
+  _m = get_metrics().enable()
+  with _m.timer('validate'):
+      ...
+  _m.write('mmt.prom')    # or 'mmt.json'
+
+  % MMT_METRICS=1 python3 mmt.py --action=GET --metrics=mmt.prom
+  % python3 mmt_metrics.py --file=mmt.json
+"""
+
+
+# +
+# constant(s)
+# -
+MMT_METRICS_ENABLED = os.getenv('MMT_METRICS', '').strip().lower() not in ('', '0', 'false', 'no')
+MMT_METRICS_BUCKETS = tuple(1.0e-6 * 2.0 ** (_i / 4.0) for _i in range(108))
+MMT_METRICS_QUANTILES = (0.5, 0.95, 0.99)
+MMT_METRICS_NULL_TIMER = nullcontext()
+
+
+# +
+# class: Histogram() inherits from the object class
+# -
+class Histogram(object):
+    """ fixed log-spaced bucket(s) from 1 us to ~2 min (4 per octave) so quantile(s) cost no memory per sample """
+
+    # +
+    # method: __init__
+    # -
+    def __init__(self):
+        self.__buckets = [0] * (len(MMT_METRICS_BUCKETS) + 1)
+        self.__count, self.__sum, self.__min, self.__max = 0, 0.0, math.inf, 0.0
+
+    # +
+    # Decorator(s)
+    # -
+    @property
+    def count(self):
+        return self.__count
+
+    @property
+    def sum(self):
+        return self.__sum
+
+    # +
+    # method: observe()
+    # -
+    def observe(self, value=0.0):
+        self.__buckets[bisect.bisect_left(MMT_METRICS_BUCKETS, value)] += 1
+        self.__count += 1
+        self.__sum += value
+        self.__min = min(self.__min, value)
+        self.__max = max(self.__max, value)
+
+    # +
+    # method: quantile()
+    # -
+    def quantile(self, q=0.5):
+        """ return the q-quantile interpolated within its bucket and clamped to the observed range """
+        if self.__count == 0:
+            return 0.0
+        _rank, _seen = q * self.__count, 0
+        for _i, _n in enumerate(self.__buckets):
+            if _n and _seen + _n >= _rank:
+                _lo = max(self.__min, MMT_METRICS_BUCKETS[_i - 1] if _i > 0 else 0.0)
+                _hi = min(self.__max, MMT_METRICS_BUCKETS[_i] if _i < len(MMT_METRICS_BUCKETS) else self.__max)
+                return _lo + (_hi - _lo) * max(0.0, _rank - _seen) / _n
+            _seen += _n
+        return self.__max
+
+    # +
+    # method: summary()
+    # -
+    def summary(self, seconds=0.0):
+        """ return {count, sum, mean, min, max, p50, p95, p99, rate} with rate per second over seconds """
+        _ret = {'count': self.__count, 'sum': self.__sum, 'mean': self.__sum / self.__count if self.__count else 0.0,
+                'min': self.__min if self.__count else 0.0, 'max': self.__max}
+        _ret.update({f'p{round(_q * 100)}': self.quantile(_q) for _q in MMT_METRICS_QUANTILES})
+        _ret['rate'] = self.__count / seconds if seconds > 0.0 else 0.0
+        return _ret
+
+
+# +
+# class: StageTimer() inherits from the object class
+# -
+class StageTimer(object):
+    """ context manager adding its elapsed time to one stage of a Metrics instance """
+
+    __slots__ = ('_metrics', '_stage', '_t0')
+
+    def __init__(self, metrics=None, stage=''):
+        self._metrics, self._stage, self._t0 = metrics, stage, 0.0
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, _type, _value, _traceback):
+        self._metrics.observe(self._stage, time.perf_counter() - self._t0)
+
+
+# +
+# class: Metrics() inherits from the object class
+# -
+# noinspection PyBroadException
+class Metrics(object):
+    """
+    thread-safe per-stage latency histogram(s), counter(s) and HTTP response / error count(s): when disabled
+    timer() hands back one shared no-op context and every other method returns at its first line
+    """
+
+    # +
+    # method: __init__
+    # -
+    def __init__(self, enabled=MMT_METRICS_ENABLED):
+
+        # define some variables and initialize them
+        self.__enabled = bool(enabled)
+        self.__lock = threading.Lock()
+        self.reset()
+
+    # +
+    # Decorator(s)
+    # -
+    @property
+    def enabled(self):
+        return self.__enabled
+
+    # +
+    # method: enable() / disable()
+    # -
+    def enable(self):
+        self.__enabled = True
+        return self
+
+    def disable(self):
+        self.__enabled = False
+        return self
+
+    # +
+    # method: reset()
+    # -
+    def reset(self):
+        with self.__lock:
+            self.__stages, self.__counters, self.__responses, self.__errors = {}, {}, {}, {}
+            self.__start = time.time()
+
+    # +
+    # method: timer()
+    # -
+    def timer(self, stage=''):
+        """ return a context manager timing stage """
+        return StageTimer(self, stage) if self.__enabled else MMT_METRICS_NULL_TIMER
+
+    # +
+    # method: observe()
+    # -
+    def observe(self, stage='', seconds=0.0):
+        if not self.__enabled:
+            return
+        with self.__lock:
+            _h = self.__stages.get(stage, None)
+            if _h is None:
+                _h = self.__stages[stage] = Histogram()
+            _h.observe(seconds)
+
+    # +
+    # method: count()
+    # -
+    def count(self, name='', value=1):
+        if not self.__enabled:
+            return
+        with self.__lock:
+            self.__counters[name] = self.__counters.get(name, 0) + value
+
+    # +
+    # method: error()
+    # -
+    def error(self, kind='connection'):
+        """ count a failure without a status code (e.g. a connection error or timeout) """
+        if not self.__enabled:
+            return
+        with self.__lock:
+            self.__errors[kind] = self.__errors.get(kind, 0) + 1
+
+    # +
+    # method: response()
+    # -
+    def response(self, _req=None):
+        """
+        count a response by status and its byte(s) sent / received, 4xx and 5xx also as error(s): the body is never
+        read here, received is Content-Length if given, else what has already come off the wire (0 for a chunked
+        stream=True response that has not been iterated yet)
+        """
+        if not self.__enabled or _req is None:
+            return
+        _body = getattr(getattr(_req, 'request', None), 'body', None)
+        _sent = len(_body) if isinstance(_body, (bytes, str)) else 0
+        _length = _req.headers.get('Content-Length', '')
+        try:
+            _received = int(_length) if _length.isdigit() else int(_req.raw.tell())
+        except Exception:
+            _received = 0
+        _code = int(_req.status_code)
+        with self.__lock:
+            self.__responses[_code] = self.__responses.get(_code, 0) + 1
+            if _code >= 400:
+                self.__errors[_code] = self.__errors.get(_code, 0) + 1
+            self.__counters['bytes_sent'] = self.__counters.get('bytes_sent', 0) + _sent
+            self.__counters['bytes_received'] = self.__counters.get('bytes_received', 0) + _received
+
+    # +
+    # method: snapshot()
+    # -
+    def snapshot(self):
+        """ return {enabled, start, seconds, stages: {stage: summary}, counters, responses, errors} """
+        with self.__lock:
+            _seconds = time.time() - self.__start
+            return {'enabled': self.__enabled, 'start': self.__start, 'seconds': _seconds,
+                    'stages': {_k: _v.summary(_seconds) for _k, _v in sorted(self.__stages.items())},
+                    'counters': dict(sorted(self.__counters.items())),
+                    'responses': {f'{_k}': _v for _k, _v in sorted(self.__responses.items())},
+                    'errors': {f'{_k}': _v for _k, _v in sorted(self.__errors.items(), key=lambda _x: f'{_x[0]}')}}
+
+    # +
+    # method: to_json()
+    # -
+    def to_json(self, indent=None):
+        return json.dumps(self.snapshot(), indent=indent)
+
+    # +
+    # method: to_prometheus()
+    # -
+    def to_prometheus(self):
+        """ return the snapshot in the Prometheus text exposition format (stage(s) as summaries) """
+        return snapshot_to_prometheus(self.snapshot())
+
+    # +
+    # method: write()
+    # -
+    def write(self, path=''):
+        """ atomically write a JSON (*.json) or Prometheus text (anything else, e.g. *.prom) file, return its path """
+        path = os.path.abspath(os.path.expanduser(path))
+        _text = self.to_json(indent=2) if path.lower().endswith('.json') else self.to_prometheus()
+        _fd, _tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.metrics.')
+        try:
+            with os.fdopen(_fd, 'w') as _f:
+                _f.write(_text)
+            os.replace(_tmp, path)
+        except Exception:
+            if os.path.exists(_tmp):
+                os.remove(_tmp)
+            raise
+        return path
+
+
+# +
+# function: snapshot_to_prometheus()
+# -
+def snapshot_to_prometheus(snapshot=None):
+    """ return a Metrics.snapshot() dictionary as Prometheus text """
+    _lines = ['# HELP mmt_stage_seconds Latency of each submission stage.', '# TYPE mmt_stage_seconds summary']
+    for _stage, _s in snapshot['stages'].items():
+        _lines += [f'mmt_stage_seconds{{stage="{_stage}",quantile="{_q}"}} {_s[f"p{round(_q * 100)}"]:.9g}'
+                   for _q in MMT_METRICS_QUANTILES]
+        _lines += [f'mmt_stage_seconds_sum{{stage="{_stage}"}} {_s["sum"]:.9g}',
+                   f'mmt_stage_seconds_count{{stage="{_stage}"}} {_s["count"]}']
+    for _name, _v in snapshot['counters'].items():
+        _lines += [f'# TYPE mmt_{_name}_total counter', f'mmt_{_name}_total {_v}']
+    for _metric, _key, _help in (('mmt_http_responses_total', 'responses', 'HTTP response(s) by status.'),
+                                 ('mmt_http_errors_total', 'errors', 'Failed request(s) by status or kind.')):
+        _lines += [f'# HELP {_metric} {_help}', f'# TYPE {_metric} counter']
+        for _code, _n in snapshot[_key].items():
+            _reason = HTTP_CODES.get(int(_code), '') if _code.isdigit() else _code
+            _lines += [f'{_metric}{{code="{_code}",reason="{_reason}"}} {_n}']
+    _lines += ['# TYPE mmt_uptime_seconds gauge', f"mmt_uptime_seconds {snapshot['seconds']:.3f}"]
+    return '\n'.join(_lines) + '\n'
+
+
+# +
+# default metrics
+# -
+_metrics = Metrics()
+
+
+# +
+# function: get_metrics()
+# -
+def get_metrics():
+    """ return the process-wide Metrics, enabled by MMT_METRICS=1 or enable() """
+    return _metrics
+
+
+# +
+# main()
+# -
+if __name__ == '__main__':
+
+    # noinspection PyTypeChecker
+    _p = argparse.ArgumentParser(description=f'MMT Metrics', formatter_class=argparse.RawTextHelpFormatter)
+    _p.add_argument(f'--file', default='', help=f"""JSON snapshot written by --metrics=*.json""")
+    args = _p.parse_args()
+
+    # execute: print a JSON snapshot as a table and as Prometheus text
+    with open(os.path.abspath(os.path.expanduser(args.file)), 'r') as _f:
+        _snapshot = json.load(_f)
+    print(f"{'stage':<16} {'count':>8} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'max ms':>10} {'rate/s':>10}")
+    for _k, _v in _snapshot['stages'].items():
+        print(f"{_k:<16} {_v['count']:>8} {_v['p50'] * 1000:>10.3f} {_v['p95'] * 1000:>10.3f} "
+              f"{_v['p99'] * 1000:>10.3f} {_v['max'] * 1000:>10.3f} {_v['rate']:>10.2f}")
+    print(snapshot_to_prometheus(_snapshot), end='')
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from src.mmt import *
+
+import sqlite3
+
+
+# +
+# __doc__
+# -
+__doc__ = """
+  from src.mmt_mirror import *
+  with TargetMirror() as _m:
+      _summary = _m.refresh(client=get_client())
+      _rows = _m.find(iscomplete=0, priority=1)
+
+  % python3 mmt_mirror.py --help
+"""
+
+
+# +
+# constant(s)
+# -
+MMT_MIRROR_DB = os.getenv('MMT_MIRROR', os.path.abspath(os.path.expanduser('~/.mmt_mirror.sqlite')))
+MMT_MIRROR_WORKERS = MMT_POOL_SIZE
+MMT_MIRROR_COLUMNS = tuple(_k for _k in MMT_JSON_KEYS if _k != 'id')
+MMT_MIRROR_SCHEMA = f"""
+    CREATE TABLE IF NOT EXISTS targets (id INTEGER PRIMARY KEY, {', '.join(MMT_MIRROR_COLUMNS)}, record TEXT,
+                                        synced REAL);
+    CREATE INDEX IF NOT EXISTS targets_complete_priority ON targets (iscomplete, priority);
+    CREATE INDEX IF NOT EXISTS targets_modified ON targets (modified);
+    CREATE INDEX IF NOT EXISTS targets_objectid ON targets (objectid);
+"""
+MMT_MIRROR_INSERT = f"INSERT OR REPLACE INTO targets VALUES ({', '.join('?' * (len(MMT_MIRROR_COLUMNS) + 3))})"
+
+
+# +
+# function: list_targets()
+# -
+# noinspection PyBroadException
+def list_targets(client=None, catalogid=MMT_CATALOGID, token=MMT_TOKEN, log=None, keys=None):
+    """ return the catalog's record(s) (only key(s) if given) streamed in one round trip, or None if unavailable """
+    client = client if isinstance(client, MMTClient) else get_client()
+    log = log if isinstance(log, logging.Logger) else None
+    try:
+        with client.get(url=f'{client.url}/', params={'catalogid': catalogid, 'token': token}, stream=True) as _req:
+            if _req.status_code != 200:
+                return None
+            return [{_k: _r.get(_k, None) for _k in keys} if keys else _r for _r in iter_records(_req)
+                    if isinstance(_r.get('id', None), int)]
+    except Exception as _e:
+        if log:
+            log.error(f"failed to list targets, error={_e}")
+        return None
+
+
+# +
+# class: TargetMirror() inherits from the object class
+# -
+# noinspection PyBroadException
+class TargetMirror(object):
+    """
+    local SQLite copy of catalogTarget record(s) keyed on id with one column per MMT_JSON_KEYS entry: refresh()
+    lists the catalog once and re-fetches, concurrently, only the target(s) whose 'modified' value changed
+    """
+
+    # +
+    # method: __init__
+    # -
+    def __init__(self, db=MMT_MIRROR_DB, log=None):
+
+        # get arguments(s)
+        self.db = db
+        self.log = log
+
+        # define some variables and initialize them
+        self.__con = sqlite3.connect(self.__db, timeout=60.0, isolation_level=None)
+        self.__con.execute('PRAGMA journal_mode=WAL')
+        self.__con.execute('PRAGMA synchronous=NORMAL')
+        self.__con.executescript(MMT_MIRROR_SCHEMA)
+
+    # +
+    # Decorator(s)
+    # -
+    @property
+    def db(self):
+        return self.__db
+
+    @db.setter
+    def db(self, db=MMT_MIRROR_DB):
+        self.__db = os.path.abspath(os.path.expanduser(db)) if (isinstance(db, str) and db.strip() != '') \
+            else MMT_MIRROR_DB
+
+    @property
+    def log(self):
+        return self.__log
+
+    @log.setter
+    def log(self, log=None):
+        self.__log = log if isinstance(log, logging.Logger) else None
+
+    # +
+    # method: _row()
+    # -
+    @staticmethod
+    def _row(_record=None, _now=0.0):
+        """ return the column value(s) of a record, nested value(s) as JSON text """
+        return (_record['id'], *[json.dumps(_record[_k]) if isinstance(_record.get(_k, None), (dict, list))
+                                 else _record.get(_k, None) for _k in MMT_MIRROR_COLUMNS],
+                json.dumps(_record), _now)
+
+    # +
+    # method: _execute_many()
+    # -
+    def _execute_many(self, _sql='', _rows=None):
+        """ run one statement over row(s) in a single transaction, return the changed row count """
+        self.__con.execute('BEGIN')
+        try:
+            _n = self.__con.executemany(_sql, _rows or []).rowcount
+            self.__con.execute('COMMIT')
+        except Exception:
+            self.__con.execute('ROLLBACK')
+            raise
+        return _n
+
+    # +
+    # method: upsert()
+    # -
+    def upsert(self, records=None):
+        """ insert or replace record(s), return the number stored """
+        _now = time.time()
+        return self._execute_many(MMT_MIRROR_INSERT, [self._row(_r, _now) for _r in (records or []) if
+                                                      isinstance(_r, dict) and isinstance(_r.get('id', None), int)])
+
+    # +
+    # method: delete()
+    # -
+    def delete(self, ids=None):
+        """ forget target(s), return the number removed """
+        return self._execute_many('DELETE FROM targets WHERE id=?', [(int(_i), ) for _i in ids or []])
+
+    # +
+    # method: get()
+    # -
+    def get(self, targetid=-1):
+        """ return the stored record or None """
+        _row = self.__con.execute('SELECT record FROM targets WHERE id=?', (targetid, )).fetchone()
+        return json.loads(_row[0]) if _row else None
+
+    # +
+    # method: modified()
+    # -
+    def modified(self):
+        """ return {id: modified} of every stored record """
+        return dict(self.__con.execute('SELECT id, modified FROM targets').fetchall())
+
+    # +
+    # method: query()
+    # -
+    def query(self, where='', args=None, order='id', limit=0):
+        """
+        return record(s) matching an SQL where clause over the MMT_JSON_KEYS column(s) sorted by order, one or more
+        comma-separated MMT_JSON_KEYS entries each optionally followed by ASC or DESC (e.g. 'priority DESC, id')
+        """
+        _order = []
+        for _term in f"{order or 'id'}".split(','):
+            _words = _term.split()
+            if not (1 <= len(_words) <= 2 and _words[0] in MMT_JSON_KEYS and
+                    (len(_words) == 1 or _words[1].upper() in ('ASC', 'DESC'))):
+                raise Exception(f'invalid order {order}, choices: {list(MMT_JSON_KEYS)} [ASC|DESC]')
+            _order.append(' '.join(_words[:1] + [_w.upper() for _w in _words[1:]]))
+        _sql = f"SELECT record FROM targets{f' WHERE {where}' if where.strip() else ''} ORDER BY {', '.join(_order)}"
+        _args = list(args or [])
+        if limit > 0:
+            _sql, _args = f'{_sql} LIMIT ?', _args + [limit]
+        return [json.loads(_r[0]) for _r in self.__con.execute(_sql, _args)]
+
+    # +
+    # method: find()
+    # -
+    def find(self, order='id', limit=0, **kwargs):
+        """ return record(s) whose column(s) equal the keyword value(s), e.g. find(iscomplete=0, priority=1) """
+        _bad = [_k for _k in kwargs if _k not in MMT_JSON_KEYS]
+        if _bad:
+            raise Exception(f'invalid key(s) {_bad}')
+        return self.query(' AND '.join(f'{_k}=?' for _k in kwargs), list(kwargs.values()), order, limit)
+
+    # +
+    # method: refresh()
+    # -
+    def refresh(self, client=None, ids=None, workers=MMT_MIRROR_WORKERS, catalogid=MMT_CATALOGID, token=MMT_TOKEN,
+                full=False):
+        """ bring the mirror up to date, return a summary {listed, fetched, unchanged, deleted, failed, seconds} """
+
+        # check input(s)
+        _t0 = time.perf_counter()
+        client = client if isinstance(client, MMTClient) else get_client()
+        workers = workers if (isinstance(workers, int) and workers > 0) else MMT_MIRROR_WORKERS
+        _only = {int(_i) for _i in ids} if ids else None
+        _local = self.modified()
+        _summary = {'listed': 0, 'fetched': 0, 'unchanged': 0, 'deleted': 0, 'failed': 0, 'seconds': 0.0}
+
+        # one listing tells which target(s) changed or went away, without it every known target is re-fetched
+        _listing = list_targets(client=client, catalogid=catalogid, token=token, log=self.__log,
+                                keys=('id', 'modified'))
+        if _listing is not None:
+            _remote = {_r['id']: _r.get('modified', None) for _r in _listing}
+            _summary['listed'] = len(_remote)
+            if _only is None:
+                _summary['deleted'] = self.delete([_i for _i in _local if _i not in _remote])
+            _remote = {_i: _m for _i, _m in _remote.items() if _only is None or _i in _only}
+            _todo = [_i for _i, _m in _remote.items() if full or _m is None or _local.get(_i, None) != _m]
+            _summary['unchanged'] = len(_remote) - len(_todo)
+        else:
+            _todo = sorted(_only or _local)
+
+        # fetch concurrently, store in this thread (the connection is not shared)
+        _records = []
+        with ThreadPoolExecutor(max_workers=workers) as _pool:
+            _futures = {_pool.submit(get_action, targetid=_i, client=client, log=self.__log): _i for _i in _todo}
+            for _f in as_completed(_futures):
+                try:
+                    _ans = _f.result()
+                except Exception:
+                    _ans = None
+                if isinstance(_ans, dict) and _ans.get('id', None) == _futures[_f]:
+                    _records.append(_ans)
+                else:
+                    _summary['failed'] += 1
+                    if self.__log:
+                        self.__log.error(f"failed to fetch target {_futures[_f]}, response={_ans}")
+        if _listing is None:
+            _summary['unchanged'] = sum(1 for _r in _records if _local.get(_r['id'], None) == _r.get('modified', None))
+        _summary['fetched'] = self.upsert(_records)
+        _summary['seconds'] = round(time.perf_counter() - _t0, 6)
+        if self.__log:
+            self.__log.info(f"refresh {_summary}")
+        return _summary
+
+    # +
+    # method: close()
+    # -
+    def close(self):
+        try:
+            self.__con.close()
+        except:
+            pass
+
+    # +
+    # context manager(s)
+    # -
+    def __enter__(self):
+        return self
+
+    def __exit__(self, _type, _value, _traceback):
+        self.close()
+
+
+# +
+# main()
+# -
+if __name__ == '__main__':
+
+    # noinspection PyTypeChecker
+    _p = argparse.ArgumentParser(description=f'MMT Target Mirror', formatter_class=argparse.RawTextHelpFormatter)
+    _p.add_argument(f'--catalogid', default=MMT_CATALOGID, help=f"""Catalog ID, defaults to %(default)s""")
+    _p.add_argument(f'--db', default=MMT_MIRROR_DB, help=f"""mirror database, defaults to %(default)s""")
+    _p.add_argument(f'--full', default=False, action='store_true', help=f'if present, re-fetch every target')
+    _p.add_argument(f'--no-refresh', default=False, action='store_true', help=f'if present, query the mirror only')
+    _p.add_argument(f'--order', default='id', help=f"""sort order, defaults to '%(default)s'""")
+    _p.add_argument(f'--token', default=MMT_TOKEN, help=f"""API token, defaults to '%(default)s'""")
+    _p.add_argument(f'--where', default='', help=f"""SQL where clause, e.g. 'iscomplete=0 AND priority=1'""")
+    _p.add_argument(f'--workers', default=MMT_MIRROR_WORKERS, help=f"""thread(s), defaults to %(default)s""")
+    args = _p.parse_args()
+
+    # execute
+    with TargetMirror(db=args.db) as _mirror:
+        if not bool(args.no_refresh):
+            print(json.dumps(_mirror.refresh(client=get_client(pool_size=int(args.workers)), workers=int(args.workers),
+                                             catalogid=int(args.catalogid), token=args.token, full=bool(args.full))))
+        for _record in _mirror.query(where=args.where, order=args.order):
+            print(json.dumps(_record))
@@ -7,6 +7,7 @@
 from src import *
 from src.mmt_token import *
 
+import bisect
 import re
 
 
@@ -93,20 +94,108 @@ MMT_SPECTROSCOPY_PAYLOAD = {
 }
 
 
+# +
+# class: GratingIndex() inherits from the object class
+# -
+class GratingIndex(object):
+    """
+    sorted interval index of grating central wavelength range(s): each grating's range(s) are merged into disjoint
+    sorted start(s) / end(s) for bisect checks, and all range end point(s) split the axis into elementary piece(s)
+    that each list the (grating, range) pair(s) covering them for the reverse query
+    """
+
+    # +
+    # method: __init__
+    # -
+    def __init__(self, gratings=None):
+
+        # get argument(s)
+        self.__gratings = gratings if isinstance(gratings, dict) else MMT_SPECTROSCOPY_GRATINGS
+
+        # per grating: merged [start, end] interval(s)
+        self.__starts, self.__ends = {}, {}
+        for _k, _ranges in self.__gratings.items():
+            _merged = []
+            for _lo, _hi in sorted((float(_r['min']), float(_r['max'])) for _r in _ranges):
+                if _merged and _lo <= _merged[-1][1]:
+                    _merged[-1][1] = max(_merged[-1][1], _hi)
+                else:
+                    _merged.append([_lo, _hi])
+            self.__starts[_k], self.__ends[_k] = [_m[0] for _m in _merged], [_m[1] for _m in _merged]
+
+        # all grating(s): end point(s) and the pair(s) covering each point and each open piece between points
+        _pairs = [(_k, _r) for _k, _ranges in self.__gratings.items() for _r in _ranges]
+        self.__points = sorted({float(_r[_m]) for _, _r in _pairs for _m in ('min', 'max')})
+        self.__at = [[(_k, _r) for _k, _r in _pairs if _r['min'] <= _p <= _r['max']] for _p in self.__points]
+        self.__between = [[(_k, _r) for _k, _r in _pairs if _r['min'] <= _a and _b <= _r['max']]
+                          for _a, _b in zip(self.__points[:-1], self.__points[1:])]
+
+    # +
+    # Decorator(s)
+    # -
+    @property
+    def gratings(self):
+        return self.__gratings
+
+    # +
+    # method: contains()
+    # -
+    def contains(self, grating='270', wavelength=6669.5):
+        """ return True if wavelength lies in one of the grating's range(s) """
+        _starts = self.__starts.get(grating, None) if isinstance(grating, str) else None
+        if not _starts or not isinstance(wavelength, (int, float)):
+            return False
+        _i = bisect.bisect_right(_starts, wavelength) - 1
+        return _i >= 0 and wavelength <= self.__ends[grating][_i]
+
+    # +
+    # method: contains_array()
+    # -
+    def contains_array(self, gratings=None, wavelengths=None):
+        """ return a boolean array for one grating or a grating per wavelength, searchsorted per grating """
+        import numpy as np
+        _w = np.asarray(wavelengths, dtype=float).ravel()
+        _g = np.asarray(gratings).ravel()
+        _ok = np.zeros(_w.shape, dtype=bool)
+        if _g.dtype.kind not in 'UO':
+            return _ok
+        _g = np.broadcast_to(_g, _w.shape)
+        for _k, _starts in self.__starts.items():
+            _sel = np.flatnonzero(_g == _k)
+            if _sel.size == 0:
+                continue
+            _i = np.searchsorted(_starts, _w[_sel], side='right') - 1
+            _ok[_sel] = (_i >= 0) & (_w[_sel] <= np.asarray(self.__ends[_k])[np.maximum(_i, 0)])
+        return _ok
+
+    # +
+    # method: query()
+    # -
+    def query(self, wavelength=6669.5):
+        """ return the (grating, range) pair(s) covering wavelength """
+        if not isinstance(wavelength, (int, float)) or not self.__points:
+            return []
+        _i = bisect.bisect_left(self.__points, wavelength)
+        if _i < len(self.__points) and self.__points[_i] == wavelength:
+            return list(self.__at[_i])
+        return list(self.__between[_i - 1]) if 0 < _i < len(self.__points) else []
+
+
+# +
+# grating index
+# -
+MMT_SPECTROSCOPY_INDEX = GratingIndex(MMT_SPECTROSCOPY_GRATINGS)
+
+
 # +
 # function: verify_spectroscopy_wavelength()
 # -
 # noinspection PyBroadException
 def verify_spectroscopy_wavelength(_grating='270', _value=6669.5):
-    if _grating.strip() in MMT_SPECTROSCOPY_GRATINGS:
-        try:
-            for _i in range(len(MMT_SPECTROSCOPY_GRATINGS[_grating])):
-                if MMT_SPECTROSCOPY_GRATINGS[_grating][_i]['min'] <= float(_value) \
-                        <= MMT_SPECTROSCOPY_GRATINGS[_grating][_i]['max']:
-                    return True
-        except:
-            pass
-    return False
+    try:
+        return MMT_SPECTROSCOPY_INDEX.contains(_grating, float(_value))
+    except:
+        return False
 
 
 # +
@@ -175,6 +264,8 @@ def verify_imaging_payload(payload=None, _log=None):
     # combine payload(s)
     _data = {**MMT_IMAGING_PAYLOAD, **payload}
     _data = verify_common_payload(_data=_data, _log=_log)
+    if _data == {}:
+        return {}
 
     # reject critical value(s) that are not set properly
     if _data['filter'] not in MMT_IMAGING_FILTERS:
@@ -209,6 +300,8 @@ def verify_spectroscopy_payload(payload=None, _log=None):
     # combine payload(s)
     _data = {**MMT_SPECTROSCOPY_PAYLOAD, **payload}
     _data = verify_common_payload(_data=_data, _log=_log)
+    if _data == {}:
+        return {}
 
     # reject critical value(s) that are not set properly
     if _data['filter'] not in MMT_SPECTROSCOPY_FILTERS:
@@ -248,3 +341,28 @@ def verify_spectroscopy_payload(payload=None, _log=None):
 
     # return
     return _data
+
+
+# +
+# function: verify_payload()
+# -
+def verify_payload(payload=None, _log=None):
+
+    # check input(s)
+    _log = _log if isinstance(_log, logging.Logger) else None
+    if payload is None or not isinstance(payload, dict) or payload == {}:
+        return {}
+
+    # dispatch on observation type
+    if 'observationtype' not in payload or not isinstance(payload['observationtype'], str):
+        if _log:
+            _log.error(f"failed to find key 'observationtype' in {payload}")
+        return {}
+    _otype = payload['observationtype'].strip().lower()
+    if _otype in ('imaging', 'mask'):
+        return verify_imaging_payload(payload=payload, _log=_log)
+    elif _otype == 'longslit':
+        return verify_spectroscopy_payload(payload=payload, _log=_log)
+    if _log:
+        _log.error(f"invalid key 'observationtype'={_otype}")
+    return {}
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from src.mmt import *
+
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import wait
+
+
+# +
+# __doc__
+# -
+__doc__ = """
+  from src.mmt_prefetch import *
+  for _r in prefetch_iter(items=[6590, 6591, ('22:35:58', '+33:57:36')], upload=True):
+      print(_r)
+
+  % python3 mmt_prefetch.py --help
+"""
+
+
+# +
+# constant(s)
+# -
+MMT_PREFETCH_PROCESSES = min(4, os.cpu_count() or 1)
+MMT_PREFETCH_WORKERS = 16
+
+
+# +
+# function: get_item()
+# -
+def get_item(_item=None):
+    """ return (targetid, ra, dec) from a target id, an (ra, dec) pair or a dictionary with either """
+    if isinstance(_item, int):
+        return _item, None, None
+    if isinstance(_item, (list, tuple)) and len(_item) == 2:
+        return None, f'{_item[0]}', f'{_item[1]}'
+    if isinstance(_item, dict):
+        _id = _item.get('targetid', _item.get('id', None))
+        return _id if isinstance(_id, int) else None, _item.get('ra', None), _item.get('dec', None)
+    return None, None, None
+
+
+# +
+# function: fetch_chart()
+# -
+# noinspection PyBroadException
+def fetch_chart(_item=None, cache=None, client=None, log=None):
+    """ network stage: resolve RA, Dec (via GET if required), return (result, jpeg bytes or b'' on a cache hit) """
+
+    _t0, _jpg = time.perf_counter(), b''
+    _targetid, _ra, _dec = get_item(_item)
+    _ret = {'item': _item, 'targetid': _targetid, 'ra': _ra, 'dec': _dec, 'key': '', 'png': '',
+            'status': 'failed', 'error': None, 'fetch': 0.0, 'convert': 0.0, 'upload': 0.0}
+    try:
+        if _ra is None or _dec is None:
+            _json = get_action(**{'targetid': _targetid, 'client': client, 'log': log}) \
+                if _targetid is not None else None
+            if not isinstance(_json, dict):
+                raise Exception(f'unable to get RA, Dec for item={_item}')
+            _ret['ra'], _ret['dec'] = _json['ra'], _json['dec']
+        _ret['key'] = cache.key(ra=_ret['ra'], dec=_ret['dec'])
+        if _ret['key'] == '':
+            raise Exception(f"invalid RA, Dec, ra={_ret['ra']}, dec={_ret['dec']}")
+        _png = cache.get(_ret['key'])
+        if _png is not None:
+            _ret['png'], _ret['status'] = _png, 'cached'
+        else:
+            _jpg = get_finder_chart_bytes(**{'ra': _ret['ra'], 'dec': _ret['dec'], 'log': log})
+            if not _jpg:
+                raise Exception(f"failed to download finder chart, ra={_ret['ra']}, dec={_ret['dec']}")
+            _ret['status'] = 'fetched'
+    except Exception as _e:
+        _ret['error'] = f'{_e}'
+    _ret['fetch'] = round(time.perf_counter() - _t0, 6)
+    return _ret, _jpg
+
+
+# +
+# function: prefetch_iter()
+# -
+# noinspection PyBroadException
+def prefetch_iter(items=None, upload=False, workers=MMT_PREFETCH_WORKERS, processes=MMT_PREFETCH_PROCESSES,
+                  catalogid=MMT_CATALOGID, programid=MMT_PROGRAMID, token=MMT_TOKEN, cache=None, client=None,
+                  log=None):
+    """
+    yield one result dictionary per item as soon as its finder chart is ready (and uploaded if upload=True):
+    GET and SDSS download(s) run on a thread pool, png conversion on a process pool (or the thread pool if
+    processes=0) and each finished chart is handed to the upload stage immediately, so the stages overlap
+    """
+
+    # check input(s)
+    log = log if isinstance(log, logging.Logger) else None
+    workers = workers if (isinstance(workers, int) and workers > 0) else MMT_PREFETCH_WORKERS
+    processes = processes if (isinstance(processes, int) and processes >= 0) else MMT_PREFETCH_PROCESSES
+    cache = cache if isinstance(cache, FinderCache) else get_cache()
+    client = client if isinstance(client, MMTClient) else get_client(pool_size=workers)
+
+    def _convert_done(_r, _f):
+        try:
+            _r['png'] = cache.put(_r['key'], _data=_f.result())
+            _r['status'] = 'converted'
+        except Exception as _e:
+            _r['status'], _r['error'] = 'failed', f'{_e}'
+        return _r
+
+    def _upload(_r):
+        _t0 = time.perf_counter()
+        try:
+            _ans = upload_action(**{'catalogid': catalogid, 'file': _r['png'], 'programid': programid,
+                                    'targetid': _r['targetid'], 'token': token, 'client': client, 'cache': cache,
+                                    'findingchartfilename': f"{_r['targetid']}.png", 'log': log})
+            _ok = isinstance(_ans, dict) and 'id' in _ans
+            _r['status'], _r['error'] = ('uploaded', None) if _ok else ('failed', f'{_ans}')
+        except Exception as _e:
+            _r['status'], _r['error'] = 'failed', f'{_e}'
+        _r['upload'] = round(time.perf_counter() - _t0, 6)
+        return _r
+
+    _threads = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mmt_prefetch')
+    _procs = ProcessPoolExecutor(max_workers=processes) if processes > 0 else _threads
+    _pending = {}
+    try:
+        for _item in (items or []):
+            _pending[_threads.submit(fetch_chart, _item, cache, client, log)] = ('fetch', None, 0.0)
+
+        while _pending:
+            _done, _ = wait(_pending, return_when=FIRST_COMPLETED)
+            for _f in _done:
+                _stage, _r, _t0 = _pending.pop(_f)
+
+                # fetch -> convert (or straight to upload on a cache hit)
+                if _stage == 'fetch':
+                    _r, _jpg = _f.result()
+                    if _r['status'] == 'fetched':
+                        _pending[_procs.submit(jpg_to_png_bytes, _jpg)] = ('convert', _r, time.perf_counter())
+                        continue
+
+                # convert -> upload
+                elif _stage == 'convert':
+                    _r = _convert_done(_r, _f)
+                    _r['convert'] = round(time.perf_counter() - _t0, 6)
+
+                # upload -> done
+                elif _stage == 'upload':
+                    _r = _f.result()
+                    yield _r
+                    continue
+
+                if upload and _r['status'] != 'failed' and isinstance(_r['targetid'], int):
+                    _pending[_threads.submit(_upload, _r)] = ('upload', _r, 0.0)
+                else:
+                    yield _r
+    finally:
+        _threads.shutdown(wait=True, cancel_futures=True)
+        if _procs is not _threads:
+            _procs.shutdown(wait=True, cancel_futures=True)
+
+
+# +
+# function: prefetch()
+# -
+def prefetch(items=None, upload=False, **kwargs):
+    """ return list of prefetch_iter() result(s) in completion order """
+    return list(prefetch_iter(items=items, upload=upload, **kwargs))
+
+
+# +
+# function: read_items()
+# -
+def read_items(_file=''):
+    """ return item(s) from a file of 'targetid' or 'ra dec' line(s) """
+    _items = []
+    with open(os.path.abspath(os.path.expanduser(_file)), 'r') as _f:
+        for _line in _f:
+            _fields = _line.replace(',', ' ').split()
+            if len(_fields) == 1 and _fields[0].isdigit():
+                _items.append(int(_fields[0]))
+            elif len(_fields) == 2:
+                _items.append((_fields[0], _fields[1]))
+    return _items
+
+
+# +
+# main()
+# -
+if __name__ == '__main__':
+
+    # noinspection PyTypeChecker
+    _p = argparse.ArgumentParser(description=f'MMT Finder Chart Prefetch',
+                                 formatter_class=argparse.RawTextHelpFormatter)
+    _p.add_argument(f'--cache', default=MMT_CACHE_DIR,
+                    help=f"""Finder chart cache directory, defaults to '%(default)s'""")
+    _p.add_argument(f'--catalogid', default=MMT_CATALOGID, help=f"""Catalog ID, defaults to %(default)s""")
+    _p.add_argument(f'--file', default='',
+                    help=f"""File of 'targetid' or 'ra dec' line(s), defaults to '%(default)s'""")
+    _p.add_argument(f'--processes', default=MMT_PREFETCH_PROCESSES,
+                    help=f"""Conversion process(es), defaults to %(default)s""")
+    _p.add_argument(f'--programid', default=MMT_PROGRAMID, help=f"""Program ID, defaults to %(default)s""")
+    _p.add_argument(f'--targetids', default='',
+                    help=f"""Comma-separated target ID(s), defaults to '%(default)s'""")
+    _p.add_argument(f'--token', default=MMT_TOKEN, help=f"""Token, defaults to %(default)s""")
+    _p.add_argument(f'--upload', default=False, action='store_true', help=f'if present, upload chart(s)')
+    _p.add_argument(f'--url', default=MMT_URL, help=f"""catalogTarget URL, defaults to %(default)s""")
+    _p.add_argument(f'--verbose', default=False, action='store_true', help=f'if present, produce verbose output')
+    _p.add_argument(f'--workers', default=MMT_PREFETCH_WORKERS,
+                    help=f"""Network worker(s), defaults to %(default)s""")
+    args = _p.parse_args()
+
+    # get logger (if required)
+    _log = Logger('MMT').logger if bool(args.verbose) else None
+
+    # execute
+    _items = [int(_t) for _t in args.targetids.split(',') if _t.strip() != '']
+    _items += read_items(args.file) if args.file.strip() != '' else []
+    _t0 = time.perf_counter()
+    for _r in prefetch_iter(items=_items, upload=bool(args.upload), workers=int(args.workers),
+                            processes=int(args.processes), catalogid=int(args.catalogid),
+                            programid=int(args.programid), token=args.token, cache=FinderCache(path=args.cache),
+                            client=get_client(url=args.url, pool_size=int(args.workers)), log=_log):
+        print(json.dumps({_k: _v for _k, _v in _r.items() if _k != 'key'}))
+    print(f"# {len(_items)} item(s) in {time.perf_counter() - _t0:.3f}s", file=sys.stderr)
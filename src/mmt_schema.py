@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from src.mmt_parameters import *
+
+
+# +
+# __doc__
+# -
+__doc__ = """
+  from src.mmt_schema import *
+  _data, _errors = validate_payload({'ra': '22:35:58', 'dec': '+33:57:36', 'observationtype': 'imaging', ...})
+"""
+
+
+# +
+# schema(s): (key, rule, argument, action) where action 'reject' is an error and 'default' resets the value
+#   rule: 'choice' (value in argument), 'choice_lower' (str.strip().lower() in argument), 'float' (finite float
+#   with argument=(min, max) or None), 'int' (int with argument=(min, max)), 'int_choice' (int in argument),
+#   'pattern' (str matching regex argument), 'ra' / 'dec' (as 'pattern' and also set ra_decimal / dec_decimal),
+#   'string' (non-blank str)
+# -
+MMT_COMMON_SCHEMA = (
+    ('dec', 'dec', DEC_PATTERN, 'reject'),
+    ('exposuretime', 'float', (0.0, math.inf), 'reject'),
+    ('magnitude', 'float', None, 'reject'),
+    ('observationtype', 'choice_lower', MMT_OBSERVATION_TYPE, 'reject'),
+    ('objectid', 'string', None, 'reject'),
+    ('ra', 'ra', RA_PATTERN, 'reject'),
+    ('numberexposures', 'int', (0, math.inf), 'default'),
+    ('photometric', 'int_choice', MMT_PHOTOMETRIC, 'default'),
+    ('priority', 'int_choice', MMT_PRIORITY, 'default'),
+)
+MMT_IMAGING_SCHEMA = MMT_COMMON_SCHEMA + (
+    ('filter', 'choice', MMT_IMAGING_FILTERS, 'reject'),
+    ('maskid', 'int_choice', MMT_IMAGING_MASKS, 'default'),
+    ('pa', 'float', (-360.0, 360.0), 'default'),
+    ('pm_dec', 'float', None, 'default'),
+    ('pm_ra', 'float', None, 'default'),
+)
+MMT_SPECTROSCOPY_SCHEMA = MMT_COMMON_SCHEMA + (
+    ('filter', 'choice', MMT_SPECTROSCOPY_FILTERS, 'reject'),
+    ('centralwavelength', 'float', None, 'reject'),
+    ('grating', 'choice', tuple(MMT_SPECTROSCOPY_GRATINGS), 'reject'),
+    ('maskid', 'int_choice', tuple(MMT_SPECTROSCOPY_MASKS.values()), 'reject'),
+    ('slitwidth', 'choice', tuple(MMT_SPECTROSCOPY_SLITWIDTH), 'reject'),
+    ('pa', 'float', (-360.0, 360.0), 'default'),
+    ('pm_dec', 'float', None, 'default'),
+    ('pm_ra', 'float', None, 'default'),
+)
+
+# a:b:c[.ddd] with nothing else, the range(s) are already enforced by RA_PATTERN / DEC_PATTERN
+MMT_SEXAGESIMAL = re.compile(r'([+-]?)([0-9]+):([0-9]+):([0-9]+(?:\.[0-9]*)?)\Z')
+
+# one bit per rejectable key (plus the grating / wavelength combination) for compact per-record error codes
+MMT_ERROR_CODES = {_k: 1 << _i for _i, _k in enumerate(
+    ['centralwavelength', 'dec', 'exposuretime', 'filter', 'grating', 'magnitude', 'maskid', 'objectid',
+     'observationtype', 'ra', 'slitwidth', 'wavelength'])}
+
+
+# +
+# function: compile_rule()
+# -
+def compile_rule(_rule='', _arg=None, _i=0, _namespace=None):
+    """ return a python expression in _v for one schema rule, adding its constant(s) to _namespace """
+    if _rule in ('choice', 'int_choice'):
+        _namespace[f'_s{_i}'] = frozenset(_arg)
+        _namespace[f'_t{_i}'] = (int, ) if _rule == 'int_choice' else tuple({type(_x) for _x in _arg})
+        return f'isinstance(_v, _t{_i}) and _v in _s{_i}'
+    if _rule == 'choice_lower':
+        _namespace[f'_s{_i}'] = frozenset(_arg)
+        return f'isinstance(_v, str) and _v.strip().lower() in _s{_i}'
+    if _rule in ('float', 'int'):
+        _namespace[f'_lo{_i}'], _namespace[f'_hi{_i}'] = _arg if _arg is not None else (-math.inf, math.inf)
+        return f'isinstance(_v, {_rule}) and _lo{_i} <= _v <= _hi{_i}'
+    if _rule == 'pattern':
+        _namespace[f'_m{_i}'] = re.compile(_arg).match
+        return f'isinstance(_v, str) and _m{_i}(_v) is not None'
+    if _rule == 'string':
+        return f"isinstance(_v, str) and _v.strip() != ''"
+    raise Exception(f'invalid rule {_rule}')
+
+
+# +
+# function: compile_schema()
+# -
+def compile_schema(schema=MMT_IMAGING_SCHEMA, defaults=None, wavelength=False):
+    """ return a function payload -> (data, errors) generated from the schema with every check inlined """
+    _namespace = {'_defaults': dict(defaults or {}), '_wavelength': verify_spectroscopy_wavelength,
+                  '_sexagesimal': MMT_SEXAGESIMAL.match, '_ra': ra_to_decimal, '_dec': dec_to_decimal}
+    _lines = ['def _validate(payload):', '    _data, _errors = {**_defaults, **payload}, {}']
+    for _i, (_k, _rule, _arg, _action) in enumerate(schema):
+        _namespace[f'_d{_i}'] = _namespace['_defaults'].get(_k, None)
+        _expr = compile_rule('pattern' if _rule in ('ra', 'dec') else _rule, _arg, _i, _namespace)
+        _lines += [f'    _v = _data.get({_k!r})', f'    if not ({_expr}):',
+                   f"        _errors[{_k!r}] = f'invalid {_k} {{_v}}'" if _action == 'reject' else
+                   f'        _data[{_k!r}] = _d{_i}']
+
+        # plain a:b:c value(s) are converted from the match group(s), anything else by the full parser
+        if _rule in ('ra', 'dec'):
+            _scale = 15.0 if _rule == 'ra' else 1.0
+            _lines += ['    else:', '        _g = _sexagesimal(_v)',
+                       f"        _data['{_rule}_decimal'] = _{_rule}(_v) if _g is None else "
+                       f"(-{_scale} if _g[1] == '-' else {_scale}) * "
+                       f"(int(_g[2]) + int(_g[3]) / 60.0 + float(_g[4]) / 3600.0)"]
+    if wavelength:
+        _lines += ["    if not _errors and not _wavelength(_data['grating'], _data['centralwavelength']):",
+                   "        _errors['wavelength'] = "
+                   "f\"invalid grating wavelength {_data['grating']} / {_data['centralwavelength']}\""]
+    _lines += ['    return _data, _errors']
+    exec(compile('\n'.join(_lines), f'<schema {id(schema)}>', 'exec'), _namespace)
+    return _namespace['_validate']
+
+
+# +
+# class: PayloadValidator() inherits from the object class
+# -
+# noinspection PyBroadException
+class PayloadValidator(object):
+    """
+    a schema compiled once into a single generated function: validate() merges the default payload, resets
+    out-of-range optional value(s) and collects every rejected key instead of stopping at the first
+    """
+
+    # +
+    # method: __init__
+    # -
+    def __init__(self, schema=MMT_IMAGING_SCHEMA, defaults=None, wavelength=False):
+
+        # get arguments(s)
+        self.__defaults = dict(defaults or MMT_IMAGING_PAYLOAD)
+
+        # compile
+        self.__validate = compile_schema(schema, self.__defaults, wavelength)
+
+    # +
+    # Decorator(s)
+    # -
+    @property
+    def defaults(self):
+        return self.__defaults
+
+    # +
+    # method: validate()
+    # -
+    def validate(self, payload=None):
+        """ return (normalized payload, {}) or ({}, {key: message}) """
+        if not isinstance(payload, dict) or payload == {}:
+            return {}, {'payload': f'invalid payload {payload}'}
+        _data, _errors = self.__validate(payload)
+        return ({}, _errors) if _errors else (_data, _errors)
+
+
+# +
+# compiled validator(s)
+# -
+MMT_IMAGING_VALIDATOR = PayloadValidator(MMT_IMAGING_SCHEMA, MMT_IMAGING_PAYLOAD)
+MMT_SPECTROSCOPY_VALIDATOR = PayloadValidator(MMT_SPECTROSCOPY_SCHEMA, MMT_SPECTROSCOPY_PAYLOAD, wavelength=True)
+MMT_VALIDATORS = {'imaging': MMT_IMAGING_VALIDATOR, 'mask': MMT_IMAGING_VALIDATOR,
+                  'longslit': MMT_SPECTROSCOPY_VALIDATOR}
+
+
+# +
+# function: get_error_code()
+# -
+def get_error_code(_errors=None):
+    """ return the bitwise OR of MMT_ERROR_CODES for the key(s) in _errors """
+    _code = 0
+    for _k in (_errors or {}):
+        _code |= MMT_ERROR_CODES.get(_k, 0)
+    return _code
+
+
+# +
+# function: get_error_keys()
+# -
+def get_error_keys(_code=0):
+    """ return the MMT_ERROR_CODES key(s) set in _code """
+    return [_k for _k, _v in MMT_ERROR_CODES.items() if int(_code) & _v]
+
+
+# +
+# function: validate_payload()
+# -
+def validate_payload(payload=None, _log=None):
+    """ return (normalized payload, {}) or ({}, {key: message}) dispatching on observationtype """
+    _log = _log if isinstance(_log, logging.Logger) else None
+    _otype = payload.get('observationtype', None) if isinstance(payload, dict) else None
+    _validator = (MMT_VALIDATORS.get(_otype, None) or MMT_VALIDATORS.get(_otype.strip().lower(), None)) \
+        if isinstance(_otype, str) else None
+    if _validator is None:
+        _data, _errors = {}, {'observationtype': f'invalid observationtype {_otype}'}
+    else:
+        _data, _errors = _validator.validate(payload)
+    if _log and _errors:
+        _log.error(f"{'; '.join(_errors.values())}")
+    return _data, _errors
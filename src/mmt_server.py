@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from src import MMT_JSON_KEYS
+from datetime import datetime
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+
+import argparse
+import json
+import random
+import threading
+import time
+
+
+# +
+# __doc__
+# -
+__doc__ = """
+  from src.mmt_server import *
+  _server, _url = start_server(faults=MMTFaults(latency=0.05, error_rate=0.01, rate=100.0, token='secret'))
+
+  % python3 mmt_server.py --help
+"""
+
+
+# +
+# constant(s)
+# -
+MMT_SERVER_HOST = '127.0.0.1'
+MMT_SERVER_PATH = '/APIv2/catalogTarget'
+MMT_SERVER_PORT = 8765
+MMT_SERVER_ERRORS = (500, 502, 503)
+
+
+# +
+# class: MMTFaults() inherits from the object class
+# -
+class MMTFaults(object):
+    """
+    injected server behaviour: latency (+ uniform jitter) second(s) per request, a fraction error_rate of request(s)
+    answered with one of MMT_SERVER_ERRORS, 429 (with Retry-After) above rate request(s)/second, and 401 unless
+    POST / PUT / UPLOAD carry token (if set)
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, rate=0.0, burst=10, retry_after=1, token='', seed=None):
+        self.latency = max(0.0, float(latency))
+        self.jitter = max(0.0, float(jitter))
+        self.error_rate = min(1.0, max(0.0, float(error_rate)))
+        self.rate = max(0.0, float(rate))
+        self.burst = max(1.0, float(burst))
+        self.retry_after = retry_after
+        self.token = token if isinstance(token, str) else ''
+        self.__lock = threading.Lock()
+        self.__random = random.Random(seed)
+        self.__tokens, self.__last = self.burst, time.monotonic()
+        self.__stats = {}
+
+    @property
+    def stats(self):
+        """ return {status: count} of every reply so far """
+        with self.__lock:
+            return dict(self.__stats)
+
+    def count(self, _code=200):
+        with self.__lock:
+            self.__stats[_code] = self.__stats.get(_code, 0) + 1
+
+    def delay(self):
+        with self.__lock:
+            return self.latency + (self.__random.uniform(0.0, self.jitter) if self.jitter > 0.0 else 0.0)
+
+    def throttled(self):
+        """ take a token from the bucket, return True if there was none """
+        if self.rate <= 0.0:
+            return False
+        with self.__lock:
+            _now = time.monotonic()
+            self.__tokens = min(self.burst, self.__tokens + (_now - self.__last) * self.rate)
+            self.__last = _now
+            if self.__tokens < 1.0:
+                return True
+            self.__tokens -= 1.0
+            return False
+
+    def error(self):
+        """ return an error status for a fraction error_rate of call(s), else None """
+        if self.error_rate <= 0.0:
+            return None
+        with self.__lock:
+            return self.__random.choice(MMT_SERVER_ERRORS) if self.__random.random() < self.error_rate else None
+
+
+# +
+# function: parse_multipart()
+# -
+# noinspection PyBroadException
+def parse_multipart(_body=b'', _content_type=''):
+    """ return ({field: value}, {field: (filename, bytes)}) of a multipart/form-data body, ({}, {}) if it is not """
+    _fields, _files = {}, {}
+    if not _content_type.lower().startswith('multipart/form-data'):
+        return _fields, _files
+    try:
+        _msg = BytesParser(policy=HTTP).parsebytes(b'Content-Type: ' + _content_type.encode('latin-1') + b'\r\n\r\n' +
+                                                   _body)
+        for _part in _msg.iter_parts():
+            _name = _part.get_param('name', header='content-disposition')
+            _filename = _part.get_filename()
+            _data = _part.get_payload(decode=True) or b''
+            if _filename is not None:
+                _files[_name] = (_filename, _data)
+            else:
+                _fields[_name] = _data.decode('utf-8', errors='replace')
+    except Exception:
+        return {}, {}
+    return _fields, _files
+
+
+# +
+# class: MMTStore() inherits from the object class
+# -
+class MMTStore(object):
+    """ thread-safe in-memory catalogTarget records """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__next = 1
+        self.__records = {}
+
+    @staticmethod
+    def _filter(_data=None):
+        """ keep known key(s) and stamp 'modified' unless the caller set it """
+        _data = {_k: _v for _k, _v in _data.items() if _k in MMT_JSON_KEYS} if isinstance(_data, dict) else {}
+        return {**{'modified': datetime.now().isoformat(sep=' ', timespec='microseconds')}, **_data}
+
+    def create(self, _data=None):
+        with self.__lock:
+            _id, self.__next = self.__next, self.__next + 1
+            self.__records[_id] = {**self._filter(_data), **{'id': _id}}
+            return self.__records[_id]
+
+    def read(self, _id=-1):
+        with self.__lock:
+            return self.__records.get(_id, None)
+
+    def read_all(self):
+        with self.__lock:
+            return [self.__records[_k] for _k in sorted(self.__records)]
+
+    def update(self, _id=-1, _data=None):
+        with self.__lock:
+            if _id not in self.__records:
+                return None
+            self.__records[_id] = {**self.__records[_id], **self._filter(_data), **{'id': _id}}
+            return self.__records[_id]
+
+    def delete(self, _id=-1):
+        with self.__lock:
+            return self.__records.pop(_id, None)
+
+
+# +
+# class: MMTRequestHandler() inherits from the BaseHTTPRequestHandler class
+# -
+# noinspection PyPep8Naming,PyBroadException
+class MMTRequestHandler(BaseHTTPRequestHandler):
+    """
+    stand-in for the scheduler APIv2 catalogTarget endpoint(s) serving server.store and server.charts, with MMTFaults
+    from server.faults if set
+    """
+
+    disable_nagle_algorithm = True
+    protocol_version = 'HTTP/1.1'
+    wbufsize = -1
+
+    def log_message(self, format, *args):
+        pass
+
+    def parse_request(self):
+        self._body = None
+        return super().parse_request()
+
+    def _target_id(self):
+        _parts = [_p for _p in urlparse(self.path).path.split('/') if _p != '']
+        try:
+            return int(_parts[-1])
+        except:
+            return None
+
+    def _query(self, _key=''):
+        return parse_qs(urlparse(self.path).query).get(_key, [''])[0]
+
+    def _read_body(self):
+        if self._body is None:
+            _len = int(self.headers.get('Content-Length', 0) or 0)
+            self._body = self.rfile.read(_len) if _len > 0 else b''
+        return self._body
+
+    def _read_json(self):
+        try:
+            return json.loads(self._read_body())
+        except:
+            return {}
+
+    def _reply(self, _code=200, _body=None, _headers=None):
+        _data = _body if isinstance(_body, bytes) else json.dumps(_body).encode('utf-8')
+        _faults = getattr(self.server, 'faults', None)
+        if _faults is not None:
+            _faults.count(_code)
+        self.send_response(_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(_data)))
+        for _k, _v in (_headers or {}).items():
+            self.send_header(_k, _v)
+        self.end_headers()
+        self.wfile.write(_data)
+
+    def _fault(self, _token=None):
+        """ apply latency, then reply 429 / error / 401 (if _token is not None) and return True if one was sent """
+        _faults = getattr(self.server, 'faults', None)
+        if _faults is None:
+            return False
+        self._read_body()
+        _delay = _faults.delay()
+        if _delay > 0.0:
+            time.sleep(_delay)
+        if _faults.throttled():
+            self._reply(429, b'"Too Many Requests"', {'Retry-After': str(_faults.retry_after)})
+            return True
+        _code = _faults.error()
+        if _code is not None:
+            self._reply(_code, f'"Error {_code}"'.encode('utf-8'))
+            return True
+        if _token is not None and _faults.token and _token != _faults.token:
+            self._reply(401, b'"Unauthorized"')
+            return True
+        return False
+
+    def do_DELETE(self):
+        if self._fault():
+            return
+        _id = self._target_id()
+        self._reply(200, b'null') if self.server.store.delete(_id) is not None else self._reply(404, b'"Not Found"')
+
+    def do_GET(self):
+        if self._fault():
+            return
+        _id = self._target_id()
+        if _id is None:
+            self._reply(200, self.server.store.read_all())
+        else:
+            _rec = self.server.store.read(_id)
+            self._reply(200, _rec) if _rec is not None else self._reply(404, b'"Not Found"')
+
+    def do_POST(self):
+        _id = self._target_id()
+
+        # create: token in the query string
+        if _id is None:
+            if self._fault(self._query('token')):
+                return
+            self._reply(200, self.server.store.create(self._read_json()))
+            return
+
+        # upload: multipart form with the token and the finding chart file
+        _multipart = self.headers.get('Content-Type', '').lower().startswith('multipart/form-data')
+        _fields, _files = parse_multipart(self._read_body(), self.headers.get('Content-Type', ''))
+        if self._fault(_fields.get('token', '')):
+            return
+        if _multipart and 'finding_chart_file' not in _files:
+            self._reply(400, b'"Bad Request"')
+            return
+        _name, _data = _files.get('finding_chart_file', (f'{_id}.png', b''))
+        _rec = self.server.store.update(_id, {'findingchartfilename': _fields.get('findingchartfilename', _name)})
+        if _rec is not None and _data:
+            self.server.charts[_id] = _data
+        self._reply(200, _rec) if _rec is not None else self._reply(404, b'"Not Found"')
+
+    def do_PUT(self):
+        _json = self._read_json()
+        if self._fault(_json.get('token', '') if isinstance(_json, dict) else ''):
+            return
+        _id = self._target_id()
+        _rec = self.server.store.update(_id, _json)
+        self._reply(200, _rec) if _rec is not None else self._reply(404, b'"Not Found"')
+
+
+# +
+# function: start_server()
+# -
+def start_server(host=MMT_SERVER_HOST, port=0, faults=None):
+    """ start server (with its own store and chart(s), MMTFaults if given) in a daemon thread, return (server, url) """
+    _server = ThreadingHTTPServer((host, port), MMTRequestHandler)
+    _server.daemon_threads = True
+    _server.store, _server.charts = MMTStore(), {}
+    _server.faults = faults if isinstance(faults, MMTFaults) else None
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server, f'http://{_server.server_address[0]}:{_server.server_address[1]}{MMT_SERVER_PATH}'
+
+
+# +
+# main()
+# -
+if __name__ == '__main__':
+
+    # noinspection PyTypeChecker
+    _p = argparse.ArgumentParser(description=f'MMT Stand-In Server', formatter_class=argparse.RawTextHelpFormatter)
+    _p.add_argument(f'--error-rate', default=0.0,
+                    help=f"""Fraction of request(s) answered {MMT_SERVER_ERRORS}, defaults to %(default)s""")
+    _p.add_argument(f'--host', default=MMT_SERVER_HOST, help=f"""Host, defaults to '%(default)s'""")
+    _p.add_argument(f'--jitter', default=0.0, help=f"""Extra uniform latency (s), defaults to %(default)s""")
+    _p.add_argument(f'--latency', default=0.0, help=f"""Latency per request (s), defaults to %(default)s""")
+    _p.add_argument(f'--port', default=MMT_SERVER_PORT, help=f"""Port, defaults to %(default)s""")
+    _p.add_argument(f'--rate', default=0.0,
+                    help=f"""Request(s) per second above which 429 is returned (0 for no limit), """
+                         f"""defaults to %(default)s""")
+    _p.add_argument(f'--seed', default=None, help=f"""Random seed, defaults to %(default)s""")
+    _p.add_argument(f'--token', default='', help=f"""Required POST / PUT / UPLOAD token, defaults to none""")
+    args = _p.parse_args()
+
+    # execute
+    _s = ThreadingHTTPServer((args.host, int(args.port)), MMTRequestHandler)
+    _s.daemon_threads = True
+    _s.store, _s.charts = MMTStore(), {}
+    _s.faults = MMTFaults(latency=float(args.latency), jitter=float(args.jitter), error_rate=float(args.error_rate),
+                          rate=float(args.rate), token=args.token,
+                          seed=int(args.seed) if args.seed is not None else None)
+    print(f"serving http://{args.host}:{int(args.port)}{MMT_SERVER_PATH}")
+    try:
+        _s.serve_forever()
+    except KeyboardInterrupt:
+        _s.server_close()
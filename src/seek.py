@@ -4,15 +4,25 @@
 # +
 # import(s)
 # -
-from astropy.time import Time
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from datetime import date
 from datetime import datetime
 from datetime import timedelta
 
 import argparse
+import ctypes
+import ctypes.util
+import errno
 import hashlib
+import heapq
 import math
 import os
 import re
+import select
+import stat
+import struct
 import time
 
 
@@ -28,6 +38,11 @@ __doc__ = """
 # constant(s)
 # -
 ISO_PATTERN = '[0-9]{4}-[0-9]{2}-[0-9]{2}[ T?][0-9]{2}:[0-9]{2}:[0-9]{2}.[0-9]{6}'
+UNIX_EPOCH_DATE = date(1970, 1, 1)
+UNIX_EPOCH_JD = 2440588.0
+SEEK_INTERVAL = 1.0
+SEEK_WORKERS = 8
+UTC_OFFSET_STEP = 900
 
 
 # +
@@ -47,7 +62,7 @@ def get_isot(ndays=0):
 # noinspection PyBroadException
 def get_jd(ndays=0):
     try:
-        return Time(get_isot(ndays)).jd
+        return isot_to_jd(get_isot(ndays))
     except:
         return math.nan
 
@@ -57,7 +72,17 @@ def get_jd(ndays=0):
 # -
 # noinspection PyBroadException
 def isot_to_jd(isot=get_isot()):
+    """ return jd of an isot string, with astropy (imported on demand) only for what datetime cannot parse """
     try:
+        _dt = datetime.fromisoformat(isot)
+        if _dt.tzinfo is None:
+            _days = (_dt.date() - UNIX_EPOCH_DATE).days
+            _secs = 60.0 * (60 * _dt.hour + _dt.minute) + (_dt.second + _dt.microsecond / 1.0e6)
+            return (UNIX_EPOCH_JD + _days) + (_secs / 86400.0 - 0.5)
+    except:
+        pass
+    try:
+        from astropy.time import Time
         return Time(isot).jd
     except:
         return math.nan
@@ -69,11 +94,43 @@ def isot_to_jd(isot=get_isot()):
 # noinspection PyBroadException
 def jd_to_isot(jd=math.nan):
     try:
+        from astropy.time import Time
         return Time(jd, format='jd', precision=6).isot
     except:
         return None
 
 
+# +
+# function: ctime_to_jd()
+# -
+# noinspection PyBroadException
+def ctime_to_jd(ctime=math.nan):
+    """ return jd of an st_ctime as seek() keys it (local time, whole seconds) """
+    try:
+        _t = math.floor(ctime)
+        _days, _secs = divmod(_t + time.localtime(_t).tm_gmtoff, 86400)
+        return (UNIX_EPOCH_JD + _days) + (_secs / 86400.0 - 0.5)
+    except:
+        return math.nan
+
+
+# +
+# function: ctimes_to_jd()
+# -
+def ctimes_to_jd(ctimes=None):
+    """ return numpy array of ctime_to_jd() for a sequence of st_ctime(s) """
+    import numpy as np
+    _t = np.floor(np.asarray([] if ctimes is None else ctimes, dtype=float))
+    if _t.size == 0:
+        return _t
+
+    # utc offsets only change on quarter-hour boundaries so look them up once per step
+    _steps, _inverse = np.unique(np.floor_divide(_t, UTC_OFFSET_STEP), return_inverse=True)
+    _offsets = np.array([time.localtime(int(_s) * UTC_OFFSET_STEP).tm_gmtoff for _s in _steps], dtype=float)
+    _days, _secs = np.divmod(_t + _offsets[_inverse.ravel()], 86400.0)
+    return (UNIX_EPOCH_JD + _days) + (_secs / 86400.0 - 0.5)
+
+
 # +
 # function: get_hash()
 # -
@@ -86,11 +143,65 @@ def get_hash(seed=get_isot()):
 
 
 # +
-# function: seek()
+# function: scan_dir()
+# -
+def scan_dir(_dir='', _type=''):
+    """ return ([(path, ctime), ...], [subdir, ...]) for non-empty, non-symlink file(s) of given type in _dir """
+    _files, _dirs = [], []
+    try:
+        with os.scandir(_dir) as _it:
+            for _e in _it:
+                try:
+                    if _e.is_dir(follow_symlinks=False):
+                        _dirs.append(_e.path)
+                    elif _e.path.endswith(_type) and not _e.is_symlink():
+                        _st = _e.stat(follow_symlinks=False)
+                        if _st.st_size > 0:
+                            _files.append((_e.path, _st.st_ctime))
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return _files, _dirs
+
+
+# +
+# function: scan()
+# -
+def scan(_path='', _type='', _workers=SEEK_WORKERS):
+    """ yield [(path, ctime), ...] per directory below _path, fanning sub-directories out over _workers threads """
+
+    # serial
+    if not isinstance(_workers, int) or _workers <= 1:
+        _stack = [_path]
+        while _stack:
+            _files, _dirs = scan_dir(_stack.pop(), _type)
+            _stack.extend(reversed(_dirs))
+            if _files:
+                yield _files
+        return
+
+    # parallel (queued directories are dropped if the caller stops early)
+    _pool = ThreadPoolExecutor(max_workers=_workers)
+    try:
+        _pending = {_pool.submit(scan_dir, _path, _type)}
+        while _pending:
+            _done, _pending = wait(_pending, return_when=FIRST_COMPLETED)
+            for _f in _done:
+                _files, _dirs = _f.result()
+                _pending |= {_pool.submit(scan_dir, _d, _type) for _d in _dirs}
+                if _files:
+                    yield _files
+    finally:
+        _pool.shutdown(wait=True, cancel_futures=True)
+
+
+# +
+# function: seek_args()
 # -
 # noinspection PyBroadException
-def seek(_begin='', _end='', _nelms=0, _path=os.getcwd(), _type=get_hash()):
-    """ return dictionary {jd: filename} of files or None """
+def seek_args(_begin='', _end='', _nelms=0, _path=os.getcwd(), _type=get_hash()):
+    """ return (_begin_jd, _end_jd, _path) for valid seek() argument(s) or None """
 
     # check input(s)
     if not isinstance(_begin, str) or (re.match(ISO_PATTERN, _begin) is None):
@@ -111,30 +222,320 @@ def seek(_begin='', _end='', _nelms=0, _path=os.getcwd(), _type=get_hash()):
     _begin_jd, _end_jd = isot_to_jd(_begin), isot_to_jd(_end)
     if _begin_jd > _end_jd:
         _begin_jd, _end_jd = _end_jd, _begin_jd
+    return _begin_jd, _end_jd, _path
+
+
+# +
+# function: scan_jd()
+# -
+def scan_jd(_begin_jd=math.nan, _end_jd=math.nan, _path='', _type='', _workers=SEEK_WORKERS):
+    """ yield (jd, filename) of files with _begin_jd < jd < _end_jd as they are found """
+    import numpy as np
+    for _files in scan(_path, _type, _workers):
+        _jds = ctimes_to_jd([_f[1] for _f in _files])
+        for _i in np.flatnonzero((_begin_jd < _jds) & (_jds < _end_jd)):
+            yield float(_jds[_i]), _files[_i][0]
 
-    # generator code
-    _fw = (
-        os.path.join(_root, _file)
-        for _root, _dirs, _files in os.walk(_path)
-        for _file in _files
-    )
 
-    # get all files within jd period of given type
+# +
+# function: seek_iter()
+# -
+def seek_iter(_begin='', _end='', _nelms=0, _path=os.getcwd(), _type=get_hash(), _workers=SEEK_WORKERS):
+    """ yield (jd, filename) of files as they are found, stopping after _nelms (all if nelms == 0) """
+
+    _args = seek_args(_begin, _end, _nelms, _path, _type)
+    if _args is None:
+        return
+    _begin_jd, _end_jd, _path = _args
+
+    _gen = scan_jd(_begin_jd, _end_jd, _path, f'{_type}', _workers)
     try:
-        _ret = {
-            isot_to_jd(f"{time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(os.stat(_k).st_ctime))}.000000"): f'{_k}'
-            for _k in _fw if (
-                    not os.path.islink(f'{_k}') and os.path.exists(f'{_k}') and _k.endswith(f'{_type}') and
-                    int(os.stat(f'{_k}').st_size) > 0 and
-                    (_begin_jd <
-                     isot_to_jd(f"{time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(os.stat(_k).st_ctime))}.000000")
-                     < _end_jd))
-        }
+        for _n, _pair in enumerate(_gen, start=1):
+            yield _pair
+            if _n == _nelms:
+                return
+    finally:
+        _gen.close()
+
+
+# +
+# function: seek_top()
+# -
+def seek_top(_pairs=None, _nelms=0):
+    """ return dictionary {jd: filename} of the _nelms newest distinct jd(s) in (jd, filename) pairs """
+
+    # bounded min-heap of jd(s); as for a dict, a later file with the same jd replaces an earlier one
+    _heap, _ret = [], {}
+    for _jd, _file in (_pairs or []):
+        if _jd in _ret:
+            _ret[_jd] = _file
+        elif _nelms == 0 or len(_heap) < _nelms:
+            heapq.heappush(_heap, _jd)
+            _ret[_jd] = _file
+        elif _jd > _heap[0]:
+            del _ret[heapq.heapreplace(_heap, _jd)]
+            _ret[_jd] = _file
+    return {_k: _ret[_k] for _k in sorted(_ret, reverse=True)}
+
+
+# +
+# function: seek()
+# -
+# noinspection PyBroadException
+def seek(_begin='', _end='', _nelms=0, _path=os.getcwd(), _type=get_hash(), _workers=SEEK_WORKERS):
+    """ return dictionary {jd: filename} of files or None """
+
+    # check input(s)
+    _args = seek_args(_begin, _end, _nelms, _path, _type)
+    if _args is None:
+        return None
+
+    # keep the newest _nelms (all if nelms == 0)
+    try:
+        return seek_top(scan_jd(*_args[:2], _args[2], f'{_type}', _workers), _nelms)
     except Exception:
         return None
 
-    # return (all if nelms == 0)
-    return {_k: _ret[_k] for _k in sorted(_ret.keys(), reverse=True)[:len(_ret) if _nelms == 0 else _nelms]}
+
+# +
+# inotify constant(s)
+# -
+IN_CLOEXEC = 0o2000000
+IN_CLOSE_WRITE = 0x00000008
+IN_CREATE = 0x00000100
+IN_EVENT = struct.Struct('iIII')
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = 0o4000
+IN_Q_OVERFLOW = 0x00004000
+
+
+# +
+# class: Inotify() inherits from the object class
+# -
+# noinspection PyBroadException
+class Inotify(object):
+    """ minimal ctypes binding to linux inotify(7), raises OSError where unavailable """
+
+    def __init__(self):
+        _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        if not hasattr(_libc, 'inotify_init1'):
+            raise OSError(errno.ENOSYS, 'inotify is not available')
+        self.__libc = _libc
+        self.__fd = self.__libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.__fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.__wds = {}
+
+    def add_watch(self, _path='', _mask=IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE):
+        _wd = self.__libc.inotify_add_watch(self.__fd, os.fsencode(_path), ctypes.c_uint32(_mask))
+        if _wd < 0:
+            raise OSError(ctypes.get_errno(), f'inotify_add_watch failed for {_path}')
+        self.__wds[_wd] = _path
+
+    def read(self, _timeout=None):
+        """ return list of (directory, mask, name) event(s), waiting at most _timeout seconds """
+        if not select.select([self.__fd], [], [], _timeout)[0]:
+            return []
+        try:
+            _buf = os.read(self.__fd, 65536)
+        except BlockingIOError:
+            return []
+        _ret, _i = [], 0
+        while _i + IN_EVENT.size <= len(_buf):
+            _wd, _mask, _cookie, _len = IN_EVENT.unpack_from(_buf, _i)
+            _name = os.fsdecode(_buf[_i + IN_EVENT.size:_i + IN_EVENT.size + _len].rstrip(b'\0'))
+            _i += IN_EVENT.size + _len
+            if _mask & IN_IGNORED:
+                self.__wds.pop(_wd, None)
+            else:
+                _ret.append((self.__wds.get(_wd, None), _mask, _name))
+        return _ret
+
+    def close(self):
+        try:
+            os.close(self.__fd)
+        except:
+            pass
+
+
+# +
+# function: check_file()
+# -
+def check_file(_file='', _begin_jd=math.nan, _end_jd=math.nan, _type=''):
+    """ return (jd, filename) if _file passes the seek() filter(s) else None """
+    try:
+        _st = os.lstat(_file)
+    except OSError:
+        return None
+    if not _file.endswith(_type) or stat.S_ISLNK(_st.st_mode) or stat.S_ISDIR(_st.st_mode) or _st.st_size <= 0:
+        return None
+    _jd = ctime_to_jd(_st.st_ctime)
+    return (_jd, _file) if _begin_jd < _jd < _end_jd else None
+
+
+# +
+# function: list_dirs()
+# -
+def list_dirs(_path=''):
+    """ return _path and all its (non-symlink) sub-directories """
+    _ret, _stack = [], [_path]
+    while _stack:
+        _dir = _stack.pop()
+        _ret.append(_dir)
+        try:
+            with os.scandir(_dir) as _it:
+                _stack.extend(_e.path for _e in _it if _e.is_dir(follow_symlinks=False))
+        except OSError:
+            continue
+    return _ret
+
+
+# +
+# function: add_watches()
+# -
+def add_watches(_watcher=None, _dirs=None):
+    """ watch each directory, skipping any that vanished first, return those watched (other OSError(s) raise) """
+    _ret = []
+    for _dir in _dirs or []:
+        try:
+            _watcher.add_watch(_dir)
+        except OSError as _e:
+            if _e.errno in (errno.ENOENT, errno.ENOTDIR):
+                continue
+            raise
+        _ret.append(_dir)
+    return _ret
+
+
+# +
+# function: follow_inotify()
+# -
+def follow_inotify(_begin_jd=math.nan, _end_jd=math.nan, _path='', _type='', _duration=None, _watcher=None):
+    """
+    yield (jd, filename) of new files from inotify event(s) on _watcher (if None, one watching _path is created and
+    OSError raised if inotify is unavailable), a sub-directory that cannot be watched raises OSError
+    """
+
+    if _watcher is None:
+        _watcher = Inotify()
+        try:
+            add_watches(_watcher, list_dirs(_path))
+        except OSError:
+            _watcher.close()
+            raise
+    _seen = set()
+    _stop = None if _duration is None else time.monotonic() + _duration
+    try:
+        while _stop is None or time.monotonic() < _stop:
+            for _dir, _mask, _name in _watcher.read(None if _stop is None else max(0.0, _stop - time.monotonic())):
+                if _dir is None:
+                    continue
+                _candidates = []
+                if _mask & IN_Q_OVERFLOW:
+                    _candidates = [_k for _d in list_dirs(_path) for _k, _ in scan_dir(_d, _type)[0]]
+                elif _mask & IN_ISDIR and _mask & (IN_CREATE | IN_MOVED_TO):
+                    # watch new sub-directories first, then pick up anything that landed before the watch
+                    for _d in add_watches(_watcher, list_dirs(os.path.join(_dir, _name))):
+                        _candidates.extend(_k for _k, _ in scan_dir(_d, _type)[0])
+                elif _mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                    _candidates = [os.path.join(_dir, _name)]
+                for _k in _candidates:
+                    _ans = check_file(_k, _begin_jd, _end_jd, _type) if _k not in _seen else None
+                    if _ans is not None:
+                        _seen.add(_k)
+                        yield _ans
+    finally:
+        _watcher.close()
+
+
+# +
+# function: follow_poll()
+# -
+def follow_poll(_begin_jd=math.nan, _end_jd=math.nan, _path='', _type='', _interval=SEEK_INTERVAL, _duration=None):
+    """ yield (jd, filename) of new files by re-listing only directories whose mtime changed """
+
+    def _list(_dir):
+        try:
+            with os.scandir(_dir) as _it:
+                return [(_e.path, _e.is_dir(follow_symlinks=False)) for _e in _it]
+        except OSError:
+            return []
+
+    # snapshot: directory mtime(s) and the file(s) already present
+    _mtimes, _known, _pending = {}, set(), {}
+    for _dir in list_dirs(_path):
+        try:
+            _mtimes[_dir] = os.stat(_dir).st_mtime_ns
+        except OSError:
+            continue
+        _known.update(_k for _k, _isdir in _list(_dir) if not _isdir)
+
+    _stop = None if _duration is None else time.monotonic() + _duration
+    while _stop is None or time.monotonic() < _stop:
+        time.sleep(_interval if _stop is None else max(0.0, min(_interval, _stop - time.monotonic())))
+
+        # re-list changed or new directories
+        for _dir in list(_mtimes):
+            try:
+                _mtime = os.stat(_dir).st_mtime_ns
+            except OSError:
+                del _mtimes[_dir]
+                continue
+            if _mtime == _mtimes[_dir]:
+                continue
+            _mtimes[_dir] = _mtime
+            for _k, _isdir in _list(_dir):
+                if _isdir and _k not in _mtimes:
+                    _mtimes[_k] = -1
+                elif not _isdir and _k not in _known and _k.endswith(_type):
+                    _known.add(_k)
+                    _pending[_k] = -1
+
+        # a file is ready once it is non-empty and its size is unchanged since the previous poll
+        for _k, _size in list(_pending.items()):
+            try:
+                _now = os.lstat(_k).st_size
+            except OSError:
+                del _pending[_k]
+                continue
+            if _now > 0 and _now == _size:
+                del _pending[_k]
+                _ans = check_file(_k, _begin_jd, _end_jd, _type)
+                if _ans is not None:
+                    yield _ans
+            else:
+                _pending[_k] = _now
+
+
+# +
+# function: follow()
+# -
+def follow(_begin='', _end='', _path=os.getcwd(), _type=get_hash(), _interval=SEEK_INTERVAL, _duration=None,
+           _mode='auto'):
+    """ yield (jd, filename) of files created after the call, via inotify ('auto', 'inotify') or polling """
+
+    _args = seek_args(_begin, _end, 0, _path, _type)
+    if _args is None:
+        return
+    _begin_jd, _end_jd, _path = _args
+    # only a failure to set inotify up falls back to polling, later error(s) reach the caller
+    _watcher = None
+    if _mode in ('auto', 'inotify'):
+        try:
+            _watcher = Inotify()
+            add_watches(_watcher, list_dirs(_path))
+        except OSError:
+            if _watcher is not None:
+                _watcher.close()
+            if _mode == 'inotify':
+                raise
+            _watcher = None
+    if _watcher is not None:
+        yield from follow_inotify(_begin_jd, _end_jd, _path, f'{_type}', _duration, _watcher)
+        return
+    yield from follow_poll(_begin_jd, _end_jd, _path, f'{_type}', _interval, _duration)
 
 
 # +
@@ -145,13 +546,35 @@ if __name__ == '__main__':
     # noinspection PyTypeChecker
     _p = argparse.ArgumentParser(description=f'Seek File(s)', formatter_class=argparse.RawTextHelpFormatter)
     _p.add_argument(f'--begin', default=get_isot(-1), help=f"""begin date, defaults to %(default)s""")
-    _p.add_argument(f'--end', default=get_isot(), help=f"""end date, defaults to %(default)s""")
+    _p.add_argument(f'--end', default=None, help=f"""end date, defaults to now (or no limit with --follow)""")
+    _p.add_argument(f'--follow', default=False, action='store_true',
+                    help=f'if present, print "jd filename" lines for new file(s) as they arrive')
+    _p.add_argument(f'--interval', default=SEEK_INTERVAL,
+                    help=f"""poll interval (seconds) if inotify is unavailable, defaults to %(default)s""")
     _p.add_argument(f'--nelms', default=0, help=f"""number of elements, defaults to %(default)s""")
     _p.add_argument(f'--path', default=os.getcwd(), help=f"""root path, defaults to %(default)s""")
+    _p.add_argument(f'--stream', default=False, action='store_true',
+                    help=f'if present, print "jd filename" lines as found (first nelms found, unsorted)')
     _p.add_argument(f'--type', default='.fits', help=f"""file type, defaults to %(default)s""")
+    _p.add_argument(f'--workers', default=SEEK_WORKERS, help=f"""scanner thread(s), defaults to %(default)s""")
     args = _p.parse_args()
 
     # execute
-    _ans = seek(_begin=args.begin, _end=args.end, _nelms=int(args.nelms), _path=args.path, _type=args.type)
+    if bool(args.follow):
+        try:
+            for _jd, _file in follow(_begin=args.begin, _end=args.end or get_isot(36525), _path=args.path,
+                                     _type=args.type, _interval=float(args.interval)):
+                print(f"{_jd} {_file}", flush=True)
+        except KeyboardInterrupt:
+            pass
+        raise SystemExit(0)
+    args.end = args.end or get_isot()
+    if bool(args.stream):
+        for _jd, _file in seek_iter(_begin=args.begin, _end=args.end, _nelms=int(args.nelms), _path=args.path,
+                                    _type=args.type, _workers=int(args.workers)):
+            print(f"{_jd} {_file}", flush=True)
+        raise SystemExit(0)
+    _ans = seek(_begin=args.begin, _end=args.end, _nelms=int(args.nelms), _path=args.path, _type=args.type,
+                _workers=int(args.workers))
     if _ans is not None:
         print(f"{_ans}")
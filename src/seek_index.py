@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from src.seek import *
+
+import sqlite3
+
+
+# +
+# __doc__
+# -
+__doc__ = """
+    % python3.7 seek_index.py --help
+"""
+
+
+# +
+# constant(s)
+# -
+SEEK_INDEX_DB = os.getenv('SEEK_INDEX', os.path.abspath(os.path.expanduser('~/.seek_index.sqlite')))
+SEEK_INDEX_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, parent TEXT, mtime INTEGER, scanned REAL);
+    CREATE INDEX IF NOT EXISTS dirs_parent ON dirs (parent);
+    CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, dir TEXT, ctime REAL, jd REAL, size INTEGER,
+                                      suffix TEXT);
+    CREATE INDEX IF NOT EXISTS files_dir ON files (dir);
+    CREATE INDEX IF NOT EXISTS files_jd ON files (jd);
+    CREATE INDEX IF NOT EXISTS files_suffix_jd ON files (suffix, jd);
+"""
+
+
+# +
+# function: get_suffix()
+# -
+def get_suffix(_path=''):
+    """ return the last '.ext' of a basename, including dot-files such as '.fits' """
+    _name = os.path.basename(_path)
+    return f".{_name.rsplit('.', 1)[1]}" if '.' in _name else ''
+
+
+# +
+# function: get_prefix_range()
+# -
+def get_prefix_range(_path=''):
+    """ return (low, high) such that low <= p < high for every path p below _path """
+    _low = f"{_path.rstrip('/')}/"
+    return _low, f'{_low[:-1]}0'
+
+
+# +
+# class: SeekIndex() inherits from the object class
+# -
+# noinspection PyBroadException
+class SeekIndex(object):
+    """
+    persistent (path, ctime, jd, size, suffix) index of a directory tree: directories whose mtime is
+    unchanged are not re-listed, their known file(s) are re-stat'ed and updated if size or ctime changed
+    """
+
+    # +
+    # method: __init__
+    # -
+    def __init__(self, db=SEEK_INDEX_DB):
+
+        # get arguments(s)
+        self.db = db
+
+        # define some variables and initialize them
+        self.__con = sqlite3.connect(self.__db, timeout=60.0, isolation_level=None)
+        self.__con.execute('PRAGMA journal_mode=WAL')
+        self.__con.execute('PRAGMA synchronous=NORMAL')
+        self.__con.executescript(SEEK_INDEX_SCHEMA)
+
+    # +
+    # Decorator(s)
+    # -
+    @property
+    def db(self):
+        return self.__db
+
+    @db.setter
+    def db(self, db=SEEK_INDEX_DB):
+        self.__db = os.path.abspath(os.path.expanduser(db)) if (isinstance(db, str) and db.strip() != '') \
+            else SEEK_INDEX_DB
+
+    # +
+    # method: _stat_file()
+    # -
+    @staticmethod
+    def _stat_file(_path='', _dir='', _stat=None):
+        return _path, _dir, _stat.st_ctime, ctime_to_jd(_stat.st_ctime), int(_stat.st_size), get_suffix(_path)
+
+    # +
+    # method: _scan_dir()
+    # -
+    def _scan_dir(self, _dir='', _parent=None, _mtime=0, _now=0.0):
+        """ re-list a new or changed directory, return its sub-directories (none if unreadable, retried later) """
+        _files, _dirs = [], []
+        self.__con.execute('DELETE FROM files WHERE dir=?', (_dir,))
+        try:
+            with os.scandir(_dir) as _it:
+                for _e in _it:
+                    try:
+                        if _e.is_dir(follow_symlinks=False):
+                            _dirs.append(_e.path)
+                        elif not _e.is_symlink():
+                            _files.append(self._stat_file(_e.path, _dir, _e.stat(follow_symlinks=False)))
+                    except OSError:
+                        continue
+        except OSError:
+            self.__con.execute('INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?)', (_dir, _parent, -1, _now))
+            return []
+        self.__con.executemany('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)', _files)
+        self.__con.execute('INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?)', (_dir, _parent, _mtime, _now))
+        return _dirs
+
+    # +
+    # method: _check_dir()
+    # -
+    def _check_dir(self, _dir=''):
+        """
+        re-stat the file(s) of an unchanged directory (written in place or still being written), update those whose
+        (size, ctime) differ from the index, return sub-directories
+        """
+        _changed, _gone = [], []
+        for _path, _size, _ctime in self.__con.execute('SELECT path, size, ctime FROM files WHERE dir=?',
+                                                       (_dir,)).fetchall():
+            try:
+                _st = os.stat(_path, follow_symlinks=False)
+            except OSError:
+                _gone.append((_path, ))
+                continue
+            if int(_st.st_size) != _size or _st.st_ctime != _ctime:
+                _changed.append(self._stat_file(_path, _dir, _st))
+        self.__con.executemany('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)', _changed)
+        self.__con.executemany('DELETE FROM files WHERE path=?', _gone)
+        return [_r[0] for _r in self.__con.execute('SELECT path FROM dirs WHERE parent=?', (_dir,))]
+
+    # +
+    # method: refresh()
+    # -
+    def refresh(self, _path=os.getcwd()):
+        """ bring the index of _path up to date, return the number of directories re-listed """
+
+        _path = os.path.abspath(os.path.expanduser(f'{_path}'))
+        if not os.path.isdir(_path):
+            return 0
+        _now, _seen, _nscan, _stack = time.time(), set(), 0, [(_path, None)]
+        _known = {_r[0]: _r[1] for _r in self.__con.execute(
+            "SELECT path, mtime FROM dirs WHERE path=? OR (path>=? AND path<?)",
+            (_path, *get_prefix_range(_path)))}
+
+        self.__con.execute('BEGIN')
+        try:
+            while _stack:
+                _dir, _parent = _stack.pop()
+                try:
+                    _mtime = os.stat(_dir).st_mtime_ns
+                except OSError:
+                    continue
+                _seen.add(_dir)
+                if _dir in _known and _known[_dir] == _mtime:
+                    _subdirs = self._check_dir(_dir)
+                    self.__con.execute('UPDATE dirs SET scanned=? WHERE path=?', (_now, _dir))
+                else:
+                    _subdirs = self._scan_dir(_dir, _parent, _mtime, _now)
+                    _nscan += 1
+                _stack.extend((_d, _dir) for _d in _subdirs)
+
+            # forget directories that have gone away
+            for _dir in set(_known) - _seen:
+                self.__con.execute('DELETE FROM files WHERE dir=?', (_dir,))
+                self.__con.execute('DELETE FROM dirs WHERE path=?', (_dir,))
+            self.__con.execute('COMMIT')
+        except Exception:
+            self.__con.execute('ROLLBACK')
+            raise
+        return _nscan
+
+    # +
+    # method: query()
+    # -
+    def query(self, _begin_jd=math.nan, _end_jd=math.nan, _nelms=0, _path=os.getcwd(), _type=''):
+        """ return list of (jd, path) in the open interval (_begin_jd, _end_jd), newest first """
+
+        _path = os.path.abspath(os.path.expanduser(f'{_path}'))
+        _sql, _args = 'SELECT jd, path FROM files WHERE size>0 AND jd>? AND jd<? AND path>=? AND path<?', \
+            [_begin_jd, _end_jd, *get_prefix_range(_path)]
+        if _type.startswith('.') and '.' not in _type[1:]:
+            _sql, _args = f'{_sql} AND suffix=?', _args + [_type]
+        else:
+            _sql, _args = f'{_sql} AND substr(path, ?)=?', _args + [-len(_type), _type]
+        _sql = f'{_sql} ORDER BY jd DESC, path DESC'
+        if _nelms > 0:
+            _sql, _args = f'{_sql} LIMIT ?', _args + [_nelms]
+        return self.__con.execute(_sql, _args).fetchall()
+
+    # +
+    # method: close()
+    # -
+    def close(self):
+        try:
+            self.__con.close()
+        except:
+            pass
+
+    # +
+    # context manager(s)
+    # -
+    def __enter__(self):
+        return self
+
+    def __exit__(self, _type, _value, _traceback):
+        self.close()
+
+
+# +
+# function: seek_index()
+# -
+# noinspection PyBroadException
+def seek_index(_begin='', _end='', _nelms=0, _path=os.getcwd(), _type=get_hash(), _db=SEEK_INDEX_DB,
+               _refresh=True):
+    """ return dictionary {jd: filename} of files or None, as seek() but from an incrementally refreshed index """
+
+    # check and verify input(s) as seek() does
+    _args = seek_args(_begin, _end, _nelms, _path, _type)
+    if _args is None:
+        return None
+    _begin_jd, _end_jd, _path = _args
+
+    # refresh and query (files with the same jd collapse to one key, as in seek())
+    try:
+        with SeekIndex(db=_db) as _idx:
+            if _refresh:
+                _idx.refresh(_path)
+            _rows = _idx.query(_begin_jd, _end_jd, 0, _path, _type)
+    except Exception:
+        return None
+    _ret = {}
+    for _jd, _file in _rows:
+        if _jd not in _ret:
+            _ret[_jd] = _file
+            if 0 < _nelms <= len(_ret):
+                break
+    return _ret
+
+
+# +
+# main()
+# -
+if __name__ == '__main__':
+
+    # noinspection PyTypeChecker
+    _p = argparse.ArgumentParser(description=f'Seek File(s) via Index', formatter_class=argparse.RawTextHelpFormatter)
+    _p.add_argument(f'--begin', default=get_isot(-1), help=f"""begin date, defaults to %(default)s""")
+    _p.add_argument(f'--db', default=SEEK_INDEX_DB, help=f"""index database, defaults to %(default)s""")
+    _p.add_argument(f'--end', default=get_isot(), help=f"""end date, defaults to %(default)s""")
+    _p.add_argument(f'--nelms', default=0, help=f"""number of elements, defaults to %(default)s""")
+    _p.add_argument(f'--no-refresh', default=False, action='store_true', help=f'if present, do not refresh index')
+    _p.add_argument(f'--path', default=os.getcwd(), help=f"""root path, defaults to %(default)s""")
+    _p.add_argument(f'--type', default='.fits', help=f"""file type, defaults to %(default)s""")
+    args = _p.parse_args()
+
+    # execute
+    _ans = seek_index(_begin=args.begin, _end=args.end, _nelms=int(args.nelms), _path=args.path, _type=args.type,
+                      _db=args.db, _refresh=not bool(args.no_refresh))
+    if _ans is not None:
+        print(f"{_ans}")
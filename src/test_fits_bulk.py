@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from astropy.io import fits
+from src.fits_bulk import *
+
+
+# +
+# doc string(s)
+# -
+__doc__ = """
+  % python3 -m pytest -p no:warnings test_fits_bulk.py
+"""
+
+
+# +
+# function: make_frames()
+# -
+def make_frames(_root=None, _n=4):
+    """ write _n small FITS frame(s) and a broken one, return their path(s) """
+    _files = []
+    for _i in range(_n):
+        _files.append(str(_root / f'frame{_i}.fits'))
+        fits.writeto(_files[-1], np.random.default_rng(_i).normal(100.0, 5.0, (64, 96)).astype(np.float32))
+    (_root / 'broken.fits').write_bytes(b'not a fits file')
+    return _files, str(_root / 'broken.fits')
+
+
+# +
+# test: get_png_name()
+# -
+def test_get_png_name_0():
+    assert get_png_name('/a/b/c.fits.gz') == '/a/b/c.png' and get_png_name('/a/b/c.fits', '/d') == '/d/c.png'
+
+
+# +
+# test: bulk_fits_to_png()
+# -
+def test_bulk_0(tmp_path):
+    """ convert, skip when up to date (mtime), re-convert what changed """
+    _files, _broken = make_frames(tmp_path)
+    _s = bulk_fits_to_png(files=_files + [_broken], workers=2)
+    assert (_s['converted'], _s['skipped'], _s['failed']) == (4, 0, 1) and _s['fps'] > 0.0
+    assert all(os.path.exists(get_png_name(_f)) for _f in _files)
+    assert bulk_fits_to_png(files=_files, workers=2)['skipped'] == 4
+    os.utime(_files[0], (time.time() + 10, time.time() + 10))
+    assert bulk_fits_to_png(files=_files, workers=2)['converted'] == 1
+
+
+def test_bulk_1(tmp_path):
+    """ hash check ignores touch(es) but not changed render option(s) """
+    _files, _ = make_frames(tmp_path)
+    _out = str(tmp_path / 'png')
+    assert bulk_fits_to_png(files=_files, output_dir=_out, check='hash', workers=2)['converted'] == 4
+    os.utime(_files[0], (time.time() + 10, time.time() + 10))
+    assert bulk_fits_to_png(files=_files, output_dir=_out, check='hash', workers=2)['skipped'] == 4
+    assert bulk_fits_to_png(files=_files, output_dir=_out, check='hash', workers=2,
+                            stretch='linear')['converted'] == 4
+
+
+def test_bulk_2(tmp_path):
+    """ file(s) from a seek() query """
+    _files, _ = make_frames(tmp_path)
+    _s = bulk_fits_to_png(begin=get_isot(-1), end=get_isot(1), path=str(tmp_path), _type='.fits', workers=2)
+    assert _s['converted'] == 4 and _s['failed'] == 1
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from astropy.io import fits
+from astropy.wcs import WCS
+from src.fits_render import *
+
+import src.fits_render
+
+
+# +
+# doc string(s)
+# -
+__doc__ = """
+  % python3 -m pytest -p no:warnings test_fits_render.py
+"""
+
+
+# +
+# function: make_fits()
+# -
+def make_fits(_path=None, _ny=400, _nx=600, _star=(200, 300), _ext=False):
+    """ write a noisy int16 (BZERO=32768) frame with a star at pixel (y, x) and a TAN WCS, return (path, wcs) """
+    _rng = np.random.default_rng(42)
+    _data = _rng.normal(1000.0, 10.0, (_ny, _nx))
+    _data[_star[0] - 1:_star[0] + 2, _star[1] - 1:_star[1] + 2] = 30000.0
+    _wcs = WCS(naxis=2)
+    _wcs.wcs.ctype = ['RA---TAN', 'DEC--TAN']
+    _wcs.wcs.crval = [338.99, 33.96]
+    _wcs.wcs.crpix = [_nx / 2.0, _ny / 2.0]
+    _wcs.wcs.cdelt = [-0.26 / 3600.0, 0.26 / 3600.0]
+    _hdu = fits.PrimaryHDU(data=_data.astype(np.uint16), header=_wcs.to_header())
+    _hdul = fits.HDUList([fits.PrimaryHDU(), fits.ImageHDU(data=_hdu.data, header=_hdu.header, name='SCI')]) \
+        if _ext else fits.HDUList([_hdu])
+    _hdul.writeto(str(_path), overwrite=True)
+    return str(_path), _wcs
+
+
+# +
+# test: block_average()
+# -
+def test_block_average_0(monkeypatch):
+    """ strip-wise average equals a whole-array average, remainder row(s)/column(s) are dropped """
+    monkeypatch.setattr(src.fits_render, 'FITS_RENDER_STRIP_BYTES', 64)
+    _a = np.arange(23 * 17, dtype=np.float32).reshape(23, 17)
+    assert np.allclose(block_average(_a, (0, 23, 0, 17), 4), _a[:20, :16].reshape(5, 4, 4, 4).mean(axis=(1, 3)))
+
+
+# +
+# test: zscale_limits(), get_limits()
+# -
+def test_limits_0():
+    """ limit(s) bracket the bulk of the data, outlier(s) are ignored """
+    _d = np.random.default_rng(1).normal(100.0, 5.0, 100000).astype(np.float32)
+    _d[:10] = 1.0e6
+    _lo, _hi = get_limits(_d, 'zscale')
+    assert 60.0 < _lo < 100.0 < _hi < 140.0
+    _lo, _hi = get_limits(_d, 'percentile', (1.0, 99.0))
+    assert 80.0 < _lo < 100.0 < _hi < 120.0
+
+
+# +
+# test: render_fits()
+# -
+def test_render_fits_0(tmp_path):
+    """ whole frame is downsampled to max_size, 8-bit and north up """
+    _file, _ = make_fits(tmp_path / 'a.fits')
+    _img = render_fits(_file, max_size=150, stretch='linear')
+    assert _img.dtype == np.uint8 and _img.shape == (100, 150)
+    assert np.unravel_index(np.argmax(_img), _img.shape) == (100 - 1 - 200 // 4, 300 // 4)
+
+
+def test_render_fits_1(tmp_path):
+    """ cutout is centred on RA, Dec from the named HDU """
+    _file, _wcs = make_fits(tmp_path / 'b.fits', _ext=True)
+    _ra, _dec = (float(_v) for _v in _wcs.all_pix2world(300, 200, 0))
+    _img = render_fits(_file, hdu='SCI', ra=f'{_ra / 15.0}', dec=f'{_dec}', size=51, stretch='linear')
+    assert _img.shape == (51, 51) and tuple(np.argwhere(_img == _img.max()).mean(axis=0)) == (25.0, 25.0)
+
+
+def test_render_fits_2(tmp_path):
+    """ float data converts to png (it used to fail) """
+    _file = str(tmp_path / 'c.fits')
+    fits.writeto(_file, np.random.default_rng(2).normal(0.0, 1.0, (64, 64)).astype(np.float32))
+    from PIL import Image
+    assert Image.open(fits_to_png_buffer(_file)).mode == 'L'
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from astropy.coordinates import Angle
+from src import *
+
+import numpy as np
+
+import random
+import threading
+
+
+# +
+# doc string(s)
+# -
+__doc__ = """
+  % python3 -m pytest -p no:warnings test_init.py
+"""
+
+
+# +
+# constant(s)
+# -
+INVALID_INPUTS = [None, '', 'junk', {}, [], (), math.pi, '10:61:00', '10:00:61.0', '25:00:00.0']
+RANDOM_SEED = random.seed(os.getpid())
+RA_VALUES = [f'{random.randint(0, 23):02d}:{random.randint(0, 59):02d}:{random.uniform(0.0, 59.999):09.6f}'
+             for _ in range(1000)]
+DEC_VALUES = [f'{random.choice("+-")}{random.randint(0, 89):02d}:{random.randint(0, 59):02d}:'
+              f'{random.uniform(0.0, 59.999):06.3f}' for _ in range(1000)]
+
+
+# +
+# test: ra_to_decimal(), dec_to_decimal()
+# -
+def test_ra_to_decimal_0():
+    """ invalid input(s) """
+    assert all(math.isnan(ra_to_decimal(_k)) for _k in INVALID_INPUTS)
+
+
+def test_ra_to_decimal_1():
+    """ same as astropy to within 1e-9 degrees """
+    assert all(abs(ra_to_decimal(_k) - Angle(f'{_k} hours').degree) < 1.0e-9 for _k in RA_VALUES)
+
+
+def test_dec_to_decimal_0():
+    """ invalid input(s) """
+    assert all(math.isnan(dec_to_decimal(_k)) for _k in INVALID_INPUTS if _k != '25:00:00.0')
+    assert all(sexagesimal_to_decimal(_k) is None for _k in ('+-1:00:00', '--1:00:00', '-+1:00:00', '++1:00:00'))
+
+
+def test_dec_to_decimal_1():
+    """ same as astropy to within 1e-9 degrees """
+    assert all(abs(dec_to_decimal(_k) - Angle(f'{_k} degrees').degree) < 1.0e-9 for _k in DEC_VALUES)
+
+
+# +
+# test: ra_to_decimal_array(), dec_to_decimal_array()
+# -
+def test_ra_to_decimal_array_0():
+    """ same as scalar version, including unit suffix and fallback value(s) """
+    _v = RA_VALUES[:100] + [f'{_k} hours' for _k in RA_VALUES[:10]] + ['22 35 58', '1:2:3', 'junk', '']
+    assert np.allclose(ra_to_decimal_array(_v), [ra_to_decimal(_k) for _k in _v], rtol=0.0, atol=1.0e-9,
+                       equal_nan=True)
+
+
+def test_dec_to_decimal_array_0():
+    """ same as scalar version for a numpy array """
+    _v = np.array(DEC_VALUES + ['-100:00:00', '+12:34:56.7.8'])
+    assert np.allclose(dec_to_decimal_array(_v), [dec_to_decimal(_k) for _k in _v], rtol=0.0, atol=1.0e-9,
+                       equal_nan=True)
+
+
+# +
+# test: image_to_png_buffer(), jpg_to_png_bytes()
+# -
+def test_image_to_png_buffer_0():
+    """ array and jpeg bytes convert in memory """
+    from PIL import Image
+    _jpg = io.BytesIO()
+    Image.new('RGB', (16, 8)).save(_jpg, 'JPEG')
+    assert Image.open(image_to_png_buffer(np.zeros((8, 16), dtype=np.uint8))).size == (16, 8)
+    assert Image.open(io.BytesIO(jpg_to_png_bytes(_jpg.getvalue()))).format == 'PNG'
+
+
+# +
+# test: Logger()
+# -
+def test_logger_0(tmp_path, monkeypatch):
+    """ configured once per name, record(s) reach the file as JSON lines once the queue is drained """
+    monkeypatch.setenv('MMT_LOG', str(tmp_path))
+    _name = f'test_logger_0_{os.getpid()}'
+    _log = Logger(_name, json_lines=True).logger
+    assert Logger(_name, level='INFO').logger is _log and len(_log.handlers) == 1 and _log.level == logging.INFO
+    _log.debug('dropped')
+    _log.info('kept %s', 1)
+    stop_loggers()
+    _lines = [json.loads(_l) for _l in open(tmp_path / f'{_name}.log')]
+    assert [(_l['level'], _l['message']) for _l in _lines] == [('INFO', 'kept 1')]
+    os.remove(f'/tmp/console-{_name}.log')
+
+
+def test_logger_1(tmp_path, monkeypatch):
+    """ file(s) rotate at MMT_LOG_MAX_BYTES """
+    import src
+    monkeypatch.setenv('MMT_LOG', str(tmp_path))
+    monkeypatch.setattr(src, 'MMT_LOG_MAX_BYTES', 2048)
+    _name = f'test_logger_1_{os.getpid()}'
+    _log = Logger(_name).logger
+    for _i in range(100):
+        _log.debug(f'line {_i} {"x" * 64}')
+    stop_loggers()
+    assert os.path.exists(tmp_path / f'{_name}.log.1') and os.path.getsize(tmp_path / f'{_name}.log') <= 2048
+    for _f in [_f for _f in os.listdir('/tmp') if _f.startswith(f'console-{_name}.log')]:
+        os.remove(f'/tmp/{_f}')
+
+
+def test_logger_2(tmp_path, monkeypatch):
+    """ message(s) are formatted by the listener and a traceback lands in 'exc', not in 'message' """
+    monkeypatch.setenv('MMT_LOG', str(tmp_path))
+    _name = f'test_logger_2_{os.getpid()}'
+    _log = Logger(_name, json_lines=True).logger
+    monkeypatch.setattr(_log, 'propagate', False)    # pytest's root handler(s) format on this thread
+    _calls = []
+
+    class _Arg(object):
+        def __str__(self):
+            _calls.append(threading.current_thread().name)
+            return 'arg'
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        _log.exception('failed %s', _Arg())
+    _caller = threading.current_thread().name
+    stop_loggers()
+    _lines = [json.loads(_l) for _l in open(tmp_path / f'{_name}.log')]
+    assert [_l['message'] for _l in _lines] == ['failed arg'] and 'ZeroDivisionError' in _lines[0]['exc']
+    assert _calls and _caller not in _calls
+    os.remove(f'/tmp/console-{_name}.log')
+
+
+# +
+# test: iter_json_array()
+# -
+def test_iter_json_array_0():
+    """ element(s) split across any chunk boundary (including inside multi-byte character(s) and number(s)) """
+    _values = [{'id': _i, 'objectid': f'é{_i}', 'pa': _i / 7.0, 'offsetstars': [{'ra': '22:35:58'}]}
+               for _i in range(50)] + [12345, 'x', None]
+    _data = json.dumps(_values, ensure_ascii=False).encode('utf-8')
+    for _size in (1, 2, 7, 64, len(_data)):
+        assert list(iter_json_array(_data[_i:_i + _size] for _i in range(0, len(_data), _size))) == _values
+    assert list(iter_json_array([b' [ ] '])) == [] and list(iter_json_array([])) == []
+    assert list(iter_json_array([b'', b' \n'])) == []
+    for _bad in ([b'{"id": 1}'], [b'[{"id": 1}'], [b'[{"id": }]']):
+        try:
+            list(iter_json_array(_bad))
+            assert False
+        except ValueError:
+            pass
+
+
+def test_verify_keys_0():
+    """ set-based key check keeps the tuple semantic(s) """
+    assert verify_keys({'id': 1, 'ra': ''}, MMT_JSON_KEYS) and verify_keys({}, MMT_JSON_KEYS_SET)
+    assert not verify_keys({'junk': 1}, MMT_JSON_KEYS) and not verify_keys([{}], MMT_JSON_KEYS)
+    assert not verify_keys(None, MMT_JSON_KEYS) and to_record({'id': 1}).id == 1 and to_record({}).ra is None
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from src.mmt import *
+from src.mmt_async import MMTAsyncClient
+from src.mmt_server import MMTFaults
+from src.mmt_server import start_server
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+import asyncio
+
+
+# +
+# doc string(s)
+# -
+__doc__ = """
+  % python3 -m pytest -p no:warnings test_mmt.py
+"""
+
+
+# +
+# constant(s)
+# -
+SERVER, SERVER_URL = start_server()
+CLIENT = MMTClient(url=SERVER_URL, pool_size=4, timeout=5.0)
+
+
+# +
+# test: MMTClient()
+# -
+def test_client_0():
+    """ invalid argument(s) reset to default(s) """
+    _c = MMTClient(url=None, pool_size=-1, timeout='')
+    assert _c.url == MMT_URL.rstrip('/') and _c.pool_size == MMT_POOL_SIZE and \
+        _c.timeout == (MMT_CONNECT_TIMEOUT, MMT_READ_TIMEOUT)
+
+
+def test_client_1():
+    """ scalar timeout applies to connect and read """
+    assert CLIENT.timeout == (5.0, 5.0)
+
+
+def test_client_2():
+    """ default client is shared """
+    assert get_client() is get_client()
+
+
+# +
+# class: FlakyHandler() replies with the queued status(es) then 200
+# -
+# noinspection PyPep8Naming
+class FlakyHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    replies = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0) or 0))
+        _code, _after = self.replies.pop(0) if self.replies else (200, None)
+        self.send_response(_code)
+        if _after is not None:
+            self.send_header('Retry-After', _after)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    do_GET = do_POST = do_PUT = _reply
+
+
+# +
+# function: flaky_client()
+# -
+def flaky_client(_replies=None, **kwargs):
+    """ return a client of a server that first answers with _replies [(status, Retry-After)] """
+    FlakyHandler.replies = list(_replies or [])
+    _server = ThreadingHTTPServer(('127.0.0.1', 0), FlakyHandler)
+    _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return MMTClient(url=f'http://127.0.0.1:{_server.server_address[1]}', timeout=5.0, **kwargs)
+
+
+# +
+# test: MMTClient() retries and rate limit
+# -
+def test_client_retry_0():
+    """ idempotent request(s) retry 429 / 503, honouring Retry-After, and count it """
+    _c = flaky_client([(503, None), (429, '0.2')], backoff=0.01)
+    _t0 = time.perf_counter()
+    assert _c.get(url=f'{_c.url}/1').status_code == 200 and time.perf_counter() - _t0 >= 0.2
+    assert {_k: _c.stats[_k] for _k in ('requests', 'retries', 'throttled')} == \
+        {'requests': 3, 'retries': 2, 'throttled': 2}
+
+
+def test_client_retry_1():
+    """ POST only retries on opt-in, retries are bounded """
+    _c = flaky_client([(503, None), (503, None)], backoff=0.01, retries=1)
+    assert _c.post(url=f'{_c.url}/').status_code == 503
+    assert _c.post(url=f'{_c.url}/', retry=True).status_code == 200 and _c.stats['retries'] == 1
+    FlakyHandler.replies = [(503, None)] * 3
+    assert _c.put(url=f'{_c.url}/1').status_code == 503 and _c.stats['retries'] == 2
+
+
+def test_client_retry_2(monkeypatch):
+    """ a response that is retried is closed first, so a stream=True reply does not hold its connection """
+    _closed, _close = [], requests.Response.close
+    monkeypatch.setattr(requests.Response, 'close', lambda _r: _closed.append(_r.status_code) or _close(_r))
+    _c = flaky_client([(503, None), (429, None)], backoff=0.01, pool_size=1)
+    with _c.get(url=f'{_c.url}/1', stream=True) as _req:
+        assert _req.status_code == 200 and _closed == [503, 429]
+
+
+def test_client_rate_0():
+    """ token bucket keeps to the rate after the burst """
+    _c = flaky_client(rate=10.0, burst=1)
+    _t0 = time.perf_counter()
+    for _ in range(4):
+        _c.get(url=f'{_c.url}/1')
+    assert time.perf_counter() - _t0 >= 0.29 and _c.stats['waits'] >= 1
+
+
+# +
+# test: *_action() via mmt_target()
+# -
+def test_mmt_target_0():
+    """ GET / PUT / DELETE round trip through the pooled client """
+    _id = SERVER.store.create({'objectid': 'test_mmt_target_0'})['id']
+    assert mmt_target(action='GET', targetid=_id, client=CLIENT)['objectid'] == 'test_mmt_target_0'
+    assert mmt_target(action='PUT', targetid=_id, payload='{"filter": "z"}', client=CLIENT)['filter'] == 'z'
+    assert mmt_target(action='DELETE', targetid=_id, client=CLIENT) == 'null'
+    assert mmt_target(action='GET', targetid=_id, client=CLIENT) == '"Not Found"'
+
+
+def test_mmt_target_1():
+    """ invalid action """
+    assert mmt_target(action='INVALID', client=CLIENT) is None
+
+
+# +
+# test: parse_response(), iter_records()
+# -
+def test_parse_response_0():
+    """ typed record(s) from a single GET and from a streamed listing """
+    _id = SERVER.store.create({'objectid': 'typed_0', 'priority': 2})['id']
+    _rec = parse_response(CLIENT.get(url=f'{CLIENT.url}/{_id}'), typed=True)
+    assert isinstance(_rec, TargetRecord) and (_rec.id, _rec.objectid, _rec.priority, _rec.seeing) == \
+        (_id, 'typed_0', 2, None)
+    assert parse_response(CLIENT.get(url=f'{CLIENT.url}/999999999')) is not None
+    with CLIENT.get(url=f'{CLIENT.url}/', stream=True) as _req:
+        _recs = list(iter_records(_req, typed=True, chunk_size=100))
+    assert _recs and all(isinstance(_r, TargetRecord) for _r in _recs) and _rec in _recs
+
+
+# +
+# class: ChunkedHandler() replies to GET with a chunked (no Content-Length) list of record(s)
+# -
+# noinspection PyPep8Naming
+class ChunkedHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    records = [{'id': _i, 'objectid': f'chunked_{_i}'} for _i in range(1, 201)]
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        _data = json.dumps(self.records).encode('utf-8')
+        for _i in range(0, len(_data), 512):
+            _chunk = _data[_i:_i + 512]
+            self.wfile.write(f'{len(_chunk):x}\r\n'.encode('ascii') + _chunk + b'\r\n')
+        self.wfile.write(b'0\r\n\r\n')
+
+
+def test_iter_records_0():
+    """ with metrics enabled a chunked stream=True listing is still unread when iteration starts """
+    _server = ThreadingHTTPServer(('127.0.0.1', 0), ChunkedHandler)
+    _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    _m = get_metrics().enable()
+    _m.reset()
+    try:
+        with MMTClient(url=f'http://127.0.0.1:{_server.server_address[1]}', timeout=5.0) as _c:
+            with _c.get(url=f'{_c.url}/', stream=True) as _req:
+                assert 'Content-Length' not in _req.headers and _req._content_consumed is False
+                assert [_r.id for _r in iter_records(_req, typed=True, chunk_size=256)] == list(range(1, 201))
+        assert _m.snapshot()['responses'] == {'200': 1}
+    finally:
+        _m.disable().reset()
+        _server.shutdown()
+
+
+# +
+# test: batch_action()
+# -
+def test_batch_action_0(tmp_path):
+    """ valid record(s) are submitted, invalid one(s) are reported per record """
+    _good = {'dec': '+33:57:36', 'exposuretime': 300.0, 'filter': 'r', 'magnitude': 15.0,
+             'objectid': 'test_batch_action_0', 'observationtype': 'imaging', 'ra': '22:35:58'}
+    _file = tmp_path / 'batch.jsonl'
+    _file.write_text('\n'.join([json.dumps(_good), json.dumps({**_good, 'ra': '25:00:00'}), '{broken',
+                                json.dumps(_good)]) + '\n')
+    _res = sorted(batch_action(file=str(_file), output=open(os.devnull, 'w'), workers=2, client=CLIENT),
+                  key=lambda _r: _r['record'])
+    assert [_r['status'] for _r in _res] == ['submitted', 'invalid', 'invalid', 'submitted']
+    assert all(isinstance(_r['targetid'], int) for _r in _res if _r['status'] == 'submitted')
+
+
+def test_batch_action_1(tmp_path):
+    """ csv value(s) are coerced to payload type(s) """
+    _file = tmp_path / 'batch.csv'
+    _file.write_text('dec,exposuretime,filter,magnitude,objectid,observationtype,ra\n'
+                     '+33:57:36,300,r,15,test_batch_action_1,imaging,22:35:58\n')
+    assert read_batch(file=str(_file))[0][1]['exposuretime'] == 300.0
+
+
+# +
+# test: MMTAsyncClient()
+# -
+def test_async_0():
+    """ fan-out of GET(s) returns results in order """
+    _ids = [SERVER.store.create({'objectid': f'test_async_{_i}'})['id'] for _i in range(20)]
+
+    async def _main():
+        async with MMTAsyncClient(concurrency=8, timeout=5.0, client=CLIENT) as _c:
+            return await _c.gather('GET', [{'targetid': _i} for _i in _ids])
+    assert [_r['objectid'] for _r in asyncio.run(_main())] == [f'test_async_{_i}' for _i in range(20)]
+
+
+def test_async_1():
+    """ one client serves successive event loop(s), timeout is the request's own """
+    _id = SERVER.store.create({'objectid': 'test_async_1'})['id']
+    _c = MMTAsyncClient(concurrency=1, timeout=5.0, client=CLIENT)
+    for _ in range(2):
+        assert [_r['objectid'] for _r in asyncio.run(_c.gather('GET', [{'targetid': _id}] * 4))] == \
+            ['test_async_1'] * 4
+    _c.close()
+    _slow, _url = start_server(faults=MMTFaults(latency=0.5))
+    _id = _slow.store.create({'objectid': 'test_async_1'})['id']
+    _c = MMTAsyncClient(concurrency=2, client=MMTClient(url=_url, retries=0))
+    try:
+        _t0 = time.perf_counter()
+        assert asyncio.run(_c.run('GET', timeout=0.1, targetid=_id)) is None
+        assert time.perf_counter() - _t0 < 0.45
+    finally:
+        _c.close()
+        _slow.shutdown()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from src.mmt_bulk import *
+
+
+# +
+# doc string(s)
+# -
+__doc__ = """
+  % python3 -m pytest -p no:warnings test_mmt_bulk.py
+"""
+
+
+# +
+# constant(s)
+# -
+IMAGING = {'dec': '+33:57:36', 'exposuretime': 300.0, 'filter': 'r', 'magnitude': 15.0, 'objectid': 'test_bulk',
+           'observationtype': 'imaging', 'ra': '22:35:58'}
+SPECTROSCOPY = {**IMAGING, **{'centralwavelength': 6500.0, 'filter': 'LP3800', 'grating': '270',
+                               'observationtype': 'longslit'}}
+CHANGES = ({}, {'ra': '24:00:00'}, {'ra': '22:35:58 hours'}, {'ra': '+22:35:58'}, {'dec': '-90:00:00'},
+           {'dec': '-05:30:00.25'}, {'dec': 5}, {'filter': 'R'}, {'priority': 9}, {'pa': 400.0}, {'pm_ra': 'x'},
+           {'exposuretime': 300}, {'objectid': ' '}, {'observationtype': ' Mask'}, {'observationtype': 'x'},
+           {'centralwavelength': 9000.0}, {'grating': 270}, {'slitwidth': 'x'}, {'maskid': 113})
+
+
+# +
+# function: get_records()
+# -
+def get_records():
+    """ return imaging and spectroscopy record(s) with one change each """
+    return [{**_p, **_c} for _p in (IMAGING, SPECTROSCOPY) for _c in CHANGES]
+
+
+# +
+# test: validate_table()
+# -
+def test_validate_table_0():
+    """ mask, error code(s) and payload(s) agree with validate_payload() record by record """
+    _records = get_records()
+    _mask, _codes, _payloads = validate_table(_records)
+    _expected = [validate_payload(dict(_r)) for _r in _records]
+    assert _mask.tolist() == [_d != {} for _d, _ in _expected]
+    assert _codes.tolist() == [get_error_code(_e) for _, _e in _expected]
+    assert len(_payloads) == int(_mask.sum())
+    for _a, (_b, _) in zip(_payloads, [_x for _x in _expected if _x[0] != {}]):
+        assert _a.keys() == _b.keys() and all(math.isclose(_a[_k], _b[_k]) for _k in ('ra_decimal', 'dec_decimal'))
+        assert {_k: _v for _k, _v in _a.items() if 'decimal' not in _k} == \
+            {_k: _v for _k, _v in _b.items() if 'decimal' not in _k}
+
+
+def test_validate_table_1():
+    """ structured array column(s) agree with validate_payload(), absent column(s) take the default """
+    _a = np.zeros(len(CHANGES), dtype=[('ra', 'U16'), ('dec', 'U16'), ('observationtype', 'U10'),
+                                       ('exposuretime', 'f8'), ('magnitude', 'f8'), ('objectid', 'U16')])
+    for _k in _a.dtype.names:
+        _a[_k] = [f"{_c.get(_k, IMAGING[_k])}" if _a.dtype[_k].kind == 'U' else _c.get(_k, IMAGING[_k])
+                  for _c in CHANGES]
+    _mask, _codes, _payloads = validate_table(_a)
+    _expected = [validate_payload(dict(zip(_a.dtype.names, _r))) for _r in _a.tolist()]
+    assert _codes.tolist() == [get_error_code(_e) for _, _e in _expected] and 0 < len(_payloads) < len(CHANGES)
+    assert all(_p['filter'] == MMT_IMAGING_PAYLOAD['filter'] for _p in _payloads)
+
+
+def test_validate_table_2():
+    """ error code(s) decode to key(s), empty and mask-only input(s) """
+    _mask, _codes, _payloads = validate_table([{**IMAGING, **{'ra': 'x', 'filter': 'q'}}, None], payloads=False)
+    assert _mask.tolist() == [False, False] and _payloads == []
+    assert get_error_keys(_codes[0]) == ['filter', 'ra'] and get_error_keys(_codes[1]) == ['observationtype']
+    assert validate_table({})[0].size == 0
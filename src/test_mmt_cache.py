@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from src.mmt import *
+from src.mmt_server import start_server
+
+import src.mmt
+import src.mmt_cache
+
+
+# +
+# doc string(s)
+# -
+__doc__ = """
+  % python3 -m pytest -p no:warnings test_mmt_cache.py
+"""
+
+
+# +
+# constant(s)
+# -
+RA, DEC = '22:35:58', '+33:57:36'
+
+
+# +
+# function: make_png()
+# -
+def make_png(_path=None, _size=64):
+    _path.write_bytes(b'\x89PNG\r\n\x1a\n' + b'x' * _size)
+    return str(_path)
+
+
+# +
+# test: FinderCache.key()
+# -
+def test_key_0():
+    """ equivalent request(s) share a key """
+    assert FinderCache.key(ra=RA, dec=DEC) == FinderCache.key(ra='22:35:58.0', dec='33:57:36', opt='LG')
+
+
+def test_key_1():
+    """ different request(s) do not share a key """
+    assert FinderCache.key(ra=RA, dec=DEC) != FinderCache.key(ra=RA, dec=DEC, width=200)
+
+
+def test_key_2():
+    """ invalid RA, Dec """
+    assert FinderCache.key(ra='', dec=DEC) == '' and FinderCache.key(dec=DEC) == ''
+
+
+# +
+# test: FinderCache.get() / put() / evict()
+# -
+def test_cache_0(tmp_path):
+    """ miss, put, hit """
+    _c = FinderCache(path=str(tmp_path / 'cache'))
+    _k = _c.key(ra=RA, dec=DEC)
+    assert _c.get(_k) is None
+    assert _c.put(_k, make_png(tmp_path / 'a.png')) == _c.get(_k)
+    assert _c.stats() == {'hits': 1, 'misses': 1, 'entries': 1, 'bytes': 72}
+
+
+def test_cache_1(tmp_path):
+    """ least-recently-used entries are evicted first when over size """
+    _c = FinderCache(path=str(tmp_path / 'cache'), max_bytes=250)
+    for _i in range(3):
+        _c.put(f'{_i}', make_png(tmp_path / f'{_i}.png'))
+        os.utime(_c.entry(f'{_i}'), (1000.0 + _i, time.time() - 100 + _i))
+    _c.get('0')
+    _c.put('3', make_png(tmp_path / '3.png'))
+    assert _c.get('0') is not None and _c.get('1') is None and _c.stats()['entries'] == 3
+
+
+def test_cache_2(tmp_path):
+    """ expired entries are evicted """
+    _c = FinderCache(path=str(tmp_path / 'cache'), max_age=60)
+    _c.put('old', make_png(tmp_path / 'old.png'))
+    os.utime(_c.entry('old'), (0.0, time.time() - 120))
+    assert _c.evict() == 1 and _c.get('old') is None
+
+
+# +
+# test: get_finder_png()
+# -
+def test_get_finder_png_0(tmp_path, monkeypatch):
+    """ only the first request downloads and converts """
+    from PIL import Image
+    _calls = []
+
+    def _get_finder_chart_bytes(**kw):
+        _calls.append(kw)
+        _buf = io.BytesIO()
+        Image.new('RGB', (8, 8)).save(_buf, 'JPEG')
+        return _buf.getvalue()
+
+    monkeypatch.setattr(src.mmt_cache, 'get_finder_chart_bytes', _get_finder_chart_bytes)
+    _c = FinderCache(path=str(tmp_path / 'cache'))
+    _png = get_finder_png(cache=_c, ra=RA, dec=DEC)
+    assert _png.endswith('.png') and get_finder_png(cache=_c, ra=RA, dec=DEC) == _png and len(_calls) == 1
+    assert Image.open(_png).format == 'PNG' and (_c.hits, _c.misses) == (1, 1)
+
+
+def test_get_finder_png_1(tmp_path, monkeypatch):
+    """ failed download is not cached """
+    monkeypatch.setattr(src.mmt_cache, 'get_finder_chart_bytes', lambda **kw: b'')
+    _c = FinderCache(path=str(tmp_path / 'cache'))
+    assert get_finder_png(cache=_c, ra=RA, dec=DEC) == '' and _c.stats()['entries'] == 0
+
+
+# +
+# test: upload_action()
+# -
+def test_upload_action_0(tmp_path):
+    """ upload without a file is served from the cache """
+    _server, _url = start_server()
+    try:
+        _client = MMTClient(url=_url, timeout=5.0)
+        _c = FinderCache(path=str(tmp_path / 'cache'))
+        _c.put(_c.key(ra=RA, dec=DEC), make_png(tmp_path / 'chart.png'))
+        _id = _server.store.create({'objectid': 'test_upload_action_0', 'ra': RA, 'dec': DEC})['id']
+        _ans = mmt_target(action='UPLOAD', targetid=_id, client=_client, cache=_c)
+        assert _ans['findingchartfilename'] == f'{_id}.png' and _c.hits == 1
+    finally:
+        _server.shutdown()
+
+
+def test_upload_action_1(tmp_path, monkeypatch):
+    """ upload without cache or save writes no file(s), save writes the png """
+    from PIL import Image
+    _buf = io.BytesIO()
+    Image.new('RGB', (8, 8)).save(_buf, 'JPEG')
+    monkeypatch.setattr(src.mmt, 'get_finder_chart_bytes', lambda **kw: _buf.getvalue())
+    monkeypatch.chdir(tmp_path)
+    _server, _url = start_server()
+    try:
+        _client = MMTClient(url=_url, timeout=5.0)
+        _id = _server.store.create({'objectid': 'test_upload_action_1', 'ra': RA, 'dec': DEC})['id']
+        assert mmt_target(action='UPLOAD', targetid=_id, client=_client, cache=False)['id'] == _id
+        assert os.listdir(tmp_path) == []
+        mmt_target(action='UPLOAD', targetid=_id, client=_client, cache=False, save=str(tmp_path / 'saved.png'))
+        assert Image.open(tmp_path / 'saved.png').format == 'PNG'
+    finally:
+        _server.shutdown()
+
+
+def test_upload_action_2(tmp_path, monkeypatch):
+    """ upload carries on without the default cache if it cannot be created (e.g. read-only HOME) """
+    from PIL import Image
+    _buf = io.BytesIO()
+    Image.new('RGB', (8, 8)).save(_buf, 'JPEG')
+    monkeypatch.setattr(src.mmt, 'get_finder_chart_bytes', lambda **kw: _buf.getvalue())
+    monkeypatch.setattr(src.mmt, 'get_cache', lambda **kw: (_ for _ in ()).throw(PermissionError(13, 'read-only')))
+    _server, _url = start_server()
+    try:
+        _client = MMTClient(url=_url, timeout=5.0)
+        _id = _server.store.create({'objectid': 'test_upload_action_2', 'ra': RA, 'dec': DEC})['id']
+        assert mmt_target(action='UPLOAD', targetid=_id, client=_client)['id'] == _id
+    finally:
+        _server.shutdown()
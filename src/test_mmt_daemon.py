@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from src.mmt_daemon import *
+from src.mmt_server import start_server
+
+
+# +
+# doc string(s)
+# -
+__doc__ = """
+  % python3 -m pytest -p no:warnings test_mmt_daemon.py
+"""
+
+
+# +
+# constant(s)
+# -
+SERVER, SERVER_URL = start_server()
+CLIENT = MMTClient(url=SERVER_URL, pool_size=2, timeout=5.0)
+
+
+# +
+# test: start_daemon() / send_command()
+# -
+def test_daemon_0(tmp_path):
+    """ PING, GET and bad command(s) round trip over the unix socket, which only the owner can use """
+    _path = str(tmp_path / 'mmt.sock')
+    _daemon = start_daemon(path=_path, client=CLIENT, cache=False)
+    try:
+        assert os.stat(_path).st_mode & 0o077 == 0
+        assert send_command(path=_path, action='PING')['result']['pid'] == os.getpid()
+        _id = SERVER.store.create({'objectid': 'daemon_0'})['id']
+        _ans = send_command(path=_path, action='get', targetid=_id)
+        assert _ans['ok'] and _ans['result']['objectid'] == 'daemon_0' and _ans['seconds'] >= 0.0
+        assert not send_command(path=_path, action='PATCH')['ok']
+        try:
+            start_daemon(path=_path, client=CLIENT, cache=False)
+            assert False
+        except Exception as _e:
+            assert 'already running' in f'{_e}'
+    finally:
+        stop_daemon(_daemon)
+    assert not os.path.exists(_path)
+
+
+def test_daemon_1(tmp_path):
+    """ stale socket file is replaced, file / save path(s) outside root (or with no root) are refused """
+    _path = str(tmp_path / 'stale.sock')
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as _s:
+        _s.bind(_path)
+    _root = tmp_path / 'root'
+    _root.mkdir()
+    _daemon = start_daemon(path=_path, client=CLIENT, cache=False, root=str(_root))
+    try:
+        assert os.stat(_path).st_mode & 0o777 == 0o600 and send_command(path=_path, action='PING')['ok']
+        for _k, _v in (('file', '/etc/passwd'), ('file', '../x.png'), ('save', str(tmp_path / 'x.png'))):
+            _ans = send_command(path=_path, action='UPLOAD', targetid=1, **{_k: _v})
+            assert not _ans['ok'] and 'outside' in _ans['error']
+        assert get_root_path('a/b.png', str(_root)) == os.path.join(os.path.realpath(_root), 'a', 'b.png')
+    finally:
+        stop_daemon(_daemon)
+    assert 'disabled' in run_command({'action': 'UPLOAD', 'file': 'x.png'}, CLIENT, False, None, '')['error']
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from src.mmt import *
+from src.mmt_server import start_server
+
+
+# +
+# doc string(s)
+# -
+__doc__ = """
+  % python3 -m pytest -p no:warnings test_mmt_metrics.py
+"""
+
+
+# +
+# constant(s)
+# -
+SERVER, SERVER_URL = start_server()
+CLIENT = MMTClient(url=SERVER_URL, pool_size=2, timeout=5.0)
+
+
+# +
+# test: Histogram()
+# -
+def test_histogram_0():
+    """ quantile(s) land within one bucket (~19%) of the exact value and inside the observed range """
+    _h = Histogram()
+    for _i in range(1, 1001):
+        _h.observe(_i * 1.0e-3)
+    _s = _h.summary(seconds=2.0)
+    assert _s['count'] == 1000 and abs(_s['sum'] - 500.5) < 1.0e-9 and _s['rate'] == 500.0
+    for _k, _v in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99)):
+        assert abs(_s[_k] - _v) / _v < 0.19 and _s['min'] <= _s[_k] <= _s['max']
+    assert Histogram().quantile(0.99) == 0.0
+
+
+# +
+# test: Metrics()
+# -
+def test_metrics_0():
+    """ disabled metrics share one no-op timer and record nothing """
+    _m = Metrics(enabled=False)
+    assert _m.timer('a') is _m.timer('b') is MMT_METRICS_NULL_TIMER
+    with _m.timer('a'):
+        _m.count('x')
+        _m.error()
+    assert _m.snapshot()['stages'] == {} and _m.snapshot()['counters'] == {} and _m.snapshot()['errors'] == {}
+
+
+def test_metrics_1(tmp_path):
+    """ stage, byte and status metric(s) of mmt_target() (the invalid POST stops at validate) in both format(s) """
+    _m = get_metrics().enable()
+    _m.reset()
+    try:
+        _id = SERVER.store.create({'objectid': 'metrics_1'})['id']
+        assert mmt_target(action='GET', targetid=_id, client=CLIENT)['id'] == _id
+        mmt_target(action='GET', targetid=999999999, client=CLIENT)
+        assert mmt_target(action='PUT', targetid=_id, payload='{"filter": "z"}', client=CLIENT)['filter'] == 'z'
+        assert mmt_target(action='POST', payload=json.dumps(MMT_IMAGING_PAYLOAD), client=CLIENT) is None
+        _s = json.load(open(_m.write(str(tmp_path / 'mmt.json'))))
+        assert _s['stages']['action_get']['count'] == 2 and _s['stages']['http']['count'] == 3
+        assert {'action_post', 'action_put', 'parse', 'validate'} <= set(_s['stages'])
+        assert _s['responses'] == {'200': 2, '404': 1} and _s['errors'] == {'404': 1}
+        assert _s['counters']['bytes_received'] > 0 and _s['counters']['bytes_sent'] > 0
+        _text = open(_m.write(str(tmp_path / 'mmt.prom'))).read()
+        assert 'mmt_stage_seconds{stage="http",quantile="0.99"}' in _text
+        assert 'mmt_http_errors_total{code="404",reason="Not Found"} 1' in _text
+    finally:
+        _m.disable().reset()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from src.mmt_mirror import *
+from src.mmt_server import start_server
+
+
+# +
+# doc string(s)
+# -
+__doc__ = """
+  % python3 -m pytest -p no:warnings test_mmt_mirror.py
+"""
+
+
+# +
+# constant(s)
+# -
+SERVER, SERVER_URL = start_server()
+CLIENT = MMTClient(url=SERVER_URL, pool_size=4, timeout=5.0)
+
+
+# +
+# test: TargetMirror()
+# -
+def test_mirror_0(tmp_path):
+    """ full sync, local query(s), then only changed target(s) are re-fetched and deleted one(s) forgotten """
+    _ids = [SERVER.store.create({'objectid': f'mirror_{_i}', 'iscomplete': _i % 2, 'priority': 1 + _i % 3,
+                                            'offsetstars': [{'ra': '22:35:58'}]})['id'] for _i in range(12)]
+    with TargetMirror(db=str(tmp_path / 'mirror.sqlite')) as _m:
+        _s = _m.refresh(client=CLIENT, workers=4)
+        assert _s['fetched'] >= 12 and _s['failed'] == 0 and _m.get(_ids[0])['offsetstars'] == [{'ra': '22:35:58'}]
+        assert [_r['id'] for _r in _m.find(iscomplete=0, priority=1) if _r['id'] in _ids] == [_ids[0], _ids[6]]
+        assert [_r['id'] for _r in _m.query('objectid LIKE ?', ['mirror_1%'], order='id DESC')][:3] == \
+            [_ids[11], _ids[10], _ids[1]]
+
+        # change one, delete one
+        SERVER.store.update(_ids[3], {'priority': 3})
+        SERVER.store.delete(_ids[4])
+        _s = _m.refresh(client=CLIENT, workers=4)
+        assert (_s['fetched'], _s['deleted'], _s['unchanged']) == (1, 1, _s['listed'] - 1)
+        assert _m.get(_ids[3])['priority'] == 3 and _m.get(_ids[4]) is None
+
+
+def test_mirror_1(tmp_path):
+    """ restricted refresh and invalid key(s) """
+    _id = SERVER.store.create({'objectid': 'mirror_only'})['id']
+    with TargetMirror(db=str(tmp_path / 'mirror.sqlite')) as _m:
+        assert _m.refresh(client=CLIENT, ids=[_id])['fetched'] == 1 and _m.modified().keys() == {_id}
+        try:
+            _m.find(nokey=1)
+            assert False
+        except Exception as _e:
+            assert 'nokey' in f'{_e}'
+        assert [_r['id'] for _r in _m.find(order='priority desc, id')] == [_id]
+        for _order in ('id; DROP TABLE targets', 'nokey', 'id DESC LIMIT 1', 'id SIDEWAYS'):
+            try:
+                _m.query(order=_order)
+                assert False
+            except Exception as _e:
+                assert 'invalid order' in f'{_e}'
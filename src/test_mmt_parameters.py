@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from src.mmt_parameters import *
+
+import numpy as np
+
+
+# +
+# doc string(s)
+# -
+__doc__ = """
+  % python3 -m pytest -p no:warnings test_mmt_parameters.py
+"""
+
+
+# +
+# constant(s)
+# -
+WAVELENGTHS = [4000.0, 4108.0, 4683.0, 4683.5, 5146.0, 5501.0, 7000.0, 7838.0, 7838.5, 9279.0, 9300.0]
+
+
+# +
+# function: scan()
+# -
+def scan(_grating='270', _value=6669.5):
+    """ reference: linear scan of the range list """
+    return any(_r['min'] <= _value <= _r['max'] for _r in MMT_SPECTROSCOPY_GRATINGS.get(_grating, []))
+
+
+# +
+# test: GratingIndex()
+# -
+def test_grating_index_0():
+    """ bisect and vectorized check(s) agree with a linear scan, end point(s) included """
+    for _g in list(MMT_SPECTROSCOPY_GRATINGS) + ['300']:
+        _expected = [scan(_g, _w) for _w in WAVELENGTHS]
+        assert [verify_spectroscopy_wavelength(_g, _w) for _w in WAVELENGTHS] == _expected
+        assert MMT_SPECTROSCOPY_INDEX.contains_array(_g, WAVELENGTHS).tolist() == _expected
+    assert MMT_SPECTROSCOPY_INDEX.contains_array(['270', '600', '300'], [5200.0, 5200.0, 6000.0]).tolist() == \
+        [False, True, False]
+    assert not verify_spectroscopy_wavelength(270, 6000.0) and verify_spectroscopy_wavelength('270', '6000')
+
+
+def test_grating_index_1():
+    """ reverse query returns every covering (grating, range) pair """
+    for _w in WAVELENGTHS + [7363.0, 7500.0]:
+        assert sorted((_k, _r['min']) for _k, _r in MMT_SPECTROSCOPY_INDEX.query(_w)) == \
+            sorted((_k, _r['min']) for _k, _rs in MMT_SPECTROSCOPY_GRATINGS.items() for _r in _rs
+                   if _r['min'] <= _w <= _r['max'])
+    assert MMT_SPECTROSCOPY_INDEX.query('x') == []
+
+
+def test_grating_index_2():
+    """ overlapping range(s) of one grating are merged """
+    _index = GratingIndex({'a': [{'min': 10.0, 'max': 20.0}, {'min': 15.0, 'max': 30.0}, {'min': 40.0, 'max': 50.0}]})
+    assert _index.contains_array('a', np.array([5.0, 12.0, 25.0, 35.0, 40.0])).tolist() == \
+        [False, True, True, False, True]
+    assert len(_index.query(17.0)) == 2 and len(_index.query(35.0)) == 0
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from src.mmt_prefetch import *
+from src.mmt_server import start_server
+
+import src.mmt_prefetch
+
+
+# +
+# doc string(s)
+# -
+__doc__ = """
+  % python3 -m pytest -p no:warnings test_mmt_prefetch.py
+"""
+
+
+# +
+# constant(s)
+# -
+DELAY = 0.2
+SERVER, SERVER_URL = start_server()
+CLIENT = MMTClient(url=SERVER_URL, pool_size=8, timeout=5.0)
+
+
+# +
+# function: slow_finder_chart()
+# -
+def slow_finder_chart(**kw):
+    """ stand-in for the SDSS download """
+    from PIL import Image
+    time.sleep(DELAY)
+    _buf = io.BytesIO()
+    Image.new('RGB', (64, 64), (10, 20, 30)).save(_buf, 'JPEG')
+    return _buf.getvalue()
+
+
+# +
+# test: get_item()
+# -
+def test_get_item_0():
+    assert get_item(1) == (1, None, None) and get_item(('1:0:0', '2:0:0')) == (None, '1:0:0', '2:0:0') and \
+        get_item({'id': 3, 'ra': '1:0:0'}) == (3, '1:0:0', None) and get_item('x') == (None, None, None)
+
+
+# +
+# test: prefetch()
+# -
+def test_prefetch_0(tmp_path, monkeypatch):
+    """ download(s) overlap, conversion(s) are cached and a second pass is all hits """
+    monkeypatch.setattr(src.mmt_prefetch, 'get_finder_chart_bytes', slow_finder_chart)
+    _cache = FinderCache(path=str(tmp_path / 'cache'))
+    _items = [(f'10:{_i:02d}:00', '+20:00:00') for _i in range(8)]
+    _t0 = time.perf_counter()
+    _res = prefetch(items=_items, workers=8, processes=2, cache=_cache, client=CLIENT)
+    assert time.perf_counter() - _t0 < len(_items) * DELAY / 2
+    assert sorted(_r['status'] for _r in _res) == ['converted'] * 8 and all(os.path.exists(_r['png']) for _r in _res)
+    assert [_r['status'] for _r in prefetch(items=_items, processes=0, cache=_cache, client=CLIENT)] == ['cached'] * 8
+
+
+def test_prefetch_1(tmp_path, monkeypatch):
+    """ target id(s) are resolved, uploaded and failure(s) reported per item """
+    monkeypatch.setattr(src.mmt_prefetch, 'get_finder_chart_bytes', slow_finder_chart)
+    _ids = [SERVER.store.create({'objectid': f'test_prefetch_{_i}', 'ra': f'11:{_i:02d}:00',
+                                            'dec': '+20:00:00'})['id'] for _i in range(4)]
+    _res = prefetch(items=_ids + [10 ** 9, ('bad', 'bad')], upload=True, processes=0,
+                    cache=FinderCache(path=str(tmp_path / 'cache')), client=CLIENT)
+    _status = {f"{_r['item']}": _r['status'] for _r in _res}
+    assert all(_status[f'{_i}'] == 'uploaded' for _i in _ids) and _status[f'{10 ** 9}'] == 'failed' and \
+        _status["('bad', 'bad')"] == 'failed'
+    assert all(SERVER.store.read(_i)['findingchartfilename'] == f'{_i}.png' for _i in _ids)
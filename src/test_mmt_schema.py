@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from src.mmt_schema import *
+
+
+# +
+# doc string(s)
+# -
+__doc__ = """
+  % python3 -m pytest -p no:warnings test_mmt_schema.py
+"""
+
+
+# +
+# constant(s)
+# -
+IMAGING = {'dec': '+33:57:36', 'exposuretime': 300.0, 'filter': 'r', 'magnitude': 15.0, 'objectid': 'test_schema',
+           'observationtype': 'imaging', 'ra': '22:35:58'}
+SPECTROSCOPY = {**IMAGING, **{'centralwavelength': 6500.0, 'filter': 'LP3800', 'grating': '270',
+                               'observationtype': 'longslit'}}
+
+
+# +
+# test: validate_payload()
+# -
+def test_validate_payload_0():
+    """ valid imaging payload agrees with verify_imaging_payload() on everything it sets correctly """
+    _data, _errors = validate_payload(dict(IMAGING))
+    _legacy = verify_imaging_payload(dict(IMAGING))
+    assert _errors == {} and {_k: _v for _k, _v in _data.items() if _k not in ('pm_ra', 'pa')} == \
+        {_k: _v for _k, _v in _legacy.items() if _k not in ('pm_ra', 'pa')}
+
+
+def test_validate_payload_1():
+    """ all error(s) are reported at once """
+    _data, _errors = validate_payload({**IMAGING, **{'ra': '25:00:00', 'dec': 'x', 'filter': 'q',
+                                                     'exposuretime': math.nan}})
+    assert _data == {} and set(_errors) == {'ra', 'dec', 'filter', 'exposuretime'}
+    assert get_error_code(_errors) == MMT_ERROR_CODES['ra'] | MMT_ERROR_CODES['dec'] | \
+        MMT_ERROR_CODES['filter'] | MMT_ERROR_CODES['exposuretime']
+
+
+def test_validate_payload_2():
+    """ optional value(s) are reset, in-range ones kept """
+    _data, _ = validate_payload({**IMAGING, **{'priority': 9, 'maskid': 1, 'pa': 45.0, 'pm_ra': 1.5, 'pm_dec': 'x'}})
+    assert (_data['priority'], _data['maskid'], _data['pa'], _data['pm_ra'], _data['pm_dec']) == \
+        (MMT_IMAGING_PAYLOAD['priority'], MMT_IMAGING_MASKS[0], 45.0, 1.5, 0.0)
+
+
+def test_validate_payload_3():
+    """ spectroscopy grating / wavelength combination """
+    assert validate_payload(dict(SPECTROSCOPY))[1] == {}
+    assert set(validate_payload({**SPECTROSCOPY, **{'centralwavelength': 9000.0}})[1]) == {'wavelength'}
+    assert set(validate_payload({**SPECTROSCOPY, **{'grating': '300', 'slitwidth': 'x'}})[1]) == \
+        {'grating', 'slitwidth'}
+
+
+def test_validate_payload_4():
+    """ invalid observationtype / payload """
+    assert set(validate_payload({**IMAGING, **{'observationtype': 'x'}})[1]) == {'observationtype'}
+    assert validate_payload(None)[0] == {}
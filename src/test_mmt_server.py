@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from src.mmt import *
+from src.mmt_server import *
+
+
+# +
+# doc string(s)
+# -
+__doc__ = """
+  % python3 -m pytest -p no:warnings test_mmt_server.py
+"""
+
+
+# +
+# test: MMTFaults()
+# -
+def test_faults_0():
+    """ token is checked on POST / PUT / UPLOAD, 429 carries Retry-After, error_rate=1 always fails """
+    _server, _url = start_server(faults=MMTFaults(rate=1.0, burst=2, retry_after=7, token='t0'))
+    try:
+        with MMTClient(url=_url, pool_size=1, retries=0) as _c:
+            assert _c.post(url=f'{_c.url}/?token=bad', json={'objectid': 'faults_0'}).status_code == 401
+            _req = _c.post(url=f'{_c.url}/?token=t0', json={'objectid': 'faults_0'})
+            assert _req.status_code == 200 and _req.json()['objectid'] == 'faults_0'
+            _req = _c.get(url=f'{_c.url}/{_req.json()["id"]}')
+            assert _req.status_code == 429 and _req.headers['Retry-After'] == '7'
+        assert _server.faults.stats == {401: 1, 200: 1, 429: 1}
+    finally:
+        _server.shutdown()
+    _server, _url = start_server(faults=MMTFaults(error_rate=1.0, latency=0.05, seed=1))
+    try:
+        _t0 = time.perf_counter()
+        assert requests.get(url=f'{_url}/1').status_code in MMT_SERVER_ERRORS
+        assert time.perf_counter() - _t0 >= 0.05
+    finally:
+        _server.shutdown()
+
+
+# +
+# test: upload over multipart/form-data
+# -
+def test_upload_0(tmp_path):
+    """ the finding chart file and form field(s) arrive intact, a form without the file is rejected """
+    _server, _url = start_server(faults=MMTFaults(token='t1'))
+    _png = tmp_path / 'chart.png'
+    _png.write_bytes(b'\x89PNG\r\n\x1a\n' + bytes(range(256)) * 4)
+    try:
+        with MMTClient(url=_url, pool_size=1) as _c:
+            _id = _server.store.create({'objectid': 'upload_0'})['id']
+            assert mmt_target(action='UPLOAD', targetid=_id, file=str(_png), token='bad', client=_c) == \
+                '"Unauthorized"'
+            _ans = mmt_target(action='UPLOAD', targetid=_id, file=str(_png), token='t1', client=_c)
+            assert _ans['findingchartfilename'] == 'chart.png' and _server.charts[_id] == _png.read_bytes()
+            assert _c.post(url=f'{_c.url}/{_id}/', data={'token': 't1'}, files={'other': ('x', b'x')}).status_code \
+                == 400
+    finally:
+        _server.shutdown()
+
+
+def test_store_0():
+    """ each server has its own record(s) and chart(s) """
+    (_s0, _u0), (_s1, _u1) = start_server(), start_server()
+    try:
+        _id = _s0.store.create({'objectid': 'store_0'})['id']
+        assert _s1.store is not _s0.store and _s1.charts is not _s0.charts and _s1.store.read(_id) is None
+        with MMTClient(url=_u1, pool_size=1) as _c:
+            assert _c.get(url=f'{_c.url}/{_id}').status_code == 404
+    finally:
+        _s0.shutdown()
+        _s1.shutdown()
+
+
+def test_parse_multipart_0():
+    """ non-multipart body(s) give nothing """
+    assert parse_multipart(b'{}', 'application/json') == ({}, {})
+    _body = b'--b\r\nContent-Disposition: form-data; name="token"\r\n\r\nxyz\r\n--b\r\n' \
+            b'Content-Disposition: form-data; name="f"; filename="a.png"\r\n\r\n\x00\x01\r\n--b--\r\n'
+    assert parse_multipart(_body, 'multipart/form-data; boundary=b') == \
+        ({'token': 'xyz'}, {'f': ('a.png', b'\x00\x01')})
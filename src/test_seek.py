@@ -4,10 +4,14 @@
 # +
 # import(s)
 # -
-from seek import *
+from astropy.time import Time
+from src.seek import *
 
+import errno
 import math
+import pytest
 import random
+import threading
 
 
 # +
@@ -73,3 +77,114 @@ def test_seek_5():
     _n = 0
     _t = '.fits'
     assert seek(_begin=_b, _end=_e, _nelms=_n, _path=_p, _type=_t).keys() is not None
+
+
+# +
+# test: ctime_to_jd(ctime=math.nan), ctimes_to_jd(ctimes=None)
+# -
+def test_ctime_to_jd_0():
+    """ same as the astropy isot path (away from utc leap second days) """
+    _t = [random.uniform(1.5e9, 1.8e9) for _ in range(1000)]
+    assert all(ctime_to_jd(_k) == Time(f"{time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(_k))}.000000").jd
+               for _k in _t if time.strftime('%m-%d', time.localtime(_k)) not in ('06-30', '12-31'))
+
+
+def test_ctimes_to_jd_0():
+    """ vector version is the same as the scalar version """
+    _t = [random.uniform(1.0e9, 2.0e9) for _ in range(1000)]
+    assert list(ctimes_to_jd(_t)) == [ctime_to_jd(_k) for _k in _t] and ctimes_to_jd([]).size == 0
+
+
+def test_seek_6(tmp_path):
+    """ non-empty, non-symlink file(s) of given type """
+    (tmp_path / 'a').mkdir()
+    (tmp_path / 'a' / 'good.fits').write_bytes(b'x')
+    (tmp_path / 'a' / 'empty.fits').write_bytes(b'')
+    (tmp_path / 'a' / 'other.txt').write_bytes(b'x')
+    os.symlink(tmp_path / 'a' / 'good.fits', tmp_path / 'link.fits')
+    _ans = seek(_begin=get_isot(-1), _end=get_isot(1), _nelms=0, _path=str(tmp_path), _type='.fits')
+    assert list(_ans.values()) == [str(tmp_path / 'a' / 'good.fits')]
+
+
+# +
+# test: scan(_path='', _type='', _workers=SEEK_WORKERS)
+# -
+def test_scan_0(tmp_path):
+    """ serial and parallel scan(s) find the same file(s) """
+    for _d in range(5):
+        (tmp_path / f'd{_d}' / 'e').mkdir(parents=True)
+        for _f in range(10):
+            (tmp_path / f'd{_d}' / 'e' / f'{_f}.fits').write_bytes(b'x')
+            (tmp_path / f'd{_d}' / f'{_f}.fits').write_bytes(b'x' if _f % 2 else b'')
+    _serial = sorted(_k for _f in scan(str(tmp_path), '.fits', 1) for _k in _f)
+    _parallel = sorted(_k for _f in scan(str(tmp_path), '.fits', 4) for _k in _f)
+    assert _serial == _parallel and len(_serial) == 75
+
+
+# +
+# test: seek_iter(), seek_top()
+# -
+def test_seek_iter_0():
+    """ invalid argument(s) yield nothing """
+    assert all(list(seek_iter(_begin=_k)) == [] for _k in INVALID_INPUTS)
+
+
+def test_seek_iter_1(tmp_path):
+    """ stops after _nelms """
+    for _f in range(20):
+        (tmp_path / f'{_f}.fits').write_bytes(b'x')
+    assert len(list(seek_iter(get_isot(-1), get_isot(1), 3, str(tmp_path), '.fits', 4))) == 3
+    assert len(list(seek_iter(get_isot(-1), get_isot(1), 0, str(tmp_path), '.fits', 1))) == 20
+
+
+def test_seek_top_0():
+    """ same as sorting a dictionary of all pair(s) """
+    _pairs = [(float(random.randint(0, 50)), f'{_i}') for _i in range(200)]
+    _all = dict(_pairs)
+    for _n in (0, 1, 5, 100):
+        _keys = sorted(_all, reverse=True)[:len(_all) if _n == 0 else _n]
+        assert seek_top(_pairs, _n) == {_k: _all[_k] for _k in _keys}
+
+
+# +
+# test: follow()
+# -
+def _follow(_tmp=None, _mode='auto'):
+    """ write file(s) shortly after follow() starts and return what it reports """
+    def _write():
+        time.sleep(0.3)
+        (_tmp / 'new.fits').write_bytes(b'x')
+        (_tmp / 'new.txt').write_bytes(b'x')
+        (_tmp / 'sub').mkdir()
+        (_tmp / 'sub' / 'deep.fits').write_bytes(b'x')
+    (_tmp / 'old.fits').write_bytes(b'x')
+    threading.Thread(target=_write, daemon=True).start()
+    return sorted(_f for _, _f in follow(get_isot(-1), get_isot(1), str(_tmp), '.fits', 0.1, 1.5, _mode))
+
+
+def test_follow_0(tmp_path):
+    """ new file(s) only, inotify if available """
+    assert _follow(tmp_path, 'auto') == [str(tmp_path / 'new.fits'), str(tmp_path / 'sub' / 'deep.fits')]
+
+
+def test_follow_1(tmp_path):
+    """ new file(s) only, polling """
+    assert _follow(tmp_path, 'poll') == [str(tmp_path / 'new.fits'), str(tmp_path / 'sub' / 'deep.fits')]
+
+
+def test_follow_2():
+    """ a vanished directory is skipped, any other add_watch error raises """
+    class _Watcher(object):
+        def __init__(self):
+            self.dirs = []
+
+        def add_watch(self, _path=''):
+            if _path == 'gone':
+                raise OSError(errno.ENOENT, 'gone')
+            if _path == 'denied':
+                raise OSError(errno.EACCES, 'denied')
+            self.dirs.append(_path)
+    _w = _Watcher()
+    assert add_watches(_w, ['a', 'gone', 'b']) == ['a', 'b'] and _w.dirs == ['a', 'b']
+    with pytest.raises(OSError):
+        add_watches(_w, ['c', 'denied'])
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+
+# +
+# import(s)
+# -
+from src.seek_index import *
+
+
+# +
+# doc string(s)
+# -
+__doc__ = """
+  % python3 -m pytest -p no:warnings test_seek_index.py
+"""
+
+
+# +
+# function: make_tree()
+# -
+def make_tree(_root=None, _ndirs=3, _nfiles=4):
+    """ create a small tree of .fits, .txt, empty and symlinked file(s) """
+    for _d in range(_ndirs):
+        _sub = _root / f'night{_d}' / 'raw'
+        _sub.mkdir(parents=True)
+        for _f in range(_nfiles):
+            (_sub / f'frame{_f}.fits').write_bytes(b'x' * (_f + 1))
+            (_sub / f'frame{_f}.txt').write_bytes(b'x')
+        (_sub / 'empty.fits').write_bytes(b'')
+        os.symlink(_sub / 'frame0.fits', _sub / 'link.fits')
+
+
+# +
+# test: seek_index()
+# -
+def test_seek_index_0(tmp_path):
+    """ invalid argument(s) """
+    assert seek_index(_begin=None, _db=str(tmp_path / 'db')) is None
+    assert seek_index(_begin=get_isot(-1), _end=get_isot(1), _path=str(tmp_path / 'missing'),
+                      _db=str(tmp_path / 'db')) is None
+
+
+def test_seek_index_1(tmp_path):
+    """ same file(s) as seek() """
+    make_tree(tmp_path / 'data')
+    _b, _e, _p = get_isot(-1), get_isot(1), str(tmp_path / 'data')
+    _ans = seek_index(_begin=_b, _end=_e, _nelms=0, _path=_p, _type='.fits', _db=str(tmp_path / 'db'))
+    assert set(_ans.keys()) == set(seek(_begin=_b, _end=_e, _nelms=0, _path=_p, _type='.fits').keys())
+    assert all(_v.endswith('.fits') and not os.path.islink(_v) and os.stat(_v).st_size > 0 for _v in _ans.values())
+
+
+def test_seek_index_2(tmp_path):
+    """ incremental refresh only re-lists changed directories and sees new / removed file(s) """
+    make_tree(tmp_path / 'data')
+    _p = str(tmp_path / 'data')
+    with SeekIndex(db=str(tmp_path / 'db')) as _idx:
+        assert _idx.refresh(_p) == 7
+        assert _idx.refresh(_p) == 0
+        (tmp_path / 'data' / 'night1' / 'raw' / 'new.fits').write_bytes(b'new')
+        os.remove(tmp_path / 'data' / 'night2' / 'raw' / 'frame0.fits')
+        assert _idx.refresh(_p) == 2
+        _files = [_r[1] for _r in _idx.query(0.0, math.inf, 0, _p, '.fits')]
+        assert str(tmp_path / 'data' / 'night1' / 'raw' / 'new.fits') in _files
+        assert str(tmp_path / 'data' / 'night2' / 'raw' / 'frame0.fits') not in _files
+        assert len(_idx.query(0.0, math.inf, 2, _p, '.fits')) == 2
+
+
+def test_seek_index_3(tmp_path):
+    """ a file rewritten in place (directory mtime unchanged) is re-stat'ed, an emptied one drops out """
+    make_tree(tmp_path / 'data', _ndirs=1)
+    _p, _raw = str(tmp_path / 'data'), tmp_path / 'data' / 'night0' / 'raw'
+    with SeekIndex(db=str(tmp_path / 'db')) as _idx:
+        _idx.refresh(_p)
+        (_raw / 'empty.fits').write_bytes(b'filled')
+        (_raw / 'frame1.fits').write_bytes(b'')
+        assert _idx.refresh(_p) == 0
+        _files = [_r[1] for _r in _idx.query(0.0, math.inf, 0, _p, '.fits')]
+        assert str(_raw / 'empty.fits') in _files and str(_raw / 'frame1.fits') not in _files
+
+
+def test_seek_index_4(tmp_path, monkeypatch):
+    """ an unreadable directory is emptied, the rest of the tree is still indexed and it is retried next time """
+    make_tree(tmp_path / 'data')
+    _p, _bad, _scandir = str(tmp_path / 'data'), str(tmp_path / 'data' / 'night1' / 'raw'), os.scandir
+    with SeekIndex(db=str(tmp_path / 'db')) as _idx:
+        _idx.refresh(_p)
+        (tmp_path / 'data' / 'night1' / 'raw' / 'late.fits').write_bytes(b'late')
+        monkeypatch.setattr(os, 'scandir', lambda _d: (_ for _ in ()).throw(PermissionError(13, _d)) if
+                            os.fspath(_d) == _bad else _scandir(_d))
+        _idx.refresh(_p)
+        _files = [_r[1] for _r in _idx.query(0.0, math.inf, 0, _p, '.fits')]
+        assert _files and not any(_f.startswith(f'{_bad}/') for _f in _files)
+        monkeypatch.setattr(os, 'scandir', _scandir)
+        _idx.refresh(_p)
+        assert f'{_bad}/late.fits' in [_r[1] for _r in _idx.query(0.0, math.inf, 0, _p, '.fits')]